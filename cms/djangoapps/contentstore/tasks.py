@@ -0,0 +1,180 @@
+"""
+Background jobs which import and export courses, so that Studio's web workers aren't held
+for the minutes that large courses take.
+
+As with InstructorTask, each job has a state (QUEUING, PROGRESS, then SUCCESS or FAILURE)
+and a progress dict which it updates as it runs. They are kept in the django cache, under
+the id of the job, so that the status views of any Studio process can report them.
+"""
+import logging
+import shutil
+import time
+from uuid import uuid4
+
+from celery import task
+from celery.states import SUCCESS, FAILURE
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from path import path
+
+from auth.authz import create_all_course_groups
+from xmodule.contentstore.django import contentstore
+from xmodule.exceptions import SerializationError
+from xmodule.modulestore import Location
+from xmodule.modulestore.django import modulestore
+from xmodule.modulestore.xml_exporter import export_to_tar
+from xmodule.modulestore.xml_importer import import_from_xml
+
+log = logging.getLogger(__name__)
+
+# The states of a job before it completes, as for InstructorTask
+QUEUING = 'QUEUING'
+PROGRESS = 'PROGRESS'
+
+# How long the status of a job, and the archive of an export job, are kept, in seconds
+JOB_STATUS_TIMEOUT = 24 * 60 * 60
+
+# The minimum number of seconds between updates of the progress of a job within a phase
+PROGRESS_UPDATE_INTERVAL = 1
+
+
+def _job_status_key(job_id):
+    """The cache key of the status of job_id"""
+    return 'contentstore.job.{0}'.format(job_id)
+
+
+def get_job_status(job_id):
+    """
+    Returns the status of job_id, a dict with the 'state' of the job, the 'course_location'
+    it applies to and its 'progress', or None if the job is unknown or has expired.
+    """
+    return cache.get(_job_status_key(job_id))
+
+
+def set_job_status(job_id, state, course_location, **status):
+    """
+    Sets the status of job_id to `state`, along with any other `status` entries
+    """
+    status.update(state=state, course_location=course_location)
+    cache.set(_job_status_key(job_id), status, JOB_STATUS_TIMEOUT)
+
+
+class JobProgress(object):
+    """
+    Records the progress of a job: its current phase and how many of the items of that
+    phase (blocks, assets or exported files) are done, out of the total.
+
+    Updates are written to the job's status when the phase changes, and otherwise at most
+    every PROGRESS_UPDATE_INTERVAL seconds, so that reporting progress for every item is cheap.
+    """
+    def __init__(self, job_id, course_location):
+        self.job_id = job_id
+        self.course_location = course_location
+        self.progress = {'phase': None, 'done': None, 'total': None}
+        self.last_update = 0
+
+    def update(self, phase, done=None, total=None):
+        """
+        Record that `done` of the `total` items of `phase` have been processed
+        """
+        now = time.time()
+        phase_changed = phase != self.progress['phase']
+        self.progress = {'phase': phase, 'done': done, 'total': total}
+        if phase_changed or now - self.last_update >= PROGRESS_UPDATE_INTERVAL:
+            self.last_update = now
+            set_job_status(self.job_id, PROGRESS, self.course_location, progress=self.progress)
+
+
+def create_job(course_location):
+    """
+    Returns the id of a new job for the course at course_location, in the QUEUING state
+    """
+    job_id = uuid4().hex
+    set_job_status(job_id, QUEUING, course_location, progress={'phase': None, 'done': None, 'total': None})
+    return job_id
+
+
+def export_archive_path(job_id, name):
+    """
+    The path of the archive which the export job job_id writes for the course run `name`
+    """
+    return path(settings.COURSE_EXPORT_ROOT) / job_id / (name + '.tar.gz')
+
+
+def _remove_expired_exports():
+    """
+    Delete the archives of export jobs whose status has expired
+    """
+    export_root = path(settings.COURSE_EXPORT_ROOT)
+    if not export_root.isdir():
+        return
+    expired_at = time.time() - JOB_STATUS_TIMEOUT
+    for job_dir in export_root.dirs():
+        if job_dir.mtime < expired_at:
+            shutil.rmtree(job_dir, ignore_errors=True)
+
+
+@task()  # pylint: disable=E1102
+def import_course_job(job_id, user_id, course_location, course_subdir):
+    """
+    Imports the course unpacked in GITHUB_REPO_ROOT/course_subdir into the course at
+    course_location, for the user user_id, and then deletes the unpacked course.
+    """
+    progress = JobProgress(job_id, course_location)
+    location = Location(course_location)
+    try:
+        _module_store, course_items = import_from_xml(
+            modulestore('direct'),
+            settings.GITHUB_REPO_ROOT,
+            [course_subdir],
+            load_error_modules=False,
+            static_content_store=contentstore(),
+            target_location_namespace=location,
+            draft_store=modulestore(),
+            progress_callback=progress.update,
+        )
+        log.debug('new course at {0}'.format(course_items[0].location))
+
+        progress.update('groups')
+        create_all_course_groups(User.objects.get(id=user_id), course_items[0].location)
+        log.debug('created all course groups at {0}'.format(course_items[0].location))
+    except Exception as exception:
+        log.exception('There was an error importing course {0}'.format(course_location))
+        set_job_status(job_id, FAILURE, course_location, progress=progress.progress, message=unicode(exception))
+        raise
+    finally:
+        shutil.rmtree(path(settings.GITHUB_REPO_ROOT) / course_subdir, ignore_errors=True)
+
+    set_job_status(job_id, SUCCESS, course_location, progress=progress.progress)
+
+
+@task()  # pylint: disable=E1102
+def export_course_job(job_id, course_location):
+    """
+    Exports the course at course_location to the archive at export_archive_path(job_id, name),
+    for download.
+    """
+    progress = JobProgress(job_id, course_location)
+    location = Location(course_location)
+    _remove_expired_exports()
+
+    archive_path = export_archive_path(job_id, location.name)
+    try:
+        progress.update('exporting')
+        archive_path.dirname().makedirs_p()
+        with open(archive_path, 'wb') as archive_file:
+            export_to_tar(
+                modulestore('direct'), contentstore(), location, archive_file, location.name, modulestore(),
+                progress_callback=progress.update
+            )
+    except Exception as exception:
+        log.exception('There was an error exporting course {0}'.format(course_location))
+        status = {'progress': progress.progress, 'message': unicode(exception)}
+        if isinstance(exception, SerializationError):
+            status['failed_location'] = Location(exception.location).url()
+        set_job_status(job_id, FAILURE, course_location, **status)
+        shutil.rmtree(archive_path.dirname(), ignore_errors=True)
+        raise
+
+    set_job_status(job_id, SUCCESS, course_location, progress=progress.progress)
@@ -9,7 +9,9 @@ import copy
 from path import path
 import json
 import logging
+from StringIO import StringIO
 from uuid import uuid4
+from mock import patch
 from pymongo import MongoClient
 
 from .utils import CourseTestCase
@@ -18,6 +20,7 @@ from django.test.utils import override_settings
 from django.conf import settings
 
 from xmodule.contentstore.django import _CONTENTSTORE
+from xmodule.exceptions import SerializationError
 
 TEST_DATA_CONTENTSTORE = copy.deepcopy(settings.CONTENTSTORE)
 TEST_DATA_CONTENTSTORE['DOC_STORE_CONFIG']['db'] = 'test_xcontent_%s' % uuid4().hex
@@ -113,6 +116,39 @@ class ImportTestCase(CourseTestCase):
                     })
         self.assertEquals(resp.status_code, 200)
 
+        # the import is done by a background job, which reports its progress
+        status_url = reverse("import_status", kwargs={
+            'org': self.course.location.org,
+            'course': self.course.location.course,
+            'name': os.path.split(self.good_tar)[1],
+        })
+        resp_status = json.loads(self.client.get(status_url).content)
+        self.assertEquals(resp_status["ImportStatus"], 4)
+        self.assertEquals(resp_status["Progress"]["phase"], "groups")
+
+    def test_import_failure(self):
+        """
+        Check that an error in the background import is reported by `import_status`
+        """
+        with patch('contentstore.tasks.import_from_xml', side_effect=Exception('Import failed')):
+            with open(self.good_tar) as gtar:
+                resp = self.client.post(
+                    self.url,
+                    {
+                        "name": self.good_tar,
+                        "course-data": [gtar]
+                    })
+        self.assertEquals(resp.status_code, 200)
+
+        status_url = reverse("import_status", kwargs={
+            'org': self.course.location.org,
+            'course': self.course.location.course,
+            'name': os.path.split(self.good_tar)[1],
+        })
+        resp_status = json.loads(self.client.get(status_url).content)
+        self.assertEquals(resp_status["ImportStatus"], -3)
+        self.assertEquals(resp_status["Message"], 'Import failed')
+
     ## Unsafe tar methods #####################################################
     # Each of these methods creates a tarfile with a single type of unsafe
     # content.
@@ -208,3 +244,67 @@ class ImportTestCase(CourseTestCase):
         resp_status = self.client.get(status_url)
         import_status = json.loads(resp_status.content)["ImportStatus"]
         self.assertIn(import_status, (0, 3))
+
+
+@override_settings(CONTENTSTORE=TEST_DATA_CONTENTSTORE)
+class ExportTestCase(CourseTestCase):
+    """
+    Unit tests for exporting a course
+    """
+
+    def setUp(self):
+        super(ExportTestCase, self).setUp()
+        self.url = reverse("generate_export_course", kwargs={
+            'org': self.course.location.org,
+            'course': self.course.location.course,
+            'name': self.course.location.name,
+        })
+
+    def tearDown(self):
+        MongoClient().drop_database(TEST_DATA_CONTENTSTORE['DOC_STORE_CONFIG']['db'])
+        _CONTENTSTORE.clear()
+
+    def test_export(self):
+        """
+        Check that the export is done by a job whose archive can be downloaded
+        """
+        resp = self.client.post(self.url)
+        self.assertEquals(resp.status_code, 202)
+
+        resp_status = json.loads(self.client.get(json.loads(resp.content)["StatusUrl"]).content)
+        self.assertEquals(resp_status["ExportStatus"], "SUCCESS")
+        self.assertEquals(resp_status["Progress"]["phase"], "exporting")
+
+        resp = self.client.get(resp_status["DownloadUrl"])
+        self.assertEquals(resp.status_code, 200)
+        self.assertEquals(resp['Content-Type'], 'application/x-tgz')
+        with tarfile.open(fileobj=StringIO(''.join(resp)), mode='r:gz') as tar_file:
+            self.assertIn(self.course.location.name + '/course.xml', tar_file.getnames())
+
+    def test_export_failure(self):
+        """
+        Check that an error in the export job is reported, and shown on the export page
+        """
+        error = SerializationError(self.course.location, 'Export failed')
+        with patch('contentstore.tasks.export_to_tar', side_effect=error):
+            resp = self.client.post(self.url)
+
+        resp_status = json.loads(self.client.get(json.loads(resp.content)["StatusUrl"]).content)
+        self.assertEquals(resp_status["ExportStatus"], "FAILURE")
+        self.assertNotIn("DownloadUrl", resp_status)
+
+        resp = self.client.get(resp_status["ErrorUrl"])
+        self.assertEquals(resp.status_code, 200)
+        self.assertIn('Export failed', resp.content)
+
+    def test_unknown_job(self):
+        """
+        Check that the status of jobs of other courses isn't reported
+        """
+        status_url = reverse("export_status", kwargs={
+            'org': self.course.location.org,
+            'course': self.course.location.course,
+            'name': self.course.location.name,
+            'job_id': uuid4().hex,
+        })
+        self.assertEquals(self.client.get(status_url).status_code, 404)
@@ -7,36 +7,34 @@ import os
 import tarfile
 import shutil
 import re
-from tempfile import mkdtemp
 from path import path
 
+from celery.states import SUCCESS, FAILURE
 from django.conf import settings
-from django.http import HttpResponse
+from django.http import HttpResponse, Http404
 from django.contrib.auth.decorators import login_required
 from django_future.csrf import ensure_csrf_cookie
 from django.core.urlresolvers import reverse
 from django.core.servers.basehttp import FileWrapper
-from django.core.files.temp import NamedTemporaryFile
 from django.core.exceptions import SuspiciousOperation
-from django.views.decorators.http import require_http_methods, require_GET
+from django.views.decorators.http import require_http_methods, require_GET, require_POST
 from django.utils.translation import ugettext as _
 
 from mitxmako.shortcuts import render_to_response
-from auth.authz import create_all_course_groups
 
-from xmodule.modulestore.xml_importer import import_from_xml
-from xmodule.contentstore.django import contentstore
-from xmodule.modulestore.xml_exporter import export_to_xml
 from xmodule.modulestore.django import modulestore
 from xmodule.modulestore import Location
-from xmodule.exceptions import SerializationError
 
 from .access import get_location_and_verify_access
+from contentstore.tasks import (
+    create_job, get_job_status, export_archive_path, import_course_job, export_course_job
+)
 from util.json_request import JsonResponse
 from extract_tar import safetar_extractall
 
 
-__all__ = ['import_course', 'import_status', 'generate_export_course', 'export_course']
+__all__ = ['import_course', 'import_status', 'generate_export_course', 'export_status', 'export_download',
+           'export_course']
 
 log = logging.getLogger(__name__)
 
@@ -144,7 +142,8 @@ def import_course(request, org, course, name):
             request.session.modified = True
 
             # Do everything from now on in a try-finally block to make sure
-            # everything is properly cleaned up.
+            # everything is properly cleaned up if the import isn't started.
+            import_started = False
             try:
 
                 tar_file = tarfile.open(temp_filepath)
@@ -206,23 +205,14 @@ def import_course(request, org, course, name):
                     for fname in os.listdir(dirpath):
                         shutil.move(dirpath / fname, course_dir)
 
-                _module_store, course_items = import_from_xml(
-                    modulestore('direct'),
-                    settings.GITHUB_REPO_ROOT,
-                    [course_subdir],
-                    load_error_modules=False,
-                    static_content_store=contentstore(),
-                    target_location_namespace=location,
-                    draft_store=modulestore()
-                )
-
-                logging.debug('new course at {0}'.format(course_items[0].location))
-
+                # the import itself is done in the background, by a job which
+                # deletes course_dir once it's done
+                job_id = create_job(location.url())
                 session_status[key] = 3
+                request.session.setdefault("import_jobs", {})[key] = job_id
                 request.session.modified = True
-
-                create_all_course_groups(request.user, course_items[0].location)
-                logging.debug('created all course groups at {0}'.format(course_items[0].location))
+                import_course_job.delay(job_id, request.user.id, location.url(), course_subdir)
+                import_started = True
 
             # Send errors to client with stage at which error occured.
             except Exception as exception:   # pylint: disable=W0703
@@ -235,7 +225,8 @@ def import_course(request, org, course, name):
                 )
 
             finally:
-                shutil.rmtree(course_dir)
+                if not import_started:
+                    shutil.rmtree(course_dir)
 
             return JsonResponse({'Status': 'OK'})
     else:
@@ -258,46 +249,141 @@ def import_status(request, org, course, name):
     """
     Returns an integer corresponding to the status of a file import. These are:
 
-        0 : No status info found (import done or upload still in progress)
-        1 : Extracting file
-        2 : Validating.
-        3 : Importing to mongo
+        -X : Import unsuccessful due to some error with X as the current stage
+         0 : No status info found (import done or upload still in progress)
+         1 : Extracting file
+         2 : Validating.
+         3 : Importing to mongo
+         4 : Import successful
 
+    While importing to mongo, the progress of the import job (its phase, and how
+    many of the blocks or assets of the phase are done) is returned too, and if
+    the import fails, the error message.
     """
-
+    key = org + course + name
     try:
         session_status = request.session["import_status"]
-        status = session_status[org + course + name]
+        status = session_status[key]
     except KeyError:
         status = 0
 
-    return JsonResponse({"ImportStatus": status})
+    response = {}
+    job_id = request.session.get("import_jobs", {}).get(key)
+    job_status = get_job_status(job_id) if job_id is not None else None
+    if status == 3 and job_status is not None:
+        response['Progress'] = job_status['progress']
+        if job_status['state'] == SUCCESS:
+            status = 4
+        elif job_status['state'] == FAILURE:
+            status = -3
+            response['Message'] = job_status['message']
+
+    response['ImportStatus'] = status
+    return JsonResponse(response)
+
+
+def _get_job_status_for_course(job_id, location):
+    """
+    Returns the status of the job job_id, raising Http404 if it is unknown or
+    isn't for the course at location
+    """
+    job_status = get_job_status(job_id)
+    if job_status is None or job_status['course_location'] != location.url():
+        raise Http404
+    return job_status
 
 
 @ensure_csrf_cookie
+@require_POST
 @login_required
 def generate_export_course(request, org, course, name):
     """
-    This method will serialize out a course to a .tar.gz file which contains a
-    XML-based representation of the course
+    This method will start a background job which serializes out a course to
+    a .tar.gz file which contains a XML-based representation of the course,
+    and returns the url at which the status of the job can be found.
     """
     location = get_location_and_verify_access(request, org, course, name)
-    course_module = modulestore().get_instance(location.course_id, location)
-    loc = Location(location)
-    export_file = NamedTemporaryFile(prefix=name + '.', suffix=".tar.gz")
 
-    root_dir = path(mkdtemp())
+    job_id = create_job(location.url())
+    export_course_job.delay(job_id, location.url())
 
-    try:
-        export_to_xml(modulestore('direct'), contentstore(), loc, root_dir, name, modulestore())
-    except SerializationError, e:
-        logging.exception('There was an error exporting course {0}. {1}'.format(course_module.location, unicode(e)))
-        unit = None
-        failed_item = None
-        parent = None
+    return JsonResponse(
+        {
+            'ExportJob': job_id,
+            'StatusUrl': reverse('export_status', kwargs={
+                'org': org,
+                'course': course,
+                'name': name,
+                'job_id': job_id,
+            })
+        },
+        status=202
+    )
+
+
+@require_GET
+@ensure_csrf_cookie
+@login_required
+def export_status(request, org, course, name, job_id):
+    """
+    Returns the state of the export job job_id (QUEUING, PROGRESS, SUCCESS or
+    FAILURE), its progress, and once it has succeeded, the url from which the
+    exported course can be downloaded.
+    """
+    location = get_location_and_verify_access(request, org, course, name)
+    job_status = _get_job_status_for_course(job_id, location)
+
+    response = {
+        'ExportStatus': job_status['state'],
+        'Progress': job_status['progress'],
+    }
+    if job_status['state'] == SUCCESS:
+        response['DownloadUrl'] = reverse('export_download', kwargs={
+            'org': org,
+            'course': course,
+            'name': name,
+            'job_id': job_id,
+        })
+    elif job_status['state'] == FAILURE:
+        response['ErrorUrl'] = '{0}?job={1}'.format(
+            reverse('export_course', kwargs={'org': org, 'course': course, 'name': name}),
+            job_id
+        )
+    return JsonResponse(response)
+
+
+@require_GET
+@login_required
+def export_download(request, org, course, name, job_id):
+    """
+    Returns the .tar.gz file written by the successful export job job_id
+    """
+    location = get_location_and_verify_access(request, org, course, name)
+    job_status = _get_job_status_for_course(job_id, location)
+    export_path = export_archive_path(job_id, name)
+    if job_status['state'] != SUCCESS or not export_path.isfile():
+        raise Http404
+
+    export_file = open(export_path, 'rb')
+    response = HttpResponse(FileWrapper(export_file), content_type='application/x-tgz')
+    response['Content-Disposition'] = 'attachment; filename=%s' % export_path.basename()
+    response['Content-Length'] = export_path.getsize()
+    return response
+
+
+def _export_error_context(course_module, job_status):
+    """
+    Returns the context with which export.html displays the error of the failed
+    export job with status job_status
+    """
+    location = course_module.location
+    unit = None
+    failed_item = None
+    parent = None
+    if 'failed_location' in job_status:
         try:
-            failed_item = modulestore().get_instance(course_module.location.course_id, e.location)
-            parent_locs = modulestore().get_parent_locations(failed_item.location, course_module.location.course_id)
+            failed_item = modulestore().get_instance(location.course_id, Location(job_status['failed_location']))
+            parent_locs = modulestore().get_parent_locations(failed_item.location, location.course_id)
 
             if len(parent_locs) > 0:
                 parent = modulestore().get_item(parent_locs[0])
@@ -307,63 +393,41 @@ def generate_export_course(request, org, course, name):
             # if we have a nested exception, then we'll show the more generic error message
             pass
 
-        return render_to_response('export.html', {
-            'context_course': course_module,
-            'successful_import_redirect_url': '',
-            'in_err': True,
-            'raw_err_msg': str(e),
-            'failed_module': failed_item,
-            'unit': unit,
-            'edit_unit_url': reverse('edit_unit', kwargs={
-                'location': parent.location
-            }) if parent else '',
-            'course_home_url': reverse('course_index', kwargs={
-                'org': org,
-                'course': course,
-                'name': name
-            })
-        })
-    except Exception, e:
-        logging.exception('There was an error exporting course {0}. {1}'.format(course_module.location, unicode(e)))
-        return render_to_response('export.html', {
-            'context_course': course_module,
-            'successful_import_redirect_url': '',
-            'in_err': True,
-            'unit': None,
-            'raw_err_msg': str(e),
-            'course_home_url': reverse('course_index', kwargs={
-                'org': org,
-                'course': course,
-                'name': name
-            })
+    return {
+        'in_err': True,
+        'raw_err_msg': job_status['message'],
+        'failed_module': failed_item,
+        'unit': unit,
+        'edit_unit_url': reverse('edit_unit', kwargs={
+            'location': parent.location
+        }) if parent else '',
+        'course_home_url': reverse('course_index', kwargs={
+            'org': location.org,
+            'course': location.course,
+            'name': location.name
         })
-
-    logging.debug('tar file being generated at {0}'.format(export_file.name))
-    tar_file = tarfile.open(name=export_file.name, mode='w:gz')
-    tar_file.add(root_dir / name, arcname=name)
-    tar_file.close()
-
-    # remove temp dir
-    shutil.rmtree(root_dir / name)
-
-    wrapper = FileWrapper(export_file)
-    response = HttpResponse(wrapper, content_type='application/x-tgz')
-    response['Content-Disposition'] = 'attachment; filename=%s' % os.path.basename(export_file.name)
-    response['Content-Length'] = os.path.getsize(export_file.name)
-    return response
+    }
 
 
 @ensure_csrf_cookie
 @login_required
 def export_course(request, org, course, name):
     """
-    This method serves up the 'Export Course' page
+    This method serves up the 'Export Course' page, showing the error of the
+    export job in the `job` parameter if it failed
     """
     location = get_location_and_verify_access(request, org, course, name)
 
     course_module = modulestore().get_item(location)
 
-    return render_to_response('export.html', {
+    context = {
         'context_course': course_module,
         'successful_import_redirect_url': ''
-    })
+    }
+    job_id = request.GET.get('job')
+    if job_id:
+        job_status = _get_job_status_for_course(job_id, location)
+        if job_status['state'] == FAILURE:
+            context.update(_export_error_context(course_module, job_status))
+
+    return render_to_response('export.html', context)
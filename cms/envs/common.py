@@ -75,6 +75,10 @@ ENV_ROOT = REPO_ROOT.dirname()  # virtualenv dir /mitx is in
 
 GITHUB_REPO_ROOT = ENV_ROOT / "data"
 
+# Where background export jobs write the course archives for download; like
+# GITHUB_REPO_ROOT for imports, it must be shared by the workers and Studio
+COURSE_EXPORT_ROOT = ENV_ROOT / "exports"
+
 sys.path.append(REPO_ROOT)
 sys.path.append(PROJECT_ROOT / 'djangoapps')
 sys.path.append(PROJECT_ROOT / 'lib')
@@ -206,6 +210,11 @@ STATIC_URL = '/static/' + git.revision + "/"
 ADMIN_MEDIA_PREFIX = '/static/admin/'
 STATIC_ROOT = ENV_ROOT / "staticfiles" / git.revision
 
+# An optional local disk cache of static content too large for memcache, served by
+# contentserver.middleware.StaticContentServer, e.g.
+# {'DIRECTORY': '/tmp/static_content', 'MAX_SIZE': 1024 * 1024 * 1024, 'MAX_ITEM_SIZE': 100 * 1024 * 1024}
+STATIC_CONTENT_DISK_CACHE = None
+
 STATICFILES_DIRS = [
     COMMON_ROOT / "static",
     PROJECT_ROOT / "static",
@@ -46,17 +46,28 @@ define(
          * @param {int} timeout Number of milliseconds to wait in between ajax calls
          *     for new updates.
          * @param {int} stage Starting stage.
+         * @param {string} message Error message, if the import failed.
          */
-        var getStatus = function (url, timeout, stage) {
+        var getStatus = function (url, timeout, stage, message) {
             var currentStage = stage || 0;
             if (CourseImport.stopGetStatus) { return ;}
+            if (currentStage == 4) {
+                // the import has been completed in the background
+                CourseImport.displayFinishedImport();
+                return;
+            }
+            if (currentStage < 0) {
+                // the import failed, at stage -currentStage
+                CourseImport.stopGetStatus = true;
+                CourseImport.stageError(-currentStage, message);
+                return;
+            }
             updateStage(currentStage);
-            if (currentStage == 3 ) { return ;}
             var time = timeout || 1000;
             $.getJSON(url,
                 function (data) {
                     setTimeout(function () {
-                        getStatus(url, time, data.ImportStatus);
+                        getStatus(url, time, data.ImportStatus, data.Message);
                     }, time);
                 }
             );
@@ -36,6 +36,10 @@ urlpatterns = patterns('',  # nopep8
         'contentstore.views.export_course', name='export_course'),
     url(r'^(?P<org>[^/]+)/(?P<course>[^/]+)/generate_export/(?P<name>[^/]+)$',
         'contentstore.views.generate_export_course', name='generate_export_course'),
+    url(r'^(?P<org>[^/]+)/(?P<course>[^/]+)/export_status/(?P<name>[^/]+)/(?P<job_id>[0-9a-f]+)$',
+        'contentstore.views.export_status', name='export_status'),
+    url(r'^(?P<org>[^/]+)/(?P<course>[^/]+)/export_download/(?P<name>[^/]+)/(?P<job_id>[0-9a-f]+)$',
+        'contentstore.views.export_download', name='export_download'),
 
     url(r'^preview/modx/(?P<preview_id>[^/]*)/(?P<location>.*?)/(?P<dispatch>[^/]*)$',
         'contentstore.views.preview_dispatch', name='preview_dispatch'),
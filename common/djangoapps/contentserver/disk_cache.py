@@ -0,0 +1,133 @@
+"""
+A local, size-bounded, on-disk cache of static content data, for assets too
+large to be cached in memcache but small enough that re-reading them from
+GridFS for every request is wasteful.
+"""
+import errno
+import logging
+import os
+import tempfile
+import threading
+
+log = logging.getLogger(__name__)
+
+# Evictions make room for this fraction of max_size to be written before the next one
+EVICTION_HEADROOM = 0.1
+
+
+class DiskContentCache(object):
+    """
+    Stores the data of static content in files named after its md5 digest in
+    `directory`, evicting the least recently used files once their total size
+    exceeds `max_size` bytes.
+
+    Files are written to a temporary name and renamed once complete, so that
+    several processes can share the directory.
+
+    The total size is counted as files are written, and only found by listing
+    the directory when the count exceeds max_size (or on the first write). Each
+    eviction leaves EVICTION_HEADROOM of max_size free, so the directory is
+    listed at most once per that many bytes written by this process. Files
+    written by other processes are counted by the next eviction.
+    """
+    def __init__(self, directory, max_size, max_item_size):
+        self.directory = directory
+        self.max_size = max_size
+        self.max_item_size = max_item_size
+        # the total size of the cached files, as far as this process knows
+        self.size = None
+        self._lock = threading.Lock()
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+
+    def _path(self, digest):
+        """The path of the cached data with md5 `digest`"""
+        return os.path.join(self.directory, digest)
+
+    def accepts(self, content):
+        """
+        Returns True if the data of `content` should be stored in this cache
+        """
+        digest = getattr(content, 'content_digest', None)
+        return digest is not None and content.length is not None and content.length <= self.max_item_size
+
+    def open(self, digest):
+        """
+        Returns a file open on the cached data with md5 `digest`, or None if it isn't cached
+        """
+        path = self._path(digest)
+        try:
+            cached_file = open(path, 'rb')
+        except IOError:
+            return None
+
+        # record that the file was used, for eviction
+        try:
+            os.utime(path, None)
+        except OSError:
+            pass
+        return cached_file
+
+    def write_through(self, digest, chunks):
+        """
+        Yields `chunks`, the data with md5 `digest`, while writing them to the cache.
+        The data is only added to the cache if all of the chunks are consumed.
+        """
+        handle, temp_path = tempfile.mkstemp(dir=self.directory, prefix='.tmp')
+        completed = False
+        written = 0
+        try:
+            with os.fdopen(handle, 'wb') as temp_file:
+                for chunk in chunks:
+                    temp_file.write(chunk)
+                    written += len(chunk)
+                    yield chunk
+            os.rename(temp_path, self._path(digest))
+            completed = True
+        finally:
+            if not completed:
+                _remove(temp_path)
+
+        with self._lock:
+            if self.size is not None:
+                self.size += written
+            needs_eviction = self.size is None or self.size > self.max_size
+        if needs_eviction:
+            self._evict()
+
+    def _evict(self):
+        """
+        Delete the least recently used files until the cache fits in max_size, less
+        EVICTION_HEADROOM, and record the size of what's left
+        """
+        target_size = self.max_size * (1 - EVICTION_HEADROOM)
+        entries = []
+        total_size = 0
+        for name in os.listdir(self.directory):
+            if name.startswith('.tmp'):
+                continue
+            try:
+                stat = os.stat(os.path.join(self.directory, name))
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, name))
+            total_size += stat.st_size
+
+        if total_size > self.max_size:
+            for _, size, name in sorted(entries):
+                if total_size <= target_size:
+                    break
+                _remove(os.path.join(self.directory, name))
+                total_size -= size
+
+        with self._lock:
+            self.size = total_size
+
+
+def _remove(path):
+    """Delete the file at path, if it exists"""
+    try:
+        os.remove(path)
+    except OSError as err:
+        if err.errno != errno.ENOENT:
+            log.warning("Unable to remove cached content %s", path, exc_info=True)
@@ -1,5 +1,10 @@
+import calendar
+import re
+
+from django.conf import settings
 from django.http import (HttpResponse, HttpResponseNotModified,
     HttpResponseForbidden)
+from django.utils.http import http_date, parse_http_date_safe
 from student.models import CourseEnrollment
 
 from xmodule.contentstore.django import contentstore
@@ -8,8 +13,57 @@ from xmodule.modulestore import InvalidLocationError
 from cache_toolbox.core import get_cached_content, set_cached_content
 from xmodule.exceptions import NotFoundError
 
+from contentserver.disk_cache import DiskContentCache
+
+# Assets smaller than this are read into memory and cached in memcache
+MEMCACHE_MAX_SIZE = 1048576
+
+# Matches a single byte range, e.g. "bytes=0-99", "bytes=100-" or "bytes=-100"
+BYTE_RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+def parse_byte_range(header, length):
+    """
+    Returns the (first_byte, last_byte) requested by the Range header `header` of a request
+    for content of `length` bytes, None if the whole content should be served (no range,
+    or a range this server doesn't support, such as multiple ranges), or False if the range
+    can't be satisfied.
+    """
+    match = BYTE_RANGE_RE.match(header.strip())
+    if match is None:
+        return None
+
+    first, last = match.groups()
+    if not first and not last:
+        return None
+    if not first:
+        # a suffix range: the last `last` bytes
+        if int(last) == 0:
+            return False
+        return max(length - int(last), 0), length - 1
+
+    first = int(first)
+    if first >= length:
+        return False
+    last = int(last) if last else length - 1
+    if first > last:
+        return None
+    return first, min(last, length - 1)
+
 
 class StaticContentServer(object):
+    def __init__(self):
+        # the optional local disk tier, between memcache and the contentstore
+        disk_cache_settings = getattr(settings, 'STATIC_CONTENT_DISK_CACHE', None)
+        if disk_cache_settings:
+            self.disk_cache = DiskContentCache(
+                disk_cache_settings['DIRECTORY'],
+                disk_cache_settings['MAX_SIZE'],
+                disk_cache_settings.get('MAX_ITEM_SIZE', MEMCACHE_MAX_SIZE * 100),
+            )
+        else:
+            self.disk_cache = None
+
     def process_request(self, request):
         # look to see if the request is prefixed with 'c4x' tag
         if request.path.startswith('/' + XASSET_LOCATION_TAG + '/'):
@@ -23,6 +77,7 @@ class StaticContentServer(object):
 
             # first look in our cache so we don't have to round-trip to the DB
             content = get_cached_content(loc)
+            from_disk_cache = False
             if content is None:
                 # nope, not in cache, let's fetch from DB
                 try:
@@ -34,11 +89,18 @@ class StaticContentServer(object):
 
                 # since we fetched it from DB, let's cache it going forward, but only if it's < 1MB
                 # this is because I haven't been able to find a means to stream data out of memcached
-                if content.length is not None:
-                    if content.length < 1048576:
-                        # since we've queried as a stream, let's read in the stream into memory to set in cache
-                        content = content.copy_to_in_mem()
-                        set_cached_content(content)
+                if content.length is not None and content.length < MEMCACHE_MAX_SIZE:
+                    # since we've queried as a stream, let's read in the stream into memory to set in cache
+                    content = content.copy_to_in_mem()
+                    set_cached_content(content)
+                elif self.disk_cache is not None and self.disk_cache.accepts(content):
+                    # only the metadata of the file has been read from the DB so far, so if the data
+                    # is in the disk cache, we can read it from there instead
+                    cached_file = self.disk_cache.open(content.content_digest)
+                    if cached_file is not None:
+                        content.close()
+                        content = content.copy_with_stream(cached_file)
+                        from_disk_cache = True
             else:
                 # NOP here, but we may wish to add a "cache-hit" counter in the future
                 pass
@@ -46,24 +108,91 @@ class StaticContentServer(object):
             # Check that user has access to content
             if getattr(content, "locked", False):
                 if not hasattr(request, "user") or not request.user.is_authenticated():
+                    _close(content)
                     return HttpResponseForbidden('Unauthorized')
                 course_partial_id = "/".join([loc.org, loc.course])
                 if not request.user.is_staff and not CourseEnrollment.is_enrolled_by_partial(
                         request.user, course_partial_id):
+                    _close(content)
                     return HttpResponseForbidden('Unauthorized')
 
-            # convert over the DB persistent last modified timestamp to a HTTP compatible
-            # timestamp, so we can simply compare the strings
-            last_modified_at_str = content.last_modified_at.strftime("%a, %d-%b-%Y %H:%M:%S GMT")
+            # convert over the DB persistent last modified timestamp to a HTTP compatible timestamp
+            last_modified_at = calendar.timegm(content.last_modified_at.utctimetuple())
+            last_modified_at_str = http_date(last_modified_at)
+            # getattr b/c caching may mean some pickled instances don't have attr
+            digest = getattr(content, 'content_digest', None)
+            etag = '"{0}"'.format(digest) if digest else None
+
+            # see if the client has cached this content, if so then just return a 304 (Not Modified)
+            if self._is_not_modified(request, etag, last_modified_at):
+                _close(content)
+                response = HttpResponseNotModified()
+                if etag:
+                    response['ETag'] = etag
+                return response
+
+            length = content.length
+            if length is None and content.data is not None:
+                length = len(content.data)
+
+            byte_range = None
+            if length is not None and 'HTTP_RANGE' in request.META:
+                # If-Range makes the range conditional on the content being unchanged
+                if_range = request.META.get('HTTP_IF_RANGE')
+                if if_range is None or if_range in (etag, last_modified_at_str):
+                    byte_range = parse_byte_range(request.META['HTTP_RANGE'], length)
 
-            # see if the client has cached this content, if so then compare the
-            # timestamps, if they are the same then just return a 304 (Not Modified)
-            if 'HTTP_IF_MODIFIED_SINCE' in request.META:
-                if_modified_since = request.META['HTTP_IF_MODIFIED_SINCE']
-                if if_modified_since == last_modified_at_str:
-                    return HttpResponseNotModified()
+            if byte_range is False:
+                _close(content)
+                response = HttpResponse(status=416)
+                response['Content-Range'] = 'bytes */{0}'.format(length)
+                return response
+            elif byte_range is not None:
+                first_byte, last_byte = byte_range
+                response = HttpResponse(
+                    content.stream_data_in_range(first_byte, last_byte), content_type=content.content_type
+                )
+                response.status_code = 206
+                response['Content-Range'] = 'bytes {0}-{1}/{2}'.format(first_byte, last_byte, length)
+                response['Content-Length'] = last_byte - first_byte + 1
+            else:
+                data = content.stream_data()
+                if not from_disk_cache and self.disk_cache is not None and self.disk_cache.accepts(content):
+                    data = self.disk_cache.write_through(content.content_digest, data)
+                response = HttpResponse(data, content_type=content.content_type)
+                if length is not None:
+                    response['Content-Length'] = length
 
-            response = HttpResponse(content.stream_data(), content_type=content.content_type)
             response['Last-Modified'] = last_modified_at_str
+            response['Accept-Ranges'] = 'bytes'
+            if etag:
+                response['ETag'] = etag
 
             return response
+
+    def _is_not_modified(self, request, etag, last_modified_at):
+        """
+        Returns True if the client's cached copy of the content, identified by the
+        If-None-Match or If-Modified-Since headers of request, is up to date
+        """
+        if_none_match = request.META.get('HTTP_IF_NONE_MATCH')
+        if if_none_match is not None:
+            return etag is not None and (
+                if_none_match.strip() == '*' or etag in [tag.strip() for tag in if_none_match.split(',')]
+            )
+
+        if_modified_since = request.META.get('HTTP_IF_MODIFIED_SINCE')
+        if if_modified_since is not None:
+            if_modified_since = parse_http_date_safe(if_modified_since.split(';')[0])
+            return if_modified_since is not None and last_modified_at <= if_modified_since
+
+        return False
+
+
+def _close(content):
+    """
+    Close the stream of `content`, if it was opened on one, when its data won't be served
+    """
+    close = getattr(content, 'close', None)
+    if close is not None:
+        close()
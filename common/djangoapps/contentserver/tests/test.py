@@ -134,3 +134,43 @@ class ContentStoreToyCourseTest(ModuleStoreTestCase):
         resp = self.client.get(self.url_locked)
         self.assertEqual(resp.status_code, 200) #pylint: disable=E1103
 
+    def test_range_request(self):
+        """
+        Test that a range request is served the requested bytes of the asset.
+        """
+        full = self.client.get(self.url_unlocked)
+        length = int(full['Content-Length'])
+
+        resp = self.client.get(self.url_unlocked, HTTP_RANGE='bytes=10-19')
+        self.assertEqual(resp.status_code, 206) #pylint: disable=E1103
+        self.assertEqual(resp['Content-Range'], 'bytes 10-19/{0}'.format(length))
+        self.assertEqual(resp['Content-Length'], '10')
+        self.assertEqual(resp.content, full.content[10:20]) #pylint: disable=E1103
+
+        resp = self.client.get(self.url_unlocked, HTTP_RANGE='bytes=-5')
+        self.assertEqual(resp.status_code, 206) #pylint: disable=E1103
+        self.assertEqual(resp.content, full.content[-5:]) #pylint: disable=E1103
+
+    def test_unsatisfiable_range_request(self):
+        """
+        Test that a range request beyond the end of the asset is rejected.
+        """
+        resp = self.client.get(self.url_unlocked, HTTP_RANGE='bytes=100000-')
+        self.assertEqual(resp.status_code, 416) #pylint: disable=E1103
+
+    def test_conditional_request(self):
+        """
+        Test that an asset isn't sent again to clients with an up to date copy.
+        """
+        resp = self.client.get(self.url_unlocked)
+        self.assertIn('ETag', resp)
+
+        resp = self.client.get(self.url_unlocked, HTTP_IF_NONE_MATCH=resp['ETag'])
+        self.assertEqual(resp.status_code, 304) #pylint: disable=E1103
+
+        resp = self.client.get(self.url_unlocked, HTTP_IF_NONE_MATCH='"stale"')
+        self.assertEqual(resp.status_code, 200) #pylint: disable=E1103
+
+        last_modified = self.client.get(self.url_unlocked)['Last-Modified']
+        resp = self.client.get(self.url_unlocked, HTTP_IF_MODIFIED_SINCE=last_modified)
+        self.assertEqual(resp.status_code, 304) #pylint: disable=E1103
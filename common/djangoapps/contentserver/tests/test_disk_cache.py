@@ -0,0 +1,132 @@
+"""
+Tests for DiskContentCache
+"""
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+
+from mock import Mock, patch
+
+from contentserver import disk_cache
+from contentserver.disk_cache import DiskContentCache
+
+
+class DiskContentCacheTest(unittest.TestCase):
+    """
+    Tests for the on-disk static content cache
+    """
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        self.cache = DiskContentCache(self.directory, max_size=100, max_item_size=50)
+
+    def _write(self, digest, data, chunk_size=10):
+        """Write `data` to the cache through a fully consumed write_through"""
+        chunks = [data[i:i + chunk_size] for i in range(0, len(data), chunk_size)]
+        self.assertEqual(''.join(self.cache.write_through(digest, chunks)), data)
+
+    def _read(self, digest):
+        """The cached data with md5 `digest`, or None"""
+        cached_file = self.cache.open(digest)
+        if cached_file is None:
+            return None
+        with cached_file:
+            return cached_file.read()
+
+    def _age(self, digest, mtime):
+        """Set the last use of the cached `digest` to `mtime`"""
+        os.utime(os.path.join(self.directory, digest), (mtime, mtime))
+
+    def test_miss(self):
+        self.assertIsNone(self.cache.open('missing'))
+
+    def test_hit(self):
+        self._write('digest', 'a' * 25)
+        self.assertEqual(self._read('digest'), 'a' * 25)
+        self.assertEqual(self.cache.size, 25)
+
+    def test_hit_records_use(self):
+        self._write('digest', 'a' * 25)
+        self._age('digest', 1000)
+        self._read('digest')
+        self.assertGreater(os.path.getmtime(os.path.join(self.directory, 'digest')), 1000)
+
+    def test_partially_consumed(self):
+        chunks = self.cache.write_through('digest', ['a' * 10, 'b' * 10])
+        self.assertEqual(next(chunks), 'a' * 10)
+        chunks.close()
+        self.assertIsNone(self.cache.open('digest'))
+        self.assertEqual(os.listdir(self.directory), [])
+
+    def test_accepts(self):
+        self.assertTrue(self.cache.accepts(Mock(content_digest='digest', length=50)))
+        self.assertFalse(self.cache.accepts(Mock(content_digest='digest', length=51)))
+        self.assertFalse(self.cache.accepts(Mock(content_digest='digest', length=None)))
+        self.assertFalse(self.cache.accepts(Mock(content_digest=None, length=10)))
+
+    def test_eviction(self):
+        for index, digest in enumerate(['first', 'second', 'third', 'fourth']):
+            self._write(digest, 'a' * 25)
+            self._age(digest, 1000 + index)
+        # a hit makes 'first' the most recently used
+        self._age('first', 2000)
+
+        self._write('fifth', 'a' * 25)
+        # the least recently used files are evicted until the cache is back
+        # under max_size, less the headroom
+        self.assertIsNone(self.cache.open('second'))
+        self.assertIsNone(self.cache.open('third'))
+        for digest in ['first', 'fourth', 'fifth']:
+            self.assertEqual(self._read(digest), 'a' * 25)
+        self.assertEqual(self.cache.size, 75)
+
+    def test_eviction_is_incremental(self):
+        real_listdir = os.listdir
+        with patch.object(disk_cache.os, 'listdir', Mock(side_effect=real_listdir)) as listdir:
+            for index in range(3):
+                self._write('digest%d' % index, 'a' * 30)
+            # the directory is only listed to find the size on the first write
+            self.assertEqual(listdir.call_count, 1)
+
+            self._write('digest3', 'a' * 30)
+            self.assertEqual(listdir.call_count, 2)
+        self.assertEqual(self.cache.size, 90)
+
+    def test_eviction_counts_other_writers(self):
+        self._write('digest0', 'a' * 30)
+        other_cache = DiskContentCache(self.directory, max_size=100, max_item_size=50)
+        self.assertEqual(''.join(other_cache.write_through('other', ['b' * 50])), 'b' * 50)
+
+        for index in range(1, 4):
+            self._write('digest%d' % index, 'a' * 30)
+        # the eviction found the other process's file
+        sizes = [os.path.getsize(os.path.join(self.directory, name)) for name in os.listdir(self.directory)]
+        self.assertEqual(self.cache.size, sum(sizes))
+        self.assertLessEqual(self.cache.size, 90)
+
+    def test_concurrent_writes(self):
+        errors = []
+
+        def write(digest, data):
+            """Write `data` from a thread, recording any failure"""
+            try:
+                self._write(digest, data, chunk_size=1)
+            except Exception as err:  # pylint: disable=broad-except
+                errors.append(err)
+
+        threads = [
+            threading.Thread(target=write, args=('digest%d' % (index % 2), str(index % 2) * 20))
+            for index in range(10)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(errors, [])
+        self.assertEqual(self._read('digest0'), '0' * 20)
+        self.assertEqual(self._read('digest1'), '1' * 20)
+        # no temporary files are left behind
+        self.assertEqual(sorted(os.listdir(self.directory)), ['digest0', 'digest1'])
@@ -1,3 +1,4 @@
+import hashlib
 import logging
 import re
 
@@ -7,10 +8,23 @@ from django.conf import settings
 
 from xmodule.modulestore.django import modulestore
 from xmodule.modulestore import XML_MODULESTORE_TYPE
+from xmodule.modulestore.lru_cache import LRUCache
 from xmodule.contentstore.content import StaticContent
 
 log = logging.getLogger(__name__)
 
+# Compiled url replacement regexes, by prefix
+_URL_REPLACE_REGEXES = LRUCache(100)
+
+# The rewritten forms of the /static/ urls seen so far, by
+# (url, data_directory, course_id, static_asset_path). They only depend on
+# the contents of staticfiles_storage and on where the course is stored,
+# neither of which changes while the process is running.
+_STATIC_URLS = LRUCache(10000)
+
+# Text rewritten by replace_urls, by the md5 of the text and the arguments it was rewritten with
+_REWRITTEN_TEXT = LRUCache(max(getattr(settings, 'REWRITTEN_URLS_CACHE_SIZE', 0), 1))
+
 
 def _url_replace_regex(prefix):
     """
@@ -28,6 +42,35 @@ def _url_replace_regex(prefix):
         """.format(prefix=prefix)
 
 
+def _compiled_url_replace_regex(prefix):
+    """
+    Return the compiled form of _url_replace_regex(prefix)
+    """
+    regex = _URL_REPLACE_REGEXES.get(prefix)
+    if regex is None:
+        regex = re.compile(_url_replace_regex(prefix))
+        _URL_REPLACE_REGEXES.set(prefix, regex)
+    return regex
+
+
+def _static_prefix(data_directory, static_asset_path):
+    """
+    The prefix of the /static/ urls that replace_static_urls rewrites
+    """
+    return '(?:{static_url}|/static/)(?!{data_dir})'.format(
+        static_url=settings.STATIC_URL,
+        data_dir=static_asset_path or data_directory
+    )
+
+
+def clear_url_caches():
+    """
+    Forget all of the rewritten urls and text, e.g. because the contents of staticfiles_storage changed
+    """
+    _STATIC_URLS.clear()
+    _REWRITTEN_TEXT.clear()
+
+
 def try_staticfiles_lookup(path):
     """
     Try to lookup a path in staticfiles_storage.  If it fails, return
@@ -69,7 +112,7 @@ def replace_jump_to_id_urls(text, course_id, jump_to_id_base_url):
         rest = match.group('rest')
         return "".join([quote, jump_to_id_base_url + rest, quote])
 
-    return re.sub(_url_replace_regex('/jump_to_id/'), replace_jump_to_id_url, text)
+    return _compiled_url_replace_regex('/jump_to_id/').sub(replace_jump_to_id_url, text)
 
 
 def replace_course_urls(text, course_id):
@@ -87,7 +130,7 @@ def replace_course_urls(text, course_id):
         rest = match.group('rest')
         return "".join([quote, '/courses/' + course_id + '/', rest, quote])
 
-    return re.sub(_url_replace_regex('/course/'), replace_course_url, text)
+    return _compiled_url_replace_regex('/course/').sub(replace_course_url, text)
 
 
 def replace_static_urls(text, data_directory, course_id=None, static_asset_path=''):
@@ -102,6 +145,61 @@ def replace_static_urls(text, data_directory, course_id=None, static_asset_path=
     course_id: The course identifier used to distinguish static content for this course in studio
     static_asset_path: Path for static assets, which overrides data_directory and course_namespace, if nonempty
     """
+    replace_static_url = _static_url_replacer(data_directory, course_id, static_asset_path)
+    return _compiled_url_replace_regex(_static_prefix(data_directory, static_asset_path)).sub(
+        replace_static_url,
+        text
+    )
+
+
+def replace_urls(text, data_directory, course_id, jump_to_id_base_url, static_asset_path=''):
+    """
+    Apply replace_static_urls, replace_course_urls and replace_jump_to_id_urls to `text`
+    in a single pass.
+
+    If settings.REWRITTEN_URLS_CACHE_SIZE is positive, that many of the most recently
+    rewritten texts are remembered, so that identical html (e.g. the same block rendered
+    for many students) is only rewritten once.
+    """
+    cache_key = None
+    if getattr(settings, 'REWRITTEN_URLS_CACHE_SIZE', 0) > 0 and not settings.DEBUG:
+        cache_key = (
+            hashlib.md5(text.encode('utf-8') if isinstance(text, unicode) else text).hexdigest(),
+            data_directory, course_id, jump_to_id_base_url, static_asset_path,
+        )
+        rewritten = _REWRITTEN_TEXT.get(cache_key)
+        if rewritten is not None:
+            return rewritten
+
+    replace_static_url = _static_url_replacer(data_directory, course_id, static_asset_path)
+
+    def replace_url(match):
+        prefix = match.group('prefix')
+        if prefix == '/course/':
+            quote = match.group('quote')
+            return "".join([quote, '/courses/' + course_id + '/', match.group('rest'), quote])
+        elif prefix == '/jump_to_id/':
+            quote = match.group('quote')
+            return "".join([quote, jump_to_id_base_url + match.group('rest'), quote])
+        else:
+            return replace_static_url(match)
+
+    regex = _compiled_url_replace_regex('{static}|/course/|/jump_to_id/'.format(
+        static=_static_prefix(data_directory, static_asset_path)
+    ))
+    rewritten = regex.sub(replace_url, text)
+
+    if cache_key is not None:
+        _REWRITTEN_TEXT.set(cache_key, rewritten)
+    return rewritten
+
+
+def _static_url_replacer(data_directory, course_id, static_asset_path):
+    """
+    Return the function used by replace_static_urls to rewrite each matched url
+    """
+    # looked up lazily, and only once per text
+    is_xml_course = []
 
     def replace_static_url(match):
         original = match.group(0)
@@ -116,8 +214,19 @@ def replace_static_urls(text, data_directory, course_id=None, static_asset_path=
         # In debug mode, if we can find the url as is,
         if settings.DEBUG and finders.find(rest, True):
             return original
+
+        cache_key = (prefix, rest, data_directory, course_id, static_asset_path)
+        url = _STATIC_URLS.get(cache_key)
+        if url is not None:
+            return "".join([quote, url, quote])
+
+        # urls guessed after a storage error aren't cached, so the lookup is retried
+        cacheable = True
+        if (not static_asset_path) and course_id and not is_xml_course:
+            is_xml_course.append(modulestore().get_modulestore_type(course_id) == XML_MODULESTORE_TYPE)
+
         # if we're running with a MongoBacked store course_namespace is not None, then use studio style urls
-        elif (not static_asset_path) and course_id and modulestore().get_modulestore_type(course_id) != XML_MODULESTORE_TYPE:
+        if (not static_asset_path) and course_id and not is_xml_course[0]:
             # first look in the static file pipeline and see if we are trying to reference
             # a piece of static content which is in the mitx repo (e.g. JS associated with an xmodule)
 
@@ -127,6 +236,7 @@ def replace_static_urls(text, data_directory, course_id=None, static_asset_path=
             except Exception as err:
                 log.warning("staticfiles_storage couldn't find path {0}: {1}".format(
                     rest, str(err)))
+                cacheable = False
 
             if exists_in_staticfiles_storage:
                 url = staticfiles_storage.url(rest)
@@ -148,14 +258,10 @@ def replace_static_urls(text, data_directory, course_id=None, static_asset_path=
                 log.warning("staticfiles_storage couldn't find path {0}: {1}".format(
                     rest, str(err)))
                 url = "".join([prefix, course_path])
+                cacheable = False
 
+        if cacheable and not settings.DEBUG:
+            _STATIC_URLS.set(cache_key, url)
         return "".join([quote, url, quote])
 
-    return re.sub(
-        _url_replace_regex('(?:{static_url}|/static/)(?!{data_dir})'.format(
-            static_url=settings.STATIC_URL,
-            data_dir=static_asset_path or data_directory
-        )),
-        replace_static_url,
-        text
-    )
+    return replace_static_url
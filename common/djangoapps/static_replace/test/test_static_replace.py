@@ -1,10 +1,10 @@
 import re
 
-from nose.tools import assert_equals, assert_true, assert_false  # pylint: disable=E0611
-from static_replace import (replace_static_urls, replace_course_urls,
-                            _url_replace_regex)
+from nose.tools import assert_equals, assert_true, assert_false, with_setup  # pylint: disable=E0611
+from static_replace import (replace_static_urls, replace_course_urls, replace_jump_to_id_urls,
+                            replace_urls, clear_url_caches, _url_replace_regex)
 from mock import patch, Mock
-from xmodule.modulestore import Location
+from xmodule.modulestore import Location, XML_MODULESTORE_TYPE
 from xmodule.modulestore.mongo import MongoModuleStore
 from xmodule.modulestore.xml import XMLModuleStore
 
@@ -13,6 +13,7 @@ COURSE_ID = 'org/course/run'
 STATIC_SOURCE = '"/static/file.png"'
 
 
+@with_setup(clear_url_caches)
 def test_multi_replace():
     course_source = '"/course/file.png"'
 
@@ -26,6 +27,7 @@ def test_multi_replace():
     )
 
 
+@with_setup(clear_url_caches)
 @patch('static_replace.staticfiles_storage')
 def test_storage_url_exists(mock_storage):
     mock_storage.exists.return_value = True
@@ -36,6 +38,7 @@ def test_storage_url_exists(mock_storage):
     mock_storage.url.called_once_with('data_dir/file.png')
 
 
+@with_setup(clear_url_caches)
 @patch('static_replace.staticfiles_storage')
 def test_storage_url_not_exists(mock_storage):
     mock_storage.exists.return_value = False
@@ -46,6 +49,7 @@ def test_storage_url_not_exists(mock_storage):
     mock_storage.url.called_once_with('file.png')
 
 
+@with_setup(clear_url_caches)
 @patch('static_replace.StaticContent')
 @patch('static_replace.modulestore')
 def test_mongo_filestore(mock_modulestore, mock_static_content):
@@ -65,6 +69,7 @@ def test_mongo_filestore(mock_modulestore, mock_static_content):
     mock_static_content.convert_legacy_static_url_with_course_id.assert_called_once_with('file.png', COURSE_ID)
 
 
+@with_setup(clear_url_caches)
 @patch('static_replace.settings')
 @patch('static_replace.modulestore')
 @patch('static_replace.staticfiles_storage')
@@ -79,6 +84,7 @@ def test_data_dir_fallback(mock_storage, mock_modulestore, mock_settings):
     assert_equals('"/static/data_dir/file.png"', replace_static_urls(STATIC_SOURCE, DATA_DIRECTORY))
 
 
+@with_setup(clear_url_caches)
 def test_raw_static_check():
     """
     Make sure replace_static_urls leaves alone things that end in '.raw'
@@ -108,3 +114,46 @@ def test_regex():
     for s in no:
         print 'Should not match: {0!r}'.format(s)
         assert_false(re.match(regex, s))
+
+
+@with_setup(clear_url_caches)
+@patch('static_replace.staticfiles_storage')
+def test_storage_lookups_memoized(mock_storage):
+    mock_storage.exists.return_value = True
+    mock_storage.url.return_value = '/static/file.png'
+
+    for _ in range(2):
+        assert_equals('"/static/file.png"', replace_static_urls(STATIC_SOURCE, DATA_DIRECTORY))
+    mock_storage.exists.assert_called_once_with('file.png')
+    mock_storage.url.assert_called_once_with('file.png')
+
+
+@with_setup(clear_url_caches)
+@patch('static_replace.staticfiles_storage')
+def test_storage_errors_not_memoized(mock_storage):
+    mock_storage.exists.side_effect = Exception
+    assert_equals('"/static/data_dir/file.png"', replace_static_urls(STATIC_SOURCE, DATA_DIRECTORY))
+
+    # once the storage recovers, its url is used instead of the fallback
+    mock_storage.exists.side_effect = None
+    mock_storage.exists.return_value = True
+    mock_storage.url.return_value = '/static/file.abc123.png'
+    assert_equals('"/static/file.abc123.png"', replace_static_urls(STATIC_SOURCE, DATA_DIRECTORY))
+
+
+@with_setup(clear_url_caches)
+@patch('static_replace.modulestore')
+@patch('static_replace.staticfiles_storage')
+def test_replace_urls(mock_storage, mock_modulestore):
+    mock_modulestore.return_value.get_modulestore_type.return_value = XML_MODULESTORE_TYPE
+    mock_storage.exists.return_value = False
+    mock_storage.url.return_value = '/static/data_dir/file.png'
+    jump_to_id_base_url = '/courses/org/course/run/jump_to_id/'
+    source = '<a href="/course/info"><img src="/static/file.png"/><a href=\'/jump_to_id/intro\'>'
+
+    expected = replace_jump_to_id_urls(
+        replace_course_urls(replace_static_urls(source, DATA_DIRECTORY, COURSE_ID), COURSE_ID),
+        COURSE_ID,
+        jump_to_id_base_url
+    )
+    assert_equals(expected, replace_urls(source, DATA_DIRECTORY, COURSE_ID, jump_to_id_base_url))
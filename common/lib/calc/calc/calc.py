@@ -7,6 +7,9 @@ Uses pyparsing to parse. Main function as of now is evaluator().
 import math
 import operator
 import numbers
+import threading
+from collections import OrderedDict
+
 import numpy
 import scipy.constants
 import functions
@@ -72,6 +75,14 @@ SUFFIXES = {
     'c': 1e-2, 'm': 1e-3, 'u': 1e-6, 'n': 1e-9, 'p': 1e-12
 }
 
+# How many parsed expressions are kept by parse_expression
+PARSE_CACHE_SIZE = 1000
+
+# The ParseAugmenters of the parsed expressions, by (math_expr, case_sensitive),
+# least recently used first
+_parse_cache = OrderedDict()
+_parse_cache_lock = threading.Lock()
+
 
 class UndefinedVariable(Exception):
     """
@@ -121,8 +132,8 @@ def eval_atom(parse_result):
 
     In the case of parenthesis, ignore them.
     """
-    # Find first number in the list
-    result = next(k for k in parse_result if isinstance(k, numbers.Number))
+    # Find first number (or array of numbers) in the list
+    result = next(k for k in parse_result if not isinstance(k, basestring))
     return result
 
 
@@ -136,7 +147,7 @@ def eval_power(parse_result):
     # `reduce` will go from left to right; reverse the list.
     parse_result = reversed(
         [k for k in parse_result
-         if isinstance(k, numbers.Number)]  # Ignore the '^' marks.
+         if not isinstance(k, basestring)]  # Ignore the '^' marks.
     )
     # Having reversed it, raise `b` to the power of `a`.
     power = reduce(lambda a, b: b ** a, parse_result)
@@ -173,12 +184,12 @@ def eval_sum(parse_result):
     total = 0.0
     current_op = operator.add
     for token in parse_result:
-        if token == '+':
+        if not isinstance(token, basestring):
+            total = current_op(total, token)
+        elif token == '+':
             current_op = operator.add
         elif token == '-':
             current_op = operator.sub
-        else:
-            total = current_op(total, token)
     return total
 
 
@@ -191,12 +202,12 @@ def eval_product(parse_result):
     prod = 1.0
     current_op = operator.mul
     for token in parse_result:
-        if token == '*':
+        if not isinstance(token, basestring):
+            prod = current_op(prod, token)
+        elif token == '*':
             current_op = operator.mul
         elif token == '/':
             current_op = operator.truediv
-        else:
-            prod = current_op(prod, token)
     return prod
 
 
@@ -216,6 +227,30 @@ def add_defaults(variables, functions, case_sensitive):
     return (all_variables, all_functions)
 
 
+def parse_expression(math_expr, case_sensitive=False):
+    """
+    Return a ParseAugmenter which has parsed `math_expr`.
+
+    The most recently used expressions are kept, so that each is only parsed
+    once. The ParseAugmenters are shared, so don't modify them.
+    """
+    key = (math_expr, case_sensitive)
+    with _parse_cache_lock:
+        math_interpreter = _parse_cache.pop(key, None)
+        if math_interpreter is not None:
+            _parse_cache[key] = math_interpreter
+            return math_interpreter
+
+    math_interpreter = ParseAugmenter(math_expr, case_sensitive)
+    math_interpreter.parse_algebra()
+
+    with _parse_cache_lock:
+        _parse_cache[key] = math_interpreter
+        while len(_parse_cache) > PARSE_CACHE_SIZE:
+            _parse_cache.popitem(last=False)
+    return math_interpreter
+
+
 def evaluator(variables, functions, math_expr, case_sensitive=False):
     """
     Evaluate an expression; that is, take a string of math and return a float.
@@ -229,8 +264,79 @@ def evaluator(variables, functions, math_expr, case_sensitive=False):
         return float('nan')
 
     # Parse the tree.
-    math_interpreter = ParseAugmenter(math_expr, case_sensitive)
-    math_interpreter.parse_algebra()
+    math_interpreter = parse_expression(math_expr, case_sensitive)
+
+    return evaluate_tree(math_interpreter, variables, functions)
+
+
+def evaluate_samples(variables_list, functions, math_expr, case_sensitive=False):
+    """
+    Evaluate an expression for each dictionary of variables in `variables_list`;
+    return the list of results, as `evaluator` would give them.
+
+    The expression is parsed once, and evaluated once over NumPy arrays of the
+    values of each variable. If that fails, or might differ from evaluating
+    each sample (e.g. a sample divides by zero or is outside a function's
+    domain), each sample is evaluated separately instead, so that the results
+    and errors are the same as `evaluator`'s.
+    """
+    # No need to go further.
+    if math_expr.strip() == "":
+        return [float('nan')] * len(variables_list)
+
+    math_interpreter = parse_expression(math_expr, case_sensitive)
+
+    results = None
+    # Custom functions may not accept arrays.
+    if len(variables_list) > 1 and not functions:
+        results = _evaluate_vectorized(math_interpreter, variables_list)
+    if results is None:
+        results = [evaluate_tree(math_interpreter, variables, functions)
+                   for variables in variables_list]
+    return results
+
+
+def _evaluate_vectorized(math_interpreter, variables_list):
+    """
+    Evaluate the expression parsed by `math_interpreter` over arrays of the
+    samples of each variable. Return the list of results, or None if the
+    samples need to be evaluated separately.
+    """
+    names = set(variables_list[0])
+    if any(set(sample) != names for sample in variables_list):
+        return None
+
+    variables = {}
+    for name in names:
+        values = [sample[name] for sample in variables_list]
+        # Arrays of ints would overflow, and divide or raise to powers
+        # differently, from Python's ints.
+        if not all(isinstance(value, (float, complex)) for value in values):
+            return None
+        variables[name] = numpy.array(values)
+
+    try:
+        # Raise where numpy would only warn, so that we fall back to evaluating
+        # each sample.
+        with numpy.errstate(all='raise'):
+            results = numpy.asarray(evaluate_tree(math_interpreter, variables, {}))
+    except Exception:  # pylint: disable=broad-except
+        return None
+
+    if results.shape == ():
+        # The expression doesn't depend on the samples.
+        results = numpy.repeat(results, len(variables_list))
+    if results.shape != (len(variables_list),):
+        return None
+    return results.tolist()
+
+
+def evaluate_tree(math_interpreter, variables, functions):
+    """
+    Evaluate the expression parsed by the ParseAugmenter `math_interpreter`,
+    with `variables` and `functions` as in `evaluator`.
+    """
+    case_sensitive = math_interpreter.case_sensitive
 
     # Get our variables together.
     all_variables, all_functions = add_defaults(variables, functions, case_sensitive)
@@ -5,6 +5,7 @@ Unit tests for calc.py
 import unittest
 import numpy
 import calc
+from calc import calc as calc_module
 from pyparsing import ParseException
 
 # numpy's default behavior when it evaluates a function outside its domain
@@ -558,3 +559,109 @@ class EvaluatorTest(unittest.TestCase):
             calc.evaluator({'r1': 5}, {}, "r1+r2")
         with self.assertRaisesRegexp(calc.UndefinedVariable, 'r1 r3'):
             calc.evaluator(variables, {}, "r1*r3", case_sensitive=True)
+
+
+class EvaluateSamplesTest(unittest.TestCase):
+    """
+    Run tests for calc.parse_expression and calc.evaluate_samples
+    """
+    def setUp(self):
+        calc_module._parse_cache.clear()  # pylint: disable=protected-access
+
+    def assert_samples_equal(self, expression, variables_list, case_sensitive=False):
+        """
+        Check that evaluate_samples gives what evaluator gives for each sample
+        """
+        expected = [
+            calc.evaluator(variables, {}, expression, case_sensitive=case_sensitive)
+            for variables in variables_list
+        ]
+        results = calc.evaluate_samples(variables_list, {}, expression, case_sensitive=case_sensitive)
+        self.assertEqual(len(results), len(expected))
+        for result, value in zip(results, expected):
+            if numpy.isnan(value):
+                self.assertTrue(numpy.isnan(result))
+            else:
+                self.assertAlmostEqual(result, value)
+
+    def test_parse_cache(self):
+        parsed = calc.parse_expression('x^2 + 1')
+        self.assertIs(calc.parse_expression('x^2 + 1'), parsed)
+        self.assertIsNot(calc.parse_expression('x^2 + 1', case_sensitive=True), parsed)
+        self.assertIsNot(calc.parse_expression('x^2 + 2'), parsed)
+
+    def test_parse_cache_size(self):
+        old_size, calc_module.PARSE_CACHE_SIZE = calc_module.PARSE_CACHE_SIZE, 2
+        try:
+            first = calc.parse_expression('1')
+            calc.parse_expression('2')
+            self.assertIs(calc.parse_expression('1'), first)
+            calc.parse_expression('3')
+            # '2' was the least recently used
+            self.assertEqual(len(calc_module._parse_cache), 2)  # pylint: disable=protected-access
+            self.assertNotIn(('2', False), calc_module._parse_cache)  # pylint: disable=protected-access
+            self.assertIs(calc.parse_expression('1'), first)
+        finally:
+            calc_module.PARSE_CACHE_SIZE = old_size
+
+    def test_parse_error_not_cached(self):
+        with self.assertRaises(ParseException):
+            calc.parse_expression('1 +')
+        self.assertEqual(len(calc_module._parse_cache), 0)  # pylint: disable=protected-access
+
+    def test_samples(self):
+        variables_list = [{'x': 0.5 + index, 'R': 2.0 * index + 1} for index in range(10)]
+        self.assert_samples_equal('x^2 + 3*x - R/2', variables_list)
+        self.assert_samples_equal('sin(x)*cos(R) + sqrt(x)', variables_list)
+        self.assert_samples_equal('r*x', variables_list)
+        self.assert_samples_equal('2 + pi', variables_list)
+        self.assert_samples_equal('5k*x', variables_list)
+        self.assert_samples_equal('x||R', variables_list)
+
+    def test_complex_samples(self):
+        variables_list = [{'z': complex(index, 1), 'x': 1.0 * index} for index in range(10)]
+        self.assert_samples_equal('z^2 + j*x', variables_list)
+        self.assert_samples_equal('abs(z) + exp(i*x)', variables_list)
+
+    def test_fallback(self):
+        variables_list = [{'x': float(index)} for index in range(-3, 4)]
+        # dividing by zero, or outside of a function's domain
+        self.assert_samples_equal('1/(x+3)', [{'x': float(index)} for index in range(-2, 4)])
+        self.assert_samples_equal('sqrt(x)', variables_list)
+        self.assert_samples_equal('arccos(x)', variables_list)
+        # ints and factorial aren't vectorized
+        self.assert_samples_equal('x^-1 + 1', [{'x': index} for index in range(1, 5)])
+        self.assert_samples_equal('fact(x+3)', variables_list)
+        # samples with different variables
+        self.assert_samples_equal('2*x', [{'x': 1.0}, {'x': 2.0, 'y': 3.0}])
+
+        with self.assertRaises(ZeroDivisionError):
+            calc.evaluate_samples(variables_list, {}, '1/x')
+        with self.assertRaisesRegexp(ValueError, 'factorial'):
+            calc.evaluate_samples(variables_list, {}, 'fact(x)')
+        with self.assertRaisesRegexp(calc.UndefinedVariable, 'y'):
+            calc.evaluate_samples(variables_list, {}, 'x*y')
+
+    def test_functions(self):
+        variables_list = [{'x': float(index)} for index in range(5)]
+        functions = {'f': lambda x: x + 1}
+        self.assertEqual(calc.evaluate_samples(variables_list, functions, 'f(x)*2'), [2, 4, 6, 8, 10])
+
+    def test_empty(self):
+        results = calc.evaluate_samples([{'x': 1.0}, {'x': 2.0}], {}, ' ')
+        self.assertEqual(len(results), 2)
+        self.assertTrue(all(numpy.isnan(result) for result in results))
+
+    def test_vectorized_matches_per_sample(self):
+        """
+        The typical formulas of scripts/benchmark_calc.py give the same results
+        vectorized as they do sample by sample
+        """
+        expressions = ['x^2 + 3*x*y - 1/y', 'sin(x)*cos(y) + sqrt(x^2 + y^2)', 'R1*R2/(R1+R2) + 5k*x']
+        for num_samples in (1, 10, 50):
+            variables_list = [
+                {'x': 0.5 + index, 'y': 1.5 + index, 'R1': 1.0 + index, 'R2': 10.0 - index * 0.1}
+                for index in range(num_samples)
+            ]
+            for expression in expressions:
+                self.assert_samples_equal(expression, variables_list)
@@ -13,11 +13,15 @@ Main module which shows problems (of "capa" type).
 This is used by capa_module.
 '''
 
+from collections import OrderedDict
 from datetime import datetime
+import hashlib
 import logging
 import os.path
 import re
+import threading
 
+from dogapi import dog_stats_api
 from lxml import etree
 from xml.sax.saxutils import unescape
 from copy import deepcopy
@@ -63,6 +67,45 @@ html_problem_semantics = [
 
 log = logging.getLogger(__name__)
 
+# How many parsed problem texts are kept by parse_problem_text
+PARSED_PROBLEM_CACHE_SIZE = 500
+
+# The parsed problem texts, by the hash of their source, least recently used first
+_parsed_problems = OrderedDict()
+_parsed_problems_lock = threading.Lock()
+
+
+def parse_problem_text(problem_text):
+    '''
+    Converts startouttext and endouttext in problem_text to <text></text>, and parses it.
+
+    Returns the converted text and a new copy of its XML tree, which the caller can modify.
+    The trees of the most recently used problem texts are kept, so that each problem is
+    usually only parsed once per process, rather than for each student and request.
+    '''
+    encoded_text = problem_text.encode('utf-8') if isinstance(problem_text, unicode) else problem_text
+    key = hashlib.sha1(encoded_text).hexdigest()
+
+    with _parsed_problems_lock:
+        parsed = _parsed_problems.pop(key, None)
+        if parsed is not None:
+            _parsed_problems[key] = parsed
+
+    if parsed is None:
+        dog_stats_api.increment('capa.parsed_problem_cache.miss')
+        problem_text = re.sub(r"startouttext\s*/", "text", problem_text)
+        problem_text = re.sub(r"endouttext\s*/", "/text", problem_text)
+        parsed = (problem_text, etree.XML(problem_text))
+        with _parsed_problems_lock:
+            _parsed_problems[key] = parsed
+            while len(_parsed_problems) > PARSED_PROBLEM_CACHE_SIZE:
+                _parsed_problems.popitem(last=False)
+    else:
+        dog_stats_api.increment('capa.parsed_problem_cache.hit')
+
+    problem_text, tree = parsed
+    return problem_text, deepcopy(tree)
+
 #-----------------------------------------------------------------------------
 # main class for this module
 
@@ -113,13 +156,9 @@ class LoncapaProblem(object):
         self.done = state.get('done', False)
         self.input_state = state.get('input_state', {})
 
-        # Convert startouttext and endouttext to proper <text></text>
-        problem_text = re.sub(r"startouttext\s*/", "text", problem_text)
-        problem_text = re.sub(r"endouttext\s*/", "/text", problem_text)
-        self.problem_text = problem_text
-
-        # parse problem XML file into an element tree
-        self.tree = etree.XML(problem_text)
+        # Convert startouttext and endouttext to proper <text></text>, and parse
+        # problem XML file into an element tree
+        self.problem_text, self.tree = parse_problem_text(problem_text)
 
         # handle any <include file="foo"> tags
         self._process_includes()
@@ -0,0 +1,292 @@
+"""
+A pool of warm sandbox workers for safe_exec.
+
+Starting the sandboxed Python and importing numpy, scipy and the rest of ASSUMED_IMPORTS
+takes much longer than running most problem scripts. A pool keeps a few sandboxed Pythons
+running sandbox_worker.py, which have imported those modules already, and fork a new
+process for each execution, so that executions are still isolated from each other.
+Workers are replaced after `max_runs` executions, or once they use more than `max_memory`.
+
+The pool uses the Python that codejail is configured with, as the same user, and codejail's
+limits, so it's only used when codejail is configured for Python.
+"""
+import atexit
+import json
+import logging
+import os
+import select
+import signal
+import subprocess
+import threading
+import time
+from Queue import Queue, Empty
+
+from codejail import jail_code
+from codejail.safe_exec import json_safe, SafeExecException
+from dogapi import dog_stats_api
+
+from . import sandbox_worker
+
+log = logging.getLogger(__name__)
+
+# We'll need the code of the worker to run it with `python -c`, as the sandbox may not be
+# able to read it, so read it now.
+sandbox_worker_py_file = sandbox_worker.__file__
+if sandbox_worker_py_file.endswith("c"):
+    sandbox_worker_py_file = sandbox_worker_py_file[:-1]
+
+SANDBOX_WORKER_PY = open(sandbox_worker_py_file).read()
+
+# How many seconds longer than its REALTIME limit a worker may take to answer
+WORKER_TIMEOUT_MARGIN = 5
+# How many seconds a killed worker may take to exit before it's given up on
+WORKER_STOP_TIMEOUT = 5
+
+
+class SandboxWorker(object):
+    """
+    A sandboxed Python running sandbox_worker.py, started by `cmdline`. If `user` is given,
+    the command line runs it as that user with sudo.
+
+    The worker runs in a process group of its own, with the processes it forks for jobs,
+    so that they can all be killed together, as codejail kills its sandboxes.
+    """
+    def __init__(self, cmdline, user=None):
+        self.process = subprocess.Popen(
+            cmdline, stdin=subprocess.PIPE, stdout=subprocess.PIPE, close_fds=True, env={},
+            preexec_fn=os.setsid,
+        )
+        self.user = user
+        self.runs = 0
+        self.rss = 0
+
+    def run(self, job, timeout):
+        """
+        Run `job` (see sandbox_worker.py) and return its result. Raises SafeExecException
+        if the worker doesn't answer within `timeout` seconds, or at all.
+        """
+        self.runs += 1
+        try:
+            self.process.stdin.write(json.dumps(job) + '\n')
+            self.process.stdin.flush()
+            ready, _, _ = select.select([self.process.stdout], [], [], timeout)
+            line = self.process.stdout.readline() if ready else None
+            if not line:
+                raise SafeExecException("Couldn't execute jailed code: the sandbox worker didn't answer")
+            result = json.loads(line)
+        except (IOError, OSError, ValueError) as err:
+            raise SafeExecException("Couldn't execute jailed code: the sandbox worker failed: {0}".format(err))
+
+        self.rss = result.pop('rss', 0)
+        return result
+
+    def stop(self):
+        """
+        Kill the worker and the processes it forked, and wait up to WORKER_STOP_TIMEOUT seconds
+        for it to exit. It's killed rather than asked to exit, as the code it ran may have
+        stopped it or left it unable to answer.
+        """
+        try:
+            self.process.stdin.close()
+        except (IOError, OSError):
+            pass
+
+        try:
+            if self.user:
+                # the worker runs as another user, so only sudo can kill it
+                subprocess.call(["sudo", "pkill", "-9", "-g", str(self.process.pid)])
+            else:
+                os.killpg(self.process.pid, signal.SIGKILL)
+        except OSError:
+            log.warning("Couldn't kill sandbox worker %s", self.process.pid, exc_info=True)
+
+        deadline = time.time() + WORKER_STOP_TIMEOUT
+        while self.process.poll() is None:
+            if time.time() > deadline:
+                log.warning("Sandbox worker %s didn't exit once killed", self.process.pid)
+                return
+            time.sleep(0.01)
+
+
+class SandboxPool(object):
+    """
+    Runs code in up to `size` SandboxWorkers, which are started when they are first needed.
+
+    `cmdline_start` is the command line which starts the sandboxed Python, as `user` if it
+    uses sudo, and `preimports` are the names of the modules the workers import when they start.
+    """
+    def __init__(self, cmdline_start, preimports, size, max_runs, max_memory, user=None):
+        self.cmdline = list(cmdline_start) + ['-c', SANDBOX_WORKER_PY] + list(preimports)
+        self.user = user
+        self.size = size
+        self.max_runs = max_runs
+        self.max_memory = max_memory
+        self.pid = os.getpid()
+        self._idle = Queue()
+        self._started = 0
+        self._waiting = 0
+        self._lock = threading.Lock()
+
+    def execute(self, code, globals_dict, limits, slug=None):
+        """
+        Execute `code` with `globals_dict` under `limits`, as codejail's safe_exec does.
+        The JSON-able globals that result are added to globals_dict. Raises SafeExecException
+        if the code raises, or can't be run.
+        """
+        job = {'code': code, 'globals': json_safe(globals_dict), 'limits': limits}
+        timeout = limits['REALTIME'] + WORKER_TIMEOUT_MARGIN if limits.get('REALTIME') else None
+
+        start = time.time()
+        worker = self._acquire()
+        dog_stats_api.histogram('capa.safe_exec.pool.wait_time', time.time() - start)
+        try:
+            start = time.time()
+            result = worker.run(job, timeout)
+            dog_stats_api.histogram('capa.safe_exec.pool.run_time', time.time() - start)
+        except SafeExecException:
+            log.exception("The sandbox worker failed to run %s", slug)
+            # the worker is dropped from the pool even if stopping it fails
+            failed_worker, worker = worker, None
+            failed_worker.stop()
+            raise
+        finally:
+            self._release(worker)
+
+        if result.get('emsg'):
+            raise SafeExecException(result['emsg'])
+        globals_dict.update(result['globals'])
+
+    def stop(self):
+        """
+        Stop the idle workers
+        """
+        while True:
+            try:
+                worker = self._idle.get_nowait()
+            except Empty:
+                return
+            self._release(None)
+            worker.stop()
+
+    def _acquire(self):
+        """
+        Returns an idle worker, starting one if there are fewer than `size`, or else waits
+        for one to be released
+        """
+        try:
+            return self._idle.get_nowait()
+        except Empty:
+            pass
+
+        with self._lock:
+            start_worker = self._started < self.size
+            if start_worker:
+                self._started += 1
+            else:
+                self._waiting += 1
+                dog_stats_api.histogram('capa.safe_exec.pool.queue_depth', self._waiting)
+
+        if start_worker:
+            try:
+                return self._start_worker()
+            except Exception:
+                self._release(None)
+                raise
+
+        try:
+            return self._idle.get()
+        finally:
+            with self._lock:
+                self._waiting -= 1
+
+    def _release(self, worker):
+        """
+        Return `worker` to the pool, or replace it if it has run too often or grown too big.
+        A worker of None is one which has stopped.
+        """
+        retired_worker = None
+        if worker is not None and (worker.runs >= self.max_runs or worker.rss > self.max_memory):
+            retired_worker, worker = worker, None
+
+        if worker is not None:
+            self._idle.put(worker)
+        else:
+            with self._lock:
+                self._started -= 1
+            if self._waiting:
+                # start a new worker for a waiting execution, rather than leave it waiting forever
+                try:
+                    self._idle.put(self._start_worker())
+                    with self._lock:
+                        self._started += 1
+                except Exception:  # pylint: disable=broad-except
+                    log.exception("Couldn't start a sandbox worker")
+
+        # stopped once the pool no longer counts it
+        if retired_worker is not None:
+            retired_worker.stop()
+
+    def _start_worker(self):
+        """
+        Start a new SandboxWorker
+        """
+        return SandboxWorker(self.cmdline, self.user)
+
+
+# The settings of the pool, from configure_pool, and the pool of this process
+_pool_settings = {'size': 0}
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def configure_pool(size, max_runs=100, max_memory=200 * 1024 * 1024):
+    """
+    Use a pool of `size` warm sandbox workers for safe_exec, in each process. A size of 0
+    disables the pool.
+    """
+    global _pool  # pylint: disable=global-statement
+    _pool_settings.update(size=size, max_runs=max_runs, max_memory=max_memory)
+    with _pool_lock:
+        pool, _pool = _pool, None
+    if pool is not None and pool.pid == os.getpid():
+        pool.stop()
+
+
+def get_pool():
+    """
+    Returns the pool of sandbox workers of this process, or None if there's none (because
+    it isn't configured, or because codejail isn't configured for Python).
+    """
+    global _pool  # pylint: disable=global-statement
+    # imported here, as safe_exec uses this module
+    from .safe_exec import ASSUMED_IMPORTS
+
+    if not _pool_settings['size'] or not jail_code.is_configured('python'):
+        return None
+
+    with _pool_lock:
+        # a forked process doesn't share its parent's workers
+        if _pool is None or _pool.pid != os.getpid():
+            command = jail_code.COMMANDS['python']
+            cmdline_start = list(command['cmdline_start'])
+            if command.get('user'):
+                cmdline_start = ['sudo', '-u', command['user']] + cmdline_start
+            _pool = SandboxPool(
+                cmdline_start,
+                [module_name for _name, module_name in ASSUMED_IMPORTS],
+                _pool_settings['size'],
+                _pool_settings['max_runs'],
+                _pool_settings['max_memory'],
+                user=command.get('user'),
+            )
+        return _pool
+
+
+@atexit.register
+def _stop_pool():
+    """
+    Stop the workers of this process when it exits
+    """
+    if _pool is not None and _pool.pid == os.getpid():
+        _pool.stop()
+
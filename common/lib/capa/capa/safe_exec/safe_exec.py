@@ -3,7 +3,9 @@
 from codejail.safe_exec import safe_exec as codejail_safe_exec
 from codejail.safe_exec import not_safe_exec as codejail_not_safe_exec
 from codejail.safe_exec import json_safe, SafeExecException
+from codejail.jail_code import LIMITS
 from . import lazymod
+from .pool import get_pool
 from dogapi import dog_stats_api
 
 import hashlib
@@ -113,18 +115,25 @@ def safe_exec(code, globals_dict, random_seed=None, python_path=None, cache=None
     # Create the complete code we'll run.
     code_prolog = CODE_PROLOG % random_seed
 
-    # Decide which code executor to use.
+    # Decide which code executor to use.  The warm sandbox workers can't read the
+    # course's python_path, so code which needs it starts its own sandbox.
+    pool = None
     if unsafely:
         exec_fn = codejail_not_safe_exec
     else:
         exec_fn = codejail_safe_exec
+        if not python_path:
+            pool = get_pool()
 
     # Run the code!  Results are side effects in globals_dict.
     try:
-        exec_fn(
-            code_prolog + LAZY_IMPORTS + code, globals_dict,
-            python_path=python_path, slug=slug,
-        )
+        if pool is not None:
+            pool.execute(code_prolog + LAZY_IMPORTS + code, globals_dict, LIMITS, slug=slug)
+        else:
+            exec_fn(
+                code_prolog + LAZY_IMPORTS + code, globals_dict,
+                python_path=python_path, slug=slug,
+            )
     except SafeExecException as e:
         emsg = e.message
     else:
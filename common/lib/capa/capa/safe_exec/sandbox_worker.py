@@ -0,0 +1,141 @@
+"""
+The main loop of a warm sandbox worker (see pool.py).
+
+This runs as `python -c` in the sandboxed Python, so it may only use the standard library.
+The modules named on its command line are imported once, when it starts. Then it reads
+jobs from stdin, one JSON object per line, each with the `code` to run, the `globals` to
+run it with and the `limits` to run it under. Each job is run in a process forked for it,
+so jobs never see each other's state, and the result is written to stdout as one JSON
+object per line: the resulting `globals`, or the error message `emsg`, and the worker's
+memory use `rss`, in bytes.
+"""
+import json
+import os
+import resource
+import select
+import signal
+import sys
+import time
+import traceback
+
+# How much of the result of a job is read at a time
+READ_SIZE = 65536
+
+
+def preimport(module_names):
+    """
+    Import the modules the jobs will use, so that the processes forked for them start warm
+    """
+    for module_name in module_names:
+        try:
+            __import__(module_name)
+        except Exception:  # pylint: disable=broad-except
+            # the job will report the error if it really uses the module
+            pass
+
+
+def jsonable(value):
+    """
+    Can `value` be serialized to JSON?
+    """
+    try:
+        json.dumps(value)
+    except Exception:  # pylint: disable=broad-except
+        return False
+    return True
+
+
+def set_process_limits(limits):
+    """
+    Set the resource limits of the process running a job, as codejail does
+    """
+    # no subprocesses
+    resource.setrlimit(resource.RLIMIT_NPROC, (0, 0))
+    if limits.get('CPU'):
+        resource.setrlimit(resource.RLIMIT_CPU, (limits['CPU'], limits['CPU']))
+    if limits.get('VMEM'):
+        resource.setrlimit(resource.RLIMIT_AS, (limits['VMEM'], limits['VMEM']))
+
+
+def run_in_child(job, result_fd):
+    """
+    Run `job` in the forked process, write its result to result_fd and exit.
+    """
+    # the job's output mustn't get mixed up with the worker's
+    devnull = os.open(os.devnull, os.O_RDWR)
+    for fd in (0, 1, 2):
+        os.dup2(devnull, fd)
+
+    try:
+        set_process_limits(job['limits'])
+        globals_dict = job['globals']
+        exec job['code'] in globals_dict  # pylint: disable=exec-used
+        result = {'globals': dict(
+            (name, value) for name, value in globals_dict.iteritems()
+            if name != '__builtins__' and jsonable(value)
+        )}
+    except BaseException:  # pylint: disable=broad-except
+        result = {'emsg': "Couldn't execute jailed code: {0}".format(traceback.format_exc())}
+
+    try:
+        data = json.dumps(result)
+        while data:
+            data = data[os.write(result_fd, data):]
+    finally:
+        os._exit(0)  # pylint: disable=protected-access
+
+
+def run_job(job):
+    """
+    Run `job` in a new process forked from this one, and return its result
+    """
+    read_fd, write_fd = os.pipe()
+    pid = os.fork()
+    if pid == 0:
+        os.close(read_fd)
+        run_in_child(job, write_fd)
+    os.close(write_fd)
+
+    realtime = job['limits'].get('REALTIME')
+    deadline = time.time() + realtime if realtime else None
+    chunks = []
+    timed_out = False
+    while True:
+        timeout = max(deadline - time.time(), 0) if deadline is not None else None
+        ready, _, _ = select.select([read_fd], [], [], timeout)
+        if not ready:
+            timed_out = True
+            os.kill(pid, signal.SIGKILL)
+            break
+        chunk = os.read(read_fd, READ_SIZE)
+        if not chunk:
+            break
+        chunks.append(chunk)
+    os.close(read_fd)
+    _, status = os.waitpid(pid, 0)
+
+    if timed_out:
+        return {'emsg': "Couldn't execute jailed code: it ran for more than {0} seconds".format(realtime)}
+    try:
+        return json.loads(''.join(chunks))
+    except ValueError:
+        return {'emsg': "Couldn't execute jailed code: it exited with status {0}".format(status)}
+
+
+def main(module_names):
+    """
+    Run the jobs read from stdin until it is closed
+    """
+    preimport(module_names)
+    while True:
+        line = sys.stdin.readline()
+        if not line:
+            break
+        result = run_job(json.loads(line))
+        result['rss'] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+        sys.stdout.write(json.dumps(result) + '\n')
+        sys.stdout.flush()
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -4,12 +4,16 @@ import hashlib
 import os
 import os.path
 import random
+import sys
 import textwrap
+import time
 import unittest
 
+from mock import patch
 from nose.plugins.skip import SkipTest
 
 from capa.safe_exec import safe_exec, update_hash
+from capa.safe_exec.pool import SandboxPool
 from codejail.safe_exec import SafeExecException
 from codejail.jail_code import is_configured
 
@@ -90,6 +94,74 @@ class TestSafeOrNot(unittest.TestCase):
         self.assertEqual(g['files'], os.listdir('/'))
 
 
+class TestSandboxPool(unittest.TestCase):
+    """
+    Test the pool of warm sandbox workers, running an unsandboxed Python.
+    """
+    def setUp(self):
+        self.pool = SandboxPool(
+            [sys.executable, '-E', '-B'], ['math'], size=1, max_runs=2, max_memory=200 * 1024 * 1024
+        )
+        self.addCleanup(self.pool.stop)
+        self.limits = {'CPU': 1, 'REALTIME': 1, 'VMEM': 0}
+
+    def test_execute(self):
+        g = {'x': 2}
+        self.pool.execute("import math; a = x * int(math.pi)", g, self.limits)
+        self.assertEqual(g['a'], 6)
+
+    def test_raising_exceptions(self):
+        with self.assertRaises(SafeExecException) as cm:
+            self.pool.execute("1/0", {}, self.limits)
+        self.assertIn("ZeroDivisionError", cm.exception.message)
+
+    def test_executions_isolated(self):
+        self.pool.execute("import math; math.pi = 3", {}, self.limits)
+        g = {}
+        self.pool.execute("import math; a = math.pi", g, self.limits)
+        self.assertNotEqual(g['a'], 3)
+
+    def test_realtime_limit(self):
+        with self.assertRaises(SafeExecException):
+            self.pool.execute("import time; time.sleep(5)", {}, self.limits)
+
+        # the worker is still usable
+        g = {}
+        self.pool.execute("a = 17", g, self.limits)
+        self.assertEqual(g['a'], 17)
+
+    def test_workers_replaced(self):
+        self.pool.execute("a = 17", {}, self.limits)
+        worker = self.pool._idle.queue[0]  # pylint: disable=protected-access
+
+        # the worker is stopped after max_runs executions
+        self.pool.execute("a = 17", {}, self.limits)
+        self.assertEqual(self.pool._idle.qsize(), 0)  # pylint: disable=protected-access
+        self.assertIsNotNone(worker.process.poll())
+
+        # and a new one is started for the next execution
+        g = {}
+        self.pool.execute("a = 17", g, self.limits)
+        self.assertEqual(g['a'], 17)
+
+    @patch('capa.safe_exec.pool.WORKER_TIMEOUT_MARGIN', 0)
+    def test_stopped_worker(self):
+        self.pool.execute("a = 17", {}, self.limits)
+        worker = self.pool._idle.queue[0]  # pylint: disable=protected-access
+
+        # the code stops the worker, which then can't answer, or exit when asked to
+        start = time.time()
+        with self.assertRaises(SafeExecException):
+            self.pool.execute("import os, signal; os.kill(os.getppid(), signal.SIGSTOP)", {}, self.limits)
+        self.assertLess(time.time() - start, 5)
+        self.assertIsNotNone(worker.process.poll())
+        self.assertEqual(self.pool._started, 0)  # pylint: disable=protected-access
+
+        g = {}
+        self.pool.execute("a = 17", g, self.limits)
+        self.assertEqual(g['a'], 17)
+
+
 class DictCache(object):
     """A cache implementation over a simple dict, for testing."""
 
@@ -5,6 +5,7 @@ import textwrap
 
 import mock
 
+from capa.capa_problem import LoncapaProblem
 from .response_xml_factory import StringResponseXMLFactory, CustomResponseXMLFactory
 from . import test_system, new_loncapa_problem
 
@@ -252,6 +253,16 @@ class CapaHtmlRenderTest(unittest.TestCase):
         the_html = problem.get_html()
         self.assertRegexpMatches(the_html, r"<div>\s+</div>")
 
+    def test_parsed_problem_not_shared(self):
+        # Problems built from the same text get their own copy of its parsed tree
+        xml_str = StringResponseXMLFactory().build_xml(answer="test")
+        first_problem = LoncapaProblem(xml_str, id='first', seed=723, system=self.system)
+        second_problem = LoncapaProblem(xml_str, id='second', seed=723, system=self.system)
+
+        self.assertIsNot(first_problem.tree, second_problem.tree)
+        self.assertEqual(first_problem.tree.find('.//textline').get('id'), 'first_2_1')
+        self.assertEqual(second_problem.tree.find('.//textline').get('id'), 'second_2_1')
+
     def _create_test_file(self, path, content_str):
         test_fp = self.system.filestore.open(path, "w")
         test_fp.write(content_str)
@@ -11,6 +11,7 @@ import sys
 from pkg_resources import resource_string
 
 from capa.capa_problem import LoncapaProblem
+from capa.correctmap import CorrectMap
 from capa.responsetypes import StudentInputError, \
     ResponseError, LoncapaProblemError
 from capa.util import convert_files_to_filenames
@@ -47,6 +48,15 @@ def randomization_bin(seed, problem_id):
     return int(h.hexdigest()[:7], 16) % NUM_RANDOMIZATION_BINS
 
 
+def max_score_cache_key(data):
+    """
+    The key of the max score of the problem defined by `data` in the cache of the ModuleSystem
+    """
+    if isinstance(data, unicode):
+        data = data.encode('utf-8')
+    return 'capa.max_score.{0}'.format(hashlib.sha1(data).hexdigest())
+
+
 class Randomization(String):
     """
     Define a field to store how to randomize a problem.
@@ -204,6 +214,9 @@ class CapaModule(CapaFields, XModule):
         try:
             # TODO (vshnayder): move as much as possible of this work and error
             # checking to descriptor load time
+            # The problem is built here rather than lazily, so that a problem which can't be
+            # built is replaced by an ErrorModule when the module is constructed. Scoring
+            # doesn't construct the module (see CapaDescriptor.get_score and max_score).
             self.lcp = self.new_lcp(self.get_state_for_lcp())
 
             # At this point, we need to persist the randomization seed
@@ -1198,6 +1211,59 @@ class CapaDescriptor(CapaFields, RawDescriptor):
                                     CapaDescriptor.text_customization])
         return non_editable_fields
 
+    def get_score(self):
+        """
+        Returns the student's score on this problem, computed from their saved state the
+        same way as LoncapaProblem.get_score, so that grading doesn't build the problem.
+        """
+        total = self.max_score()
+        if total is None:
+            # the problem couldn't be built
+            return None
+
+        if not self.student_answers:
+            return {'score': 0, 'total': total}
+
+        correct_map = CorrectMap()
+        correct_map.set_dict(self.correct_map)
+        score = sum(correct_map.get_npoints(key) for key in correct_map)
+        return {'score': score, 'total': total}
+
+    def max_score(self):
+        """
+        Returns the max score of this problem. It only depends on the problem's definition, so
+        it's cached by the hash of the definition in the cache of the xmodule runtime, and the
+        problem only has to be built for the first student it is graded for.
+        """
+        cache = self.xmodule_runtime.cache
+        key = max_score_cache_key(self.data)
+        max_score = cache.get(key)
+        if max_score is None:
+            max_score = self._compute_max_score()
+            if max_score is not None:
+                cache.set(key, max_score)
+        return max_score
+
+    def _compute_max_score(self):
+        """
+        Returns the max score of this problem, building its LoncapaProblem but not the
+        CapaModule, whose construction also renders the problem for the student. Returns
+        None if the problem can't be built, as the ErrorModule which replaces it would.
+        """
+        # as in CapaModule.__init__, for openendedresponse
+        self.xmodule_runtime.set('location', self.location.url())
+        try:
+            lcp = LoncapaProblem(
+                problem_text=self.data,
+                id=self.location.html_id(),
+                seed=self.seed if self.seed is not None else 1,
+                system=self.xmodule_runtime,
+            )
+        except Exception:  # pylint: disable=broad-except
+            log.exception(u"Couldn't build problem %s to find its max score", self.location.url())
+            return None
+        return lcp.get_max_score()
+
     # Proxy to CapaModule for access to any of its attributes
     answer_available = module_attr('answer_available')
     check_button_name = module_attr('check_button_name')
@@ -3,6 +3,9 @@ XASSET_SRCREF_PREFIX = 'xasset:'
 
 XASSET_THUMBNAIL_TAIL_NAME = '.jpg'
 
+# The size of the chunks in which content is streamed
+STREAM_DATA_CHUNK_SIZE = 64 * 1024
+
 import os
 import logging
 import StringIO
@@ -15,7 +18,7 @@ from PIL import Image
 
 class StaticContent(object):
     def __init__(self, loc, name, content_type, data, last_modified_at=None, thumbnail_location=None, import_path=None,
-                 length=None, locked=False):
+                 length=None, locked=False, content_digest=None):
         self.location = loc
         self.name = name  # a display string which can be edited, and thus not part of the location which needs to be fixed
         self.content_type = content_type
@@ -27,6 +30,8 @@ class StaticContent(object):
         # cycles
         self.import_path = import_path
         self.locked = locked
+        # the md5 hex digest of the data, if known
+        self.content_digest = content_digest
 
     @property
     def is_thumbnail(self):
@@ -131,21 +136,47 @@ class StaticContent(object):
     def stream_data(self):
         yield self._data
 
+    def stream_data_in_range(self, first_byte, last_byte):
+        """
+        Yields the data from first_byte to last_byte, inclusive
+        """
+        yield self._data[first_byte:last_byte + 1]
+
 
 class StaticContentStream(StaticContent):
     def __init__(self, loc, name, content_type, stream, last_modified_at=None, thumbnail_location=None, import_path=None,
-                 length=None, locked=False):
+                 length=None, locked=False, content_digest=None):
         super(StaticContentStream, self).__init__(loc, name, content_type, None, last_modified_at=last_modified_at,
                                                   thumbnail_location=thumbnail_location, import_path=import_path,
-                                                  length=length, locked=locked)
+                                                  length=length, locked=locked, content_digest=content_digest)
         self._stream = stream
 
     def stream_data(self):
-        while True:
-            chunk = self._stream.read(1024)
-            if len(chunk) == 0:
-                break
-            yield chunk
+        try:
+            while True:
+                chunk = self._stream.read(STREAM_DATA_CHUNK_SIZE)
+                if len(chunk) == 0:
+                    break
+                yield chunk
+        finally:
+            self.close()
+
+    def stream_data_in_range(self, first_byte, last_byte):
+        """
+        Yields the data from first_byte to last_byte, inclusive, in chunks of at most
+        STREAM_DATA_CHUNK_SIZE bytes
+        """
+        try:
+            self._stream.seek(first_byte)
+            position = first_byte
+            while position <= last_byte:
+                chunk = self._stream.read(min(STREAM_DATA_CHUNK_SIZE, last_byte - position + 1))
+                if len(chunk) == 0:
+                    break
+                position += len(chunk)
+                yield chunk
+        finally:
+            self.close()
 
     def close(self):
         self._stream.close()
@@ -154,9 +185,19 @@ class StaticContentStream(StaticContent):
         self._stream.seek(0)
         content = StaticContent(self.location, self.name, self.content_type, self._stream.read(),
                                 last_modified_at=self.last_modified_at, thumbnail_location=self.thumbnail_location,
-                                import_path=self.import_path, length=self.length, locked=self.locked)
+                                import_path=self.import_path, length=self.length, locked=self.locked,
+                                content_digest=self.content_digest)
         return content
 
+    def copy_with_stream(self, stream):
+        """
+        Returns a copy of this content which reads its data from stream
+        """
+        return StaticContentStream(self.location, self.name, self.content_type, stream,
+                                   last_modified_at=self.last_modified_at, thumbnail_location=self.thumbnail_location,
+                                   import_path=self.import_path, length=self.length, locked=self.locked,
+                                   content_digest=self.content_digest)
+
 
 class ContentStore(object):
     '''
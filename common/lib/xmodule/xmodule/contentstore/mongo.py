@@ -66,7 +66,8 @@ class MongoContentStore(ContentStore):
                     location, fp.displayname, fp.content_type, fp, last_modified_at=fp.uploadDate,
                     thumbnail_location=getattr(fp, 'thumbnail_location', None),
                     import_path=getattr(fp, 'import_path', None),
-                    length=fp.length, locked=getattr(fp, 'locked', False)
+                    length=fp.length, locked=getattr(fp, 'locked', False),
+                    content_digest=getattr(fp, 'md5', None)
                 )
             else:
                 with self.fs.get(content_id) as fp:
@@ -74,7 +75,8 @@ class MongoContentStore(ContentStore):
                         location, fp.displayname, fp.content_type, fp.read(), last_modified_at=fp.uploadDate,
                         thumbnail_location=getattr(fp, 'thumbnail_location', None),
                         import_path=getattr(fp, 'import_path', None),
-                        length=fp.length, locked=getattr(fp, 'locked', False)
+                        length=fp.length, locked=getattr(fp, 'locked', False),
+                        content_digest=getattr(fp, 'md5', None)
                     )
         except NoFile:
             if throw_on_not_found:
@@ -98,18 +100,31 @@ class MongoContentStore(ContentStore):
             pass
 
     def export(self, location, output_directory):
-        content = self.find(location)
-
-        if content.import_path is not None:
-            output_directory = output_directory + '/' + os.path.dirname(content.import_path)
-
         if not os.path.exists(output_directory):
             os.makedirs(output_directory)
 
-        disk_fs = OSFS(output_directory)
+        self.export_to_fs(location, OSFS(output_directory))
+
+    def export_to_fs(self, location, export_fs):
+        """
+        Export the asset at location to the pyfilesystem export_fs, under the directory of its
+        import path. Its data is copied chunk-wise from GridFS rather than read into memory.
+        """
+        content_id = StaticContent.get_id_from_location(location)
+        try:
+            fp = self.fs.get(content_id)
+        except NoFile:
+            raise NotFoundError()
 
-        with disk_fs.open(content.name, 'wb') as asset_file:
-            asset_file.write(content.data)
+        try:
+            asset_path = fp.displayname
+            import_path = getattr(fp, 'import_path', None)
+            if import_path is not None and os.path.dirname(import_path):
+                export_fs.makedir(os.path.dirname(import_path), recursive=True, allow_recreate=True)
+                asset_path = os.path.dirname(import_path) + '/' + asset_path
+            export_fs.setcontents(asset_path, fp)
+        finally:
+            fp.close()
 
     def export_all_for_course(self, course_location, output_directory, assets_policy_file):
         """
@@ -121,18 +136,36 @@ class MongoContentStore(ContentStore):
         :param assets_policy_file: the filename for the policy file which should be in the same
         directory as the other policy files.
         """
+        if not os.path.exists(output_directory):
+            os.makedirs(output_directory)
+
+        policy = self.export_all_for_course_to_fs(course_location, OSFS(output_directory), static_dir='')
+
+        with open(assets_policy_file, 'w') as f:
+            json.dump(policy, f)
+
+    def export_all_for_course_to_fs(self, course_location, export_fs, static_dir='static'):
+        """
+        Export all of this course's assets to the static_dir directory of the pyfilesystem export_fs,
+        and return the policy of the assets' attributes, to be written to the assets policy file.
+
+        :param course_location: the Location of type 'course'
+        :param export_fs: the pyfilesystem to export the course to
+        :param static_dir: the directory of export_fs under which to put all the asset files
+        """
         policy = {}
         assets = self.get_all_content_for_course(course_location)
+        if assets and static_dir:
+            export_fs = export_fs.makeopendir(static_dir, recursive=True)
 
         for asset in assets:
             asset_location = Location(asset['_id'])
-            self.export(asset_location, output_directory)
+            self.export_to_fs(asset_location, export_fs)
             for attr, value in asset.iteritems():
                 if attr not in ['_id', 'md5', 'uploadDate', 'length', 'chunkSize']:
                     policy.setdefault(asset_location.name, {})[attr] = value
 
-        with open(assets_policy_file, 'w') as f:
-            json.dump(policy, f)
+        return policy
 
     def get_all_content_thumbnails_for_course(self, location):
         return self._get_all_content_for_course(location, get_thumbnails=True)
@@ -1,3 +1,4 @@
+import hashlib
 import logging
 from cStringIO import StringIO
 from math import exp
@@ -9,6 +10,7 @@ import dateutil.parser
 from lazy import lazy
 
 from xmodule.modulestore import Location
+from xmodule.modulestore.exceptions import ItemNotFoundError
 from xmodule.seq_module import SequenceDescriptor, SequenceModule
 from xmodule.graders import grader_from_conf
 import json
@@ -388,6 +390,57 @@ class CourseFields(object):
     display_coursenumber = String(help="An optional display string for the course number that will get rendered in the LMS",
                                   scope=Scope.settings)
 
+
+def _load_descriptors(runtime, locations):
+    """
+    Returns the descriptors at `locations`, skipping any which can't be found
+    """
+    descriptors = []
+    for location in locations:
+        try:
+            descriptors.append(runtime.get_block(Location(location)))
+        except ItemNotFoundError:
+            log.exception('Unable to load item {loc}, skipping'.format(loc=location))
+    return descriptors
+
+
+class GradedSection(dict):
+    """
+    A graded section of CourseDescriptor.grading_context, which loads its
+    'section_descriptor' and 'xmoduledescriptors' from `runtime` when first used.
+    """
+    def __init__(self, runtime, section_structure):
+        super(GradedSection, self).__init__(section_structure)
+        self.runtime = runtime
+
+    def __missing__(self, key):
+        if key == 'section_descriptor':
+            value = self.runtime.get_block(Location(self['location']))
+        elif key == 'xmoduledescriptors':
+            value = _load_descriptors(self.runtime, [location for location, _ in self['scorable']])
+        else:
+            raise KeyError(key)
+        self[key] = value
+        return value
+
+
+class GradingContext(dict):
+    """
+    CourseDescriptor.grading_context, which loads its 'all_descriptors' from
+    `runtime` when first used.
+    """
+    def __init__(self, runtime, structure, graded_sections):
+        super(GradingContext, self).__init__(structure, graded_sections=graded_sections)
+        self.runtime = runtime
+
+    def __missing__(self, key):
+        if key != 'all_descriptors':
+            raise KeyError(key)
+        value = _load_descriptors(self.runtime, self['all_locations'])
+        self[key] = value
+        return value
+
+
 class CourseDescriptor(CourseFields, SequenceDescriptor):
     module_class = SequenceModule
 
@@ -744,33 +797,30 @@ class CourseDescriptor(CourseFields, SequenceDescriptor):
         return announcement, start, now
 
     @lazy
-    def grading_context(self):
+    def grading_context_structure(self):
         """
-        This returns a dictionary with keys necessary for quickly grading
-        a student. They are used by grades.grade()
-
-        The grading context has two keys:
-        graded_sections - This contains the sections that are graded, as
-            well as all possible children modules that can affect the
-            grading. This allows some sections to be skipped if the student
-            hasn't seen any part of it.
+        The structure of the course that grading depends on, as plain data, so that it can be
+        cached between requests and rebuilt into a grading_context without walking the course:
 
-            The format is a dictionary keyed by section-type. The values are
-            arrays of dictionaries containing
-                "section_descriptor" : The section descriptor
-                "xmoduledescriptors" : An array of xmoduledescriptors that
-                    could possibly be in the section, for any student
+        graded_sections - a dictionary keyed by section format. The values are lists of
+            dictionaries, one for each graded section:
+                "location" : The location url of the section
+                "scorable" : A list of (location url, weight) of the section and its
+                    descendants that have scores
+                "content_hash" : A hash of the content of those, e.g. the problems'
+                    xml, on which their max scores depend
+                "always_recalculate_grades" : Whether any of those must always be graded
 
-        all_descriptors - This contains a list of all xmodules that can
-            effect grading a student. This is used to efficiently fetch
-            all the xmodule state for a FieldDataCache without walking
-            the descriptor tree again.
+        all_locations - The location urls of the graded sections and all of their descendants
 
+        always_recalculate_grades - Whether any of all_locations must always be graded
 
+        has_dynamic_children - Whether any of all_locations has dynamic children
         """
-
-        all_descriptors = []
+        all_locations = []
         graded_sections = {}
+        always_recalculate_grades = False
+        has_dynamic_children = False
 
         def yield_descriptor_descendents(module_descriptor):
             for child in module_descriptor.get_children():
@@ -784,17 +834,66 @@ class CourseDescriptor(CourseFields, SequenceDescriptor):
                     xmoduledescriptors = list(yield_descriptor_descendents(s))
                     xmoduledescriptors.append(s)
 
-                    # The xmoduledescriptors included here are only the ones that have scores.
-                    section_description = {'section_descriptor': s, 'xmoduledescriptors': filter(lambda child: child.has_score, xmoduledescriptors)}
+                    # Only the xmoduledescriptors which have scores are included in the section.
+                    scorable = [child for child in xmoduledescriptors if child.has_score]
+                    section_description = {
+                        'location': s.location.url(),
+                        'scorable': [(child.location.url(), getattr(child, 'weight', None)) for child in scorable],
+                        'content_hash': hashlib.sha1(json.dumps(
+                            [child.get_explicitly_set_fields_by_scope(Scope.content) for child in scorable],
+                            sort_keys=True
+                        )).hexdigest(),
+                        'always_recalculate_grades': any(child.always_recalculate_grades for child in scorable),
+                    }
 
                     section_format = s.format if s.format is not None else ''
-                    graded_sections[section_format] = graded_sections.get(section_format, []) + [section_description]
+                    graded_sections.setdefault(section_format, []).append(section_description)
+
+                    for descriptor in xmoduledescriptors:
+                        all_locations.append(descriptor.location.url())
+                        always_recalculate_grades = always_recalculate_grades or descriptor.always_recalculate_grades
+                        has_dynamic_children = has_dynamic_children or descriptor.has_dynamic_children()
+
+        return {
+            'graded_sections': graded_sections,
+            'all_locations': all_locations,
+            'always_recalculate_grades': always_recalculate_grades,
+            'has_dynamic_children': has_dynamic_children,
+        }
+
+    @lazy
+    def grading_context(self):
+        """
+        This returns a dictionary with keys necessary for quickly grading
+        a student. They are used by grades.grade()
+
+        The grading context has the keys of grading_context_structure, and:
+        graded_sections - This contains the sections that are graded, as
+            well as all possible children modules that can affect the
+            grading. This allows some sections to be skipped if the student
+            hasn't seen any part of it.
+
+            The format is a dictionary keyed by section-type. The values are
+            arrays of dictionaries containing, as well as the keys in
+            grading_context_structure,
+                "section_descriptor" : The section descriptor
+                "xmoduledescriptors" : An array of xmoduledescriptors that
+                    could possibly be in the section, for any student
 
-                    all_descriptors.extend(xmoduledescriptors)
-                    all_descriptors.append(s)
+        all_descriptors - This contains a list of all xmodules that can
+            effect grading a student. This is used to efficiently fetch
+            all the xmodule state for a FieldDataCache without walking
+            the descriptor tree again.
 
-        return {'graded_sections': graded_sections,
-                'all_descriptors': all_descriptors, }
+        The descriptors are only loaded when first used, so that callers which only
+        need the locations in grading_context_structure don't load the course.
+        """
+        structure = self.grading_context_structure
+        graded_sections = dict(
+            (section_format, [GradedSection(self.runtime, section) for section in sections])
+            for section_format, sections in structure['graded_sections'].iteritems()
+        )
+        return GradingContext(self.runtime, structure, graded_sections)
 
     @staticmethod
     def make_id(org, course, url_name):
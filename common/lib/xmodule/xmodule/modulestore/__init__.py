@@ -9,6 +9,7 @@ import re
 from collections import namedtuple
 
 from .exceptions import InvalidLocationError, InsufficientSpecificationError
+from .lru_cache import LRUCache
 from xmodule.errortracker import make_error_tracker
 
 log = logging.getLogger('mitx.' + 'modulestore')
@@ -36,6 +37,25 @@ INVALID_HTML_CHARS = re.compile(r"[^\w-]")
 
 _LocationBase = namedtuple('LocationBase', 'tag org course category name revision')
 
+# The number of locations (and of their urls and html ids) kept by the caches below
+INTERNED_LOCATIONS_MAX_SIZE = 100000
+# The validated Locations most recently parsed from strings, lists, tuples and dicts,
+# keyed by the string, or by the tuple of their components, so that parsing the same
+# location again returns the same object without revalidating it.
+_INTERNED_LOCATIONS = LRUCache(INTERNED_LOCATIONS_MAX_SIZE)
+# The url() and html_id() of the most recently used Locations, keyed by the Location.
+# They're kept aside, as Locations have no instance attributes to memoize them in.
+_LOCATION_URLS = LRUCache(INTERNED_LOCATIONS_MAX_SIZE)
+_LOCATION_HTML_IDS = LRUCache(INTERNED_LOCATIONS_MAX_SIZE)
+
+
+def _intern_location(key, location):
+    """
+    Store location in the intern cache under key, and return it
+    """
+    _INTERNED_LOCATIONS.set(key, location)
+    return location
+
 
 class Location(_LocationBase):
     '''
@@ -46,6 +66,10 @@ class Location(_LocationBase):
 
     However, they can also be represented as dictionaries (specifying each component),
     tuples or lists (specified in order), or as strings of the url
+
+    Locations are interned: parsing a url, or components, that were recently parsed returns
+    the same Location without validating it again. The url() and html_id() of recently
+    used Locations are only computed once.
     '''
     __slots__ = ()
 
@@ -172,13 +196,20 @@ class Location(_LocationBase):
         if isinstance(location, Location):
             return location
         elif isinstance(location, basestring):
+            interned = _INTERNED_LOCATIONS.get(location)
+            if interned is not None and _cls is Location:
+                return interned
+
             match = URL_RE.match(location)
             if match is None:
                 log.debug('location is instance of %s but no URL match' % basestring)
                 raise InvalidLocationError(location)
             groups = match.groupdict()
             check_dict(groups)
-            return _LocationBase.__new__(_cls, **groups)
+            loc = _LocationBase.__new__(_cls, **groups)
+            # also intern by components, as the same location is often parsed from both
+            _intern_location(tuple(loc), loc)
+            return _intern_location(location, loc)
         elif isinstance(location, (list, tuple)):
             if len(location) not in (5, 6):
                 log.debug('location has wrong length')
@@ -189,14 +220,36 @@ class Location(_LocationBase):
             else:
                 args = tuple(location)
 
+            interned = _INTERNED_LOCATIONS.get(args)
+            if interned is not None and _cls is Location:
+                return interned
+
             check_list(args)
-            return _LocationBase.__new__(_cls, *args)
+            return _intern_location(args, _LocationBase.__new__(_cls, *args))
         elif isinstance(location, dict):
+            # only dicts with exactly the components of a location can be interned
+            if ('revision' in location and len(location) == 6) or len(location) == 5:
+                try:
+                    args = (
+                        location['tag'], location['org'], location['course'],
+                        location['category'], location['name'], location.get('revision'),
+                    )
+                except KeyError:
+                    args = None
+                interned = _INTERNED_LOCATIONS.get(args)
+                if interned is not None and _cls is Location:
+                    return interned
+            else:
+                args = None
+
             kwargs = dict(location)
             kwargs.setdefault('revision', None)
 
             check_dict(kwargs)
-            return _LocationBase.__new__(_cls, **kwargs)
+            loc = _LocationBase.__new__(_cls, **kwargs)
+            if args is None:
+                return loc
+            return _intern_location(args, loc)
         else:
             raise InvalidLocationError(location)
 
@@ -204,9 +257,12 @@ class Location(_LocationBase):
         """
         Return a string containing the URL for this location
         """
-        url = "{0.tag}://{0.org}/{0.course}/{0.category}/{0.name}".format(self)
-        if self.revision:
-            url += "@" + self.revision
+        url = _LOCATION_URLS.get(self)
+        if url is None:
+            url = "{0.tag}://{0.org}/{0.course}/{0.category}/{0.name}".format(self)
+            if self.revision:
+                url += "@" + self.revision
+            _LOCATION_URLS.set(self, url)
         return url
 
     def html_id(self):
@@ -214,9 +270,13 @@ class Location(_LocationBase):
         Return a string with a version of the location that is safe for use in
         html id attributes
         """
-        s = "-".join(str(v) for v in self.list()
-                     if v is not None)
-        return Location.clean_for_html(s)
+        html_id = _LOCATION_HTML_IDS.get(self)
+        if html_id is None:
+            s = "-".join(str(v) for v in self.list()
+                         if v is not None)
+            html_id = Location.clean_for_html(s)
+            _LOCATION_HTML_IDS.set(self, html_id)
+        return html_id
 
     def dict(self):
         """
@@ -348,6 +408,16 @@ class ModuleStore(object):
         """
         raise NotImplementedError
 
+    def bulk_write_items(self, items):
+        """
+        Write many items at once, as update_item, update_children and update_metadata
+        would, creating the items that don't exist.
+
+        items: an iterable of (location, data, children, metadata) tuples. The children
+            of items with empty or None children are left as they are.
+        """
+        raise NotImplementedError
+
     def delete_item(self, location):
         """
         Delete an item from this modulestore
@@ -378,6 +448,15 @@ class ModuleStore(object):
         '''
         raise NotImplementedError
 
+    def get_child_position(self, course_id, parent_location, location):
+        """
+        Returns the 0-based position of location among the children of parent_location
+        in course course_id, as used to compute courseware positions in path_to_location().
+
+        raises ValueError if location isn't a child of parent_location.
+        """
+        raise NotImplementedError
+
     def get_errored_courses(self):
         """
         Return a dictionary of course_dir -> [(msg, exception_str)], for each
@@ -392,6 +471,14 @@ class ModuleStore(object):
         """
         raise NotImplementedError
 
+    def get_course_version(self, course_id):
+        """
+        Returns a token that changes whenever the content of the course course_id changes,
+        suitable for keying caches of data computed from the course, or None if this
+        modulestore doesn't track changes to its courses.
+        """
+        raise NotImplementedError
+
 
 class ModuleStoreBase(ModuleStore):
     '''
@@ -456,3 +543,26 @@ class ModuleStoreBase(ModuleStore):
             if c.id == course_id:
                 return c
         return None
+
+    def bulk_write_items(self, items):
+        """
+        Default impl--write the items one at a time
+        """
+        for location, data, children, metadata in items:
+            self.update_item(location, data, allow_not_found=True)
+            if children:
+                self.update_children(location, children)
+            self.update_metadata(location, metadata)
+
+    def get_child_position(self, course_id, parent_location, location):
+        """
+        Default impl--load the parent, and search its children
+        """
+        parent = self.get_instance(course_id, parent_location)
+        return [child.location for child in parent.get_children()].index(location)
+
+    def get_course_version(self, course_id):
+        """
+        Returns None: by default, changes to courses aren't tracked.
+        """
+        return None
@@ -0,0 +1,102 @@
+"""
+A small, thread-safe, bounded in-process cache used by the modulestores.
+"""
+
+import threading
+
+
+# The fields of the links of the list of entries, from least to most recently used
+PREV, NEXT, KEY, VALUE, SIZE = range(5)
+
+
+class LRUCache(object):
+    """
+    A dict-like cache holding at most `max_size` entries. When full, setting a
+    new key evicts the least recently used entry.
+
+    If `sizeof` is given, `max_size` bounds the total of `sizeof(value)` over
+    the entries instead (e.g. `len` of pickled values bounds their memory).
+
+    The entries are kept in a dict and in a circular doubly linked list, ordered
+    by use, so that every operation is a few list and dict operations: it's cheap
+    enough to cache values that are cheap to compute (e.g. Location urls).
+    """
+    def __init__(self, max_size, sizeof=None):
+        if max_size < 1:
+            raise ValueError("max_size must be positive, not {0}".format(max_size))
+        self.max_size = max_size
+        self.sizeof = sizeof
+        self.size = 0
+        self._links = {}
+        self._root = []
+        self._root[:] = [self._root, self._root, None, None, 0]
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        """
+        Return the value for `key`, marking it as most recently used, or `default`.
+        """
+        with self._lock:
+            link = self._links.get(key)
+            if link is None:
+                return default
+            # move the link to the most recently used end of the list
+            link[PREV][NEXT] = link[NEXT]
+            link[NEXT][PREV] = link[PREV]
+            root = self._root
+            last = root[PREV]
+            last[NEXT] = root[PREV] = link
+            link[PREV] = last
+            link[NEXT] = root
+            return link[VALUE]
+
+    def set(self, key, value):
+        """
+        Set the value of `key`, evicting the least recently used entry if needed.
+        """
+        size = self.sizeof(value) if self.sizeof is not None else 1
+        with self._lock:
+            self._unlink(key)
+            root = self._root
+            last = root[PREV]
+            link = [last, root, key, value, size]
+            last[NEXT] = root[PREV] = link
+            self._links[key] = link
+            self.size += size
+            # an entry larger than max_size isn't kept either
+            while self.size > self.max_size:
+                self._unlink(root[NEXT][KEY])
+
+    def delete(self, key):
+        """
+        Remove `key` from the cache, if present.
+        """
+        with self._lock:
+            self._unlink(key)
+
+    def _unlink(self, key):
+        """
+        Remove `key` from the cache, if present. The lock must be held.
+        """
+        link = self._links.pop(key, None)
+        if link is not None:
+            link[PREV][NEXT] = link[NEXT]
+            link[NEXT][PREV] = link[PREV]
+            self.size -= link[SIZE]
+
+    def clear(self):
+        """
+        Remove all entries from the cache.
+        """
+        with self._lock:
+            self._links.clear()
+            self._root[:] = [self._root, self._root, None, None, 0]
+            self.size = 0
+
+    def __contains__(self, key):
+        with self._lock:
+            return key in self._links
+
+    def __len__(self):
+        with self._lock:
+            return len(self._links)
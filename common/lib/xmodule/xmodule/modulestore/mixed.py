@@ -136,6 +136,13 @@ class MixedModuleStore(ModuleStoreBase):
         """
         return self._get_modulestore_for_courseid(course_id).get_parent_locations(location, course_id)
 
+    def get_child_position(self, course_id, parent_location, location):
+        """
+        returns the position of location among the children of parent_location, from the
+        modulestore servicing course_id
+        """
+        return self._get_modulestore_for_courseid(course_id).get_child_position(course_id, parent_location, location)
+
     def get_modulestore_type(self, course_id):
         """
         Returns a type which identifies which modulestore is servicing the given
@@ -143,6 +150,12 @@ class MixedModuleStore(ModuleStoreBase):
         """
         return self._get_modulestore_for_courseid(course_id).get_modulestore_type(course_id)
 
+    def get_course_version(self, course_id):
+        """
+        Returns the version of the given course_id, from the modulestore servicing it
+        """
+        return self._get_modulestore_for_courseid(course_id).get_course_version(course_id)
+
     def get_errored_courses(self):
         """
         Return a dictionary of course_dir -> [(msg, exception_str)], for each
@@ -15,9 +15,12 @@ structure:
 import pymongo
 import sys
 import logging
-import copy
+import cPickle as pickle
+
+from uuid import uuid4
 
 from bson.son import SON
+from collections import OrderedDict
 from fs.osfs import OSFS
 from itertools import repeat
 from path import path
@@ -33,6 +36,7 @@ from xblock.fields import Scope, ScopeIds
 
 from xmodule.modulestore import ModuleStoreBase, Location, MONGO_MODULESTORE_TYPE
 from xmodule.modulestore.exceptions import ItemNotFoundError
+from xmodule.modulestore.lru_cache import LRUCache
 from xmodule.modulestore.inheritance import own_metadata, InheritanceMixin, inherit_metadata, InheritanceKeyValueStore
 
 log = logging.getLogger(__name__)
@@ -250,6 +254,81 @@ def metadata_cache_key(location):
     return u"{0.org}/{0.course}".format(location)
 
 
+def structure_version_cache_key(location):
+    """The cache key holding the current version token of the structure of the course of `location`."""
+    return u"course_structure_version/{0.org}/{0.course}".format(location)
+
+
+def structure_cache_key(location, version):
+    """The cache key holding the serialized structure of the course of `location` at `version`."""
+    return u"course_structure/{0.org}/{0.course}/{1}".format(location, version)
+
+
+# The largest pickled course structure that is stored in the metadata_inheritance_cache_subsystem.
+# memcached rejects items over 1MB (by default), including their keys, without raising.
+MAX_SHARED_STRUCTURE_SIZE = 1000 * 1000
+
+# The number of items written by each round of MongoModuleStore.bulk_write_items
+BULK_WRITE_BATCH_SIZE = 500
+
+
+# The categories of the items whose inheritable metadata is passed down to their children.
+# Note this is a bit ugly as when we add new categories of containers, we have to add it here
+INHERITANCE_CONTAINER_CATEGORIES = [
+    'course', 'chapter', 'sequential', 'vertical', 'videosequence',
+    'wrapper', 'problemset', 'conditional', 'randomize'
+]
+
+
+def inheritable_metadata(metadata):
+    """Returns the subset of `metadata` that children inherit."""
+    return dict(
+        (field_name, metadata[field_name])
+        for field_name in InheritanceMixin.fields if field_name in metadata
+    )
+
+
+class MetadataInheritanceTree(dict):
+    """
+    Maps the location url of every item in a course to the metadata it inherits
+    from its ancestors (see MongoModuleStore.compute_metadata_inheritance_tree).
+
+    `containers` keeps the 'children' urls and 'own' inheritable metadata of every
+    container, so that writes which don't change the tree can be told apart. Items that inherit the same values
+    share the same metadata dict, so those dicts must never be modified in place.
+    """
+    def __init__(self, *args, **kwargs):
+        super(MetadataInheritanceTree, self).__init__(*args, **kwargs)
+        self.containers = {}
+        self.root = None
+
+    def inherit_down(self, url, inherited):
+        """
+        Recompute the metadata inherited by the descendants of the container at `url`,
+        given the metadata `inherited` from its parent.
+        """
+        container = self.containers[url]
+        if container['own']:
+            inherited = dict(inherited)
+            inherited.update(container['own'])
+        if url != self.root:
+            self[url] = inherited
+
+        # go through all the children and recurse, but only into containers.
+        # Remember containers will not contain leaf nodes
+        for child in container['children']:
+            if child in self.containers:
+                self.inherit_down(child, inherited)
+            else:
+                # this is likely a leaf node, so let's record what metadata we need to inherit
+                self[child] = inherited
+
+
+# Current structure version of each course, used when there is no
+# metadata_inheritance_cache_subsystem to share them between processes
+_LOCAL_STRUCTURE_VERSIONS = {}
+
+
 class MongoModuleStore(ModuleStoreBase):
     """
     A Mongodb backed ModuleStore
@@ -261,9 +340,16 @@ class MongoModuleStore(ModuleStoreBase):
     def __init__(self, doc_store_config, fs_root, render_template,
                  default_class=None,
                  error_tracker=null_error_tracker,
+                 course_structure_cache_size=0,
+                 parent_index_cache_size=20,
                  **kwargs):
         """
         :param doc_store_config: must have a host, db, and collection entries. Other common entries: port, tz_aware.
+        :param course_structure_cache_size: the number of courses whose documents are kept in memory
+            by this process, so that loading their items makes no queries. 0 (the default) disables
+            the course structure cache. See `_get_course_structure`.
+        :param parent_index_cache_size: the number of courses whose parent indexes are kept in
+            memory by this process. See `_get_parent_index`.
         """
 
         super(MongoModuleStore, self).__init__(**kwargs)
@@ -306,6 +392,14 @@ class MongoModuleStore(ModuleStoreBase):
         self.render_template = render_template
         self.ignore_write_events_on_courses = []
 
+        if course_structure_cache_size:
+            self.course_structure_cache = LRUCache(course_structure_cache_size)
+        else:
+            self.course_structure_cache = None
+        self.parent_index_cache = LRUCache(parent_index_cache_size)
+        # data_dir -> OSFS, so that loading items doesn't create one every time
+        self._resource_fs = {}
+
     def compute_metadata_inheritance_tree(self, location):
         '''
         TODO (cdodge) This method can be deleted when the 'split module store' work has been completed
@@ -315,8 +409,7 @@ class MongoModuleStore(ModuleStoreBase):
         # note this is a bit ugly as when we add new categories of containers, we have to add it here
         query = {'_id.org': location.org,
                  '_id.course': location.course,
-                 '_id.category': {'$in': ['course', 'chapter', 'sequential', 'vertical', 'videosequence',
-                                          'wrapper', 'problemset', 'conditional', 'randomize']}
+                 '_id.category': {'$in': INHERITANCE_CONTAINER_CATEGORIES}
                  }
         # we just want the Location, children, and inheritable metadata
         record_filter = {'_id': 1, 'definition.children': 1}
@@ -326,11 +419,24 @@ class MongoModuleStore(ModuleStoreBase):
         for field_name in InheritanceMixin.fields:
             record_filter['metadata.{0}'.format(field_name)] = 1
 
-        # call out to the DB
-        resultset = self.collection.find(query, record_filter)
+        structure = self._get_course_structure(location)
+        if structure is not None:
+            # project the cached documents the same way the query would
+            resultset = []
+            for item_location, item in structure.iteritems():
+                if item_location.category not in INHERITANCE_CONTAINER_CATEGORIES:
+                    continue
+                item = pickle.loads(item)
+                resultset.append({
+                    '_id': item['_id'],
+                    'definition': {'children': item.get('definition', {}).get('children', [])},
+                    'metadata': inheritable_metadata(item.get('metadata', {})),
+                })
+        else:
+            # call out to the DB
+            resultset = self.collection.find(query, record_filter)
 
-        results_by_url = {}
-        root = None
+        tree = MetadataInheritanceTree()
 
         # now go through the results and order them by the location url
         for result in resultset:
@@ -339,76 +445,52 @@ class MongoModuleStore(ModuleStoreBase):
             # i.e. draft verticals will have draft children but will have non-draft parents currently
             location = location.replace(revision=None)
             location_url = location.url()
-            if location_url in results_by_url:
-                existing_children = results_by_url[location_url].get('definition', {}).get('children', [])
-                additional_children = result.get('definition', {}).get('children', [])
-                total_children = existing_children + additional_children
-                results_by_url[location_url].setdefault('definition', {})['children'] = total_children
-            results_by_url[location.url()] = result
-            if location.category == 'course':
-                root = location.url()
-
-        # now traverse the tree and compute down the inherited metadata
-        metadata_to_inherit = {}
-
-        def _compute_inherited_metadata(url):
-            """
-            Helper method for computing inherited metadata for a specific location url
-            """
             # check for presence of metadata key. Note that a given module may not yet be fully formed.
             # example: update_item -> update_children -> update_metadata sequence on new item create
             # if we get called here without update_metadata called first then 'metadata' hasn't been set
             # as we're not fully transactional at the DB layer. Same comment applies to below key name
             # check
-            my_metadata = results_by_url[url].get('metadata', {})
-
-            # go through all the children and recurse, but only if we have
-            # in the result set. Remember results will not contain leaf nodes
-            for child in results_by_url[url].get('definition', {}).get('children', []):
-                if child in results_by_url:
-                    new_child_metadata = copy.deepcopy(my_metadata)
-                    new_child_metadata.update(results_by_url[child].get('metadata', {}))
-                    results_by_url[child]['metadata'] = new_child_metadata
-                    metadata_to_inherit[child] = new_child_metadata
-                    _compute_inherited_metadata(child)
-                else:
-                    # this is likely a leaf node, so let's record what metadata we need to inherit
-                    metadata_to_inherit[child] = my_metadata
-
-        if root is not None:
-            _compute_inherited_metadata(root)
-
-        return metadata_to_inherit
-
-    def get_cached_metadata_inheritance_tree(self, location, force_refresh=False):
-        '''
-        TODO (cdodge) This method can be deleted when the 'split module store' work has been completed
-        '''
-        key = metadata_cache_key(location)
-        tree = {}
+            children = result.get('definition', {}).get('children', [])
+            if location_url in tree.containers:
+                children = tree.containers[location_url]['children'] + children
+            tree.containers[location_url] = {
+                'children': children,
+                'own': result.get('metadata', {}),
+            }
+            if location.category == 'course':
+                tree.root = location_url
 
-        if not force_refresh:
-            # see if we are first in the request cache (if present)
-            if self.request_cache is not None and key in self.request_cache.data.get('metadata_inheritance', {}):
-                return self.request_cache.data['metadata_inheritance'][key]
+        # now traverse the tree and compute down the inherited metadata
+        if tree.root is not None:
+            tree.inherit_down(tree.root, {})
 
-            # then look in any caching subsystem (e.g. memcached)
-            if self.metadata_inheritance_cache_subsystem is not None:
-                tree = self.metadata_inheritance_cache_subsystem.get(key, {})
-            else:
-                logging.warning('Running MongoModuleStore without a metadata_inheritance_cache_subsystem. This is OK in localdev and testing environment. Not OK in production.')
+        return tree
 
-        if not tree:
-            # if not in subsystem, or we are on force refresh, then we have to compute
-            tree = self.compute_metadata_inheritance_tree(location)
+    def _find_cached_metadata_inheritance_tree(self, key):
+        """
+        Returns the inheritance tree cached under `key` in the request cache or the
+        metadata_inheritance_cache_subsystem, or None if there isn't one.
+        """
+        # see if we are first in the request cache (if present)
+        if self.request_cache is not None and key in self.request_cache.data.get('metadata_inheritance', {}):
+            return self.request_cache.data['metadata_inheritance'][key]
+
+        # then look in any caching subsystem (e.g. memcached)
+        if self.metadata_inheritance_cache_subsystem is not None:
+            tree = self.metadata_inheritance_cache_subsystem.get(key)
+            # trees cached by older code are plain dicts, without the containers
+            if isinstance(tree, MetadataInheritanceTree):
+                self._cache_metadata_inheritance_tree_for_request(key, tree)
+                return tree
+        else:
+            logging.warning('Running MongoModuleStore without a metadata_inheritance_cache_subsystem. This is OK in localdev and testing environment. Not OK in production.')
 
-            # now write out computed tree to caching subsystem (e.g. memcached), if available
-            if self.metadata_inheritance_cache_subsystem is not None:
-                self.metadata_inheritance_cache_subsystem.set(key, tree)
+        return None
 
-        # now populate a request_cache, if available. NOTE, we are outside of the
-        # scope of the above if: statement so that after a memcache hit, it'll get
-        # put into the request_cache
+    def _cache_metadata_inheritance_tree_for_request(self, key, tree):
+        """
+        Populate the request_cache, if available, with `tree`
+        """
         if self.request_cache is not None:
             # we can't assume the 'metadatat_inheritance' part of the request cache dict has been
             # defined
@@ -416,6 +498,29 @@ class MongoModuleStore(ModuleStoreBase):
                 self.request_cache.data['metadata_inheritance'] = {}
             self.request_cache.data['metadata_inheritance'][key] = tree
 
+    def _publish_metadata_inheritance_tree(self, key, tree):
+        """
+        Write `tree` out to the caching subsystem (e.g. memcached), if available, and to the request cache
+        """
+        if self.metadata_inheritance_cache_subsystem is not None:
+            self.metadata_inheritance_cache_subsystem.set(key, tree)
+        self._cache_metadata_inheritance_tree_for_request(key, tree)
+
+    def get_cached_metadata_inheritance_tree(self, location, force_refresh=False):
+        '''
+        TODO (cdodge) This method can be deleted when the 'split module store' work has been completed
+        '''
+        key = metadata_cache_key(location)
+        tree = None
+
+        if not force_refresh:
+            tree = self._find_cached_metadata_inheritance_tree(key)
+
+        if tree is None:
+            # if not in subsystem, or we are on force refresh, then we have to compute
+            tree = self.compute_metadata_inheritance_tree(location)
+            self._publish_metadata_inheritance_tree(key, tree)
+
         return tree
 
     def refresh_cached_metadata_inheritance_tree(self, location):
@@ -427,6 +532,197 @@ class MongoModuleStore(ModuleStoreBase):
         if pseudo_course_id not in self.ignore_write_events_on_courses:
             self.get_cached_metadata_inheritance_tree(location, force_refresh=True)
 
+    def update_cached_metadata_inheritance_tree(self, location, metadata=None, children=None):
+        """
+        Update the cached metadata inheritance tree for the org/course combination
+        for location after the `metadata` and/or `children` of `location` were written.
+
+        Leaves, and the metadata of containers that isn't inherited, take no part in the
+        tree, so writes which don't change the children or inheritable metadata of a
+        container leave the cached tree alone. Otherwise the cached tree is dropped, and
+        recomputed by the next read: the tree is shared between processes, so patching it
+        in place would lose the patches of concurrent writes.
+        """
+        location = Location(location).replace(revision=None)
+        pseudo_course_id = '/'.join([location.org, location.course])
+        if pseudo_course_id in self.ignore_write_events_on_courses:
+            return
+        if location.category not in INHERITANCE_CONTAINER_CATEGORIES:
+            return
+
+        key = metadata_cache_key(location)
+        tree = self._find_cached_metadata_inheritance_tree(key)
+        if tree is None:
+            # the next read will compute an up to date tree
+            return
+
+        container = tree.containers.get(location.url())
+        unchanged = (
+            container is not None and
+            (children is None or list(children) == container['children']) and
+            (metadata is None or inheritable_metadata(metadata) == container['own'])
+        )
+        if not unchanged:
+            self._invalidate_metadata_inheritance_tree(key)
+
+    def _invalidate_metadata_inheritance_tree(self, key):
+        """
+        Drop the inheritance tree cached under `key` from the caching subsystem (e.g. memcached)
+        and the request cache
+        """
+        if self.metadata_inheritance_cache_subsystem is not None:
+            self.metadata_inheritance_cache_subsystem.delete(key)
+        if self.request_cache is not None:
+            self.request_cache.data.get('metadata_inheritance', {}).pop(key, None)
+
+    def _get_course_structure(self, location):
+        """
+        Returns a dict mapping the Location of every document (of any revision) in
+        the course of `location` to the pickled document, or None if the course
+        structure cache is disabled.
+
+        The structure is kept in a per-process LRU cache, and in the
+        metadata_inheritance_cache_subsystem, keyed by a version token that
+        every write to the course replaces (see `_invalidate_course_structure`),
+        so that on a warm cache loading items makes no queries.
+        """
+        if self.course_structure_cache is None:
+            return None
+
+        key = metadata_cache_key(location)
+        version = self._get_course_structure_version(location)
+        cached = self.course_structure_cache.get(key)
+        if cached is not None and cached[0] == version:
+            return cached[1]
+
+        structure = None
+        if self.metadata_inheritance_cache_subsystem is not None:
+            structure = self.metadata_inheritance_cache_subsystem.get(structure_cache_key(location, version))
+
+        if structure is None:
+            # get all of the documents in the course in a single round-trip
+            query = {'_id.org': location.org, '_id.course': location.course}
+            structure = dict(
+                (Location(item['_id']), pickle.dumps(item, pickle.HIGHEST_PROTOCOL))
+                for item in self.collection.find(query)
+            )
+            if self.metadata_inheritance_cache_subsystem is not None:
+                self._share_course_structure(location, version, structure)
+
+        self.course_structure_cache.set(key, (version, structure))
+        return structure
+
+    def _share_course_structure(self, location, version, structure):
+        """
+        Store `structure` in the metadata_inheritance_cache_subsystem, unless it's too big to be
+        stored there, in which case every process reads the course from the collection.
+        """
+        size = len(pickle.dumps(structure, pickle.HIGHEST_PROTOCOL))
+        if size > MAX_SHARED_STRUCTURE_SIZE:
+            log.warning(
+                "The structure of course %s is %d bytes, which is too big to be cached in the "
+                "metadata_inheritance_cache_subsystem", metadata_cache_key(location), size
+            )
+            return
+        self.metadata_inheritance_cache_subsystem.set(structure_cache_key(location, version), structure)
+
+    def _get_course_structure_version(self, location):
+        """
+        Returns the version token of the structure of the course of `location`.
+        """
+        key = structure_version_cache_key(location)
+        if self.metadata_inheritance_cache_subsystem is None:
+            return _LOCAL_STRUCTURE_VERSIONS.setdefault(key, uuid4().hex)
+
+        version = self.metadata_inheritance_cache_subsystem.get(key)
+        if version is None:
+            self.metadata_inheritance_cache_subsystem.add(key, uuid4().hex)
+            version = self.metadata_inheritance_cache_subsystem.get(key)
+        return version
+
+    def get_course_version(self, course_id):
+        """
+        Returns the version token of the structure of the course course_id, which every
+        write to the course replaces (see `_invalidate_course_structure`)
+        """
+        org, course, run = course_id.split('/')
+        return self._get_course_structure_version(Location('i4x', org, course, 'course', run))
+
+    def _invalidate_course_structure(self, location):
+        """
+        Mark the cached structure of the course of `location` as out of date, in
+        this and every other process. Must be called after every write to the collection.
+        """
+        key = structure_version_cache_key(location)
+        if self.metadata_inheritance_cache_subsystem is None:
+            _LOCAL_STRUCTURE_VERSIONS[key] = uuid4().hex
+        else:
+            self.metadata_inheritance_cache_subsystem.set(key, uuid4().hex)
+
+        if self.course_structure_cache is not None:
+            self.course_structure_cache.delete(metadata_cache_key(location))
+        self.parent_index_cache.delete(metadata_cache_key(location))
+
+    def _get_parent_index(self, location):
+        """
+        Returns a dict mapping the url of every item with a parent in the course of `location`
+        to a list of (parent _id, position) pairs, where position is the index of the item
+        among those children of the parent which get_children finds (see `_found_child_urls`).
+
+        The index is built from a single query (or from the course structure cache), and kept
+        in a per-process LRU cache keyed by the version of the course structure, so it is
+        rebuilt after any write to the course.
+        """
+        key = metadata_cache_key(location)
+        version = self._get_course_structure_version(location)
+        cached = self.parent_index_cache.get(key)
+        if cached is not None and cached[0] == version:
+            return cached[1]
+
+        structure = self._get_course_structure(location)
+        if structure is not None:
+            items = [pickle.loads(item) for item in structure.itervalues()]
+        else:
+            query = {'_id.org': location.org, '_id.course': location.course}
+            items = list(self.collection.find(query, {'_id': True, 'definition.children': True}))
+
+        existing = self._found_child_urls(items)
+        index = {}
+        for item in items:
+            position = 0
+            for child in item.get('definition', {}).get('children', []):
+                index.setdefault(child, []).append((item['_id'], position))
+                if child in existing:
+                    position += 1
+
+        self.parent_index_cache.set(key, (version, index))
+        return index
+
+    def _found_child_urls(self, items):
+        """
+        Returns the set of the urls of those of `items` (documents of a course) which get_children
+        finds when they are children: the published ones, as get_children skips children which
+        only exist as drafts.
+        """
+        return set(Location(item['_id']).url() for item in items if item['_id'].get('revision') is None)
+
+    def _find_by_locations(self, locations):
+        """
+        Returns the documents stored at exactly `locations`, which must all be in the same course,
+        in no particular order.
+        """
+        if not locations:
+            return []
+
+        structure = self._get_course_structure(locations[0])
+        if structure is not None:
+            return [pickle.loads(structure[location]) for location in locations if location in structure]
+
+        query = {
+            '_id': {'$in': [namedtuple_to_son(location) for location in locations]}
+        }
+        return list(self.collection.find(query))
+
     def _clean_item_data(self, item):
         """
         Renames the '_id' field in item to 'location'
@@ -436,10 +732,7 @@ class MongoModuleStore(ModuleStoreBase):
 
     def _query_children_for_cache_children(self, items):
         # first get non-draft in a round-trip
-        query = {
-            '_id': {'$in': [namedtuple_to_son(Location(item)) for item in items]}
-        }
-        return list(self.collection.find(query))
+        return self._find_by_locations([Location(item) for item in items])
 
     def _cache_children(self, items, depth=0):
         """
@@ -480,12 +773,14 @@ class MongoModuleStore(ModuleStoreBase):
         Load an XModuleDescriptor from item, using the children stored in data_cache
         """
         data_dir = getattr(item, 'data_dir', item['location']['course'])
-        root = self.fs_root / data_dir
+        resource_fs = self._resource_fs.get(data_dir)
+        if resource_fs is None:
+            root = self.fs_root / data_dir
 
-        if not root.isdir():
-            root.mkdir()
+            if not root.isdir():
+                root.mkdir()
 
-        resource_fs = OSFS(root)
+            resource_fs = self._resource_fs[data_dir] = OSFS(root)
 
         cached_metadata = {}
         if apply_cached_metadata:
@@ -538,10 +833,17 @@ class MongoModuleStore(ModuleStoreBase):
         specified, returns the latest.  If the item is not present, raise
         ItemNotFoundError.
         '''
-        item = self.collection.find_one(
-            location_to_query(location, wildcard=False),
-            sort=[('revision', pymongo.ASCENDING)],
-        )
+        location = Location(location)
+        structure = self._get_course_structure(location)
+        if structure is not None:
+            item = structure.get(location)
+            if item is not None:
+                item = pickle.loads(item)
+        else:
+            item = self.collection.find_one(
+                location_to_query(location, wildcard=False),
+                sort=[('revision', pymongo.ASCENDING)],
+            )
         if item is None:
             raise ItemNotFoundError(location)
         return item
@@ -660,8 +962,13 @@ class MongoModuleStore(ModuleStoreBase):
                     'children': xmodule.children if xmodule.has_children else []
                 }
             })
-        # recompute (and update) the metadata inheritance tree which is cached
-        self.refresh_cached_metadata_inheritance_tree(xmodule.location)
+        self._invalidate_course_structure(xmodule.location)
+        # update the metadata inheritance tree which is cached
+        self.update_cached_metadata_inheritance_tree(
+            xmodule.location,
+            metadata=own_metadata(xmodule),
+            children=xmodule.children if xmodule.has_children else [],
+        )
         self.fire_updated_modulestore_signal(get_course_id_no_run(xmodule.location), xmodule.location)
 
     def create_and_save_xmodule(self, location, definition_data=None, metadata=None, system=None):
@@ -751,6 +1058,7 @@ class MongoModuleStore(ModuleStoreBase):
             # from overriding our default value set in the init method.
             safe=self.collection.safe
         )
+        self._invalidate_course_structure(Location(location))
         if result['n'] == 0:
             raise ItemNotFoundError(location)
 
@@ -778,8 +1086,8 @@ class MongoModuleStore(ModuleStoreBase):
         """
 
         self._update_single_item(location, {'definition.children': children})
-        # recompute (and update) the metadata inheritance tree which is cached
-        self.refresh_cached_metadata_inheritance_tree(Location(location))
+        # update the metadata inheritance tree which is cached
+        self.update_cached_metadata_inheritance_tree(Location(location), children=children)
         # fire signal that we've written to DB
         self.fire_updated_modulestore_signal(get_course_id_no_run(Location(location)), Location(location))
 
@@ -791,27 +1099,101 @@ class MongoModuleStore(ModuleStoreBase):
         location: Something that can be passed to Location
         metadata: A nested dictionary of module metadata
         """
-        # VS[compat] cdodge: This is a hack because static_tabs also have references from the course module, so
-        # if we add one then we need to also add it to the policy information (i.e. metadata)
-        # we should remove this once we can break this reference from the course to static tabs
         loc = Location(location)
         if loc.category == 'static_tab':
-            course = self._get_course_for_item(loc)
-            existing_tabs = course.tabs or []
-            for tab in existing_tabs:
-                if tab.get('url_slug') == loc.name:
-                    tab['name'] = metadata.get('display_name', tab.get('name'))
-                    break
-            course.tabs = existing_tabs
-            # Save the updates to the course to the MongoKeyValueStore
-            course.save()
-            self.update_metadata(course.location, own_metadata(course))
+            self._update_static_tab_name(loc, metadata)
 
         self._update_single_item(location, {'metadata': metadata})
-        # recompute (and update) the metadata inheritance tree which is cached
-        self.refresh_cached_metadata_inheritance_tree(loc)
+        # update the metadata inheritance tree which is cached
+        self.update_cached_metadata_inheritance_tree(loc, metadata=metadata)
         self.fire_updated_modulestore_signal(get_course_id_no_run(Location(location)), Location(location))
 
+    def _update_static_tab_name(self, location, metadata):
+        """
+        Copy the display_name in the new `metadata` of the static tab at `location`
+        to the course's tab for it.
+        """
+        # VS[compat] cdodge: This is a hack because static_tabs also have references from the course module, so
+        # if we add one then we need to also add it to the policy information (i.e. metadata)
+        # we should remove this once we can break this reference from the course to static tabs
+        course = self._get_course_for_item(location)
+        existing_tabs = course.tabs or []
+        for tab in existing_tabs:
+            if tab.get('url_slug') == location.name:
+                tab['name'] = metadata.get('display_name', tab.get('name'))
+                break
+        course.tabs = existing_tabs
+        # Save the updates to the course to the MongoKeyValueStore
+        course.save()
+        self.update_metadata(course.location, own_metadata(course))
+
+    def bulk_write_items(self, items):
+        """
+        Write many items at once, as update_item, update_children and update_metadata
+        would, creating the items that don't exist.
+
+        Rather than making three round-trips per item, each with its own cache updates,
+        the items are written BULK_WRITE_BATCH_SIZE at a time, with one query to find
+        which exist, a single insert of those that don't, and one update for each of those
+        that do. The caches of each course written to are updated once, at the end.
+
+        items: an iterable of (location, data, children, metadata) tuples. The children
+            of items with empty or None children are left as they are.
+        """
+        courses = {}
+        batch = []
+        for location, data, children, metadata in items:
+            location = Location(location)
+            courses.setdefault(metadata_cache_key(location), location)
+            if location.category == 'static_tab':
+                self._update_static_tab_name(location, metadata)
+            batch.append((location, data, children, metadata))
+            if len(batch) >= BULK_WRITE_BATCH_SIZE:
+                self._bulk_write_batch(batch)
+                batch = []
+        if batch:
+            self._bulk_write_batch(batch)
+
+        for location in courses.itervalues():
+            self._invalidate_course_structure(location)
+            self.refresh_cached_metadata_inheritance_tree(location)
+            self.fire_updated_modulestore_signal(get_course_id_no_run(location), location)
+
+    def _bulk_write_batch(self, batch):
+        """
+        Write a batch of (location, data, children, metadata) for bulk_write_items
+        """
+        existing = set(
+            Location(item['_id']) for item in self.collection.find(
+                {'_id': {'$in': [location.dict() for location, _, _, _ in batch]}},
+                {'_id': True}
+            )
+        )
+
+        # if an item appears more than once, the last write wins, as it would one item at a time
+        new_items = OrderedDict()
+        for location, data, children, metadata in batch:
+            if location in existing:
+                update = {'definition.data': data, 'metadata': metadata}
+                if children:
+                    update['definition.children'] = children
+                self.collection.update(
+                    {'_id': location.dict()},
+                    {'$set': update},
+                    multi=False,
+                    upsert=True,
+                    safe=self.collection.safe
+                )
+            else:
+                item = new_items.setdefault(location, {'_id': location.dict(), 'definition': {}})
+                item['definition']['data'] = data
+                if children:
+                    item['definition']['children'] = children
+                item['metadata'] = metadata
+
+        if new_items:
+            self.collection.insert(new_items.values(), safe=self.collection.safe)
+
     def delete_item(self, location, delete_all_versions=False):
         """
         Delete an item from this modulestore
@@ -834,8 +1216,11 @@ class MongoModuleStore(ModuleStoreBase):
         # Must include this to avoid the django debug toolbar (which defines the deprecated "safe=False")
         # from overriding our default value set in the init method.
         self.collection.remove({'_id': Location(location).dict()}, safe=self.collection.safe)
-        # recompute (and update) the metadata inheritance tree which is cached
-        self.refresh_cached_metadata_inheritance_tree(Location(location))
+        self._invalidate_course_structure(Location(location))
+        # recompute (and update) the metadata inheritance tree which is cached. Leaves don't
+        # take part in it, so only deleting a container requires this
+        if Location(location).category in INHERITANCE_CONTAINER_CATEGORIES:
+            self.refresh_cached_metadata_inheritance_tree(Location(location))
         self.fire_updated_modulestore_signal(get_course_id_no_run(Location(location)), Location(location))
 
     def get_parent_locations(self, location, course_id):
@@ -843,9 +1228,20 @@ class MongoModuleStore(ModuleStoreBase):
         course.  Needed for path_to_location().
         '''
         location = Location.ensure_fully_specified(location)
-        items = self.collection.find({'definition.children': location.url()},
-                                     {'_id': True})
-        return [i['_id'] for i in items]
+        index = self._get_parent_index(location)
+        return [parent for parent, _ in index.get(location.url(), [])]
+
+    def get_child_position(self, course_id, parent_location, location):
+        """
+        Returns the position of location among the children of parent_location,
+        from the parent index of the course.
+        """
+        location = Location(location)
+        parent_location = Location(parent_location)
+        for parent, position in self._get_parent_index(location).get(location.url(), []):
+            if Location(parent) == parent_location:
+                return position
+        raise ValueError("{0} is not a child of {1}".format(location, parent_location))
 
     def get_modulestore_type(self, course_id):
         """
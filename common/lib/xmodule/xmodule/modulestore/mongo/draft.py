@@ -9,10 +9,10 @@ and otherwise returns i4x://org/course/cat/name).
 from datetime import datetime
 
 from xmodule.exceptions import InvalidVersionError
-from xmodule.modulestore import Location
+from xmodule.modulestore import Location, ModuleStoreBase
 from xmodule.modulestore.exceptions import ItemNotFoundError, DuplicateItemError
 from xmodule.modulestore.inheritance import own_metadata
-from xmodule.modulestore.mongo.base import location_to_query, namedtuple_to_son, get_course_id_no_run, MongoModuleStore
+from xmodule.modulestore.mongo.base import location_to_query, get_course_id_no_run, MongoModuleStore
 import pymongo
 from pytz import UTC
 from xblock.fields import Scope
@@ -151,8 +151,9 @@ class DraftModuleStore(MongoModuleStore):
             self.collection.insert(original)
         except pymongo.errors.DuplicateKeyError:
             raise DuplicateItemError(original['_id'])
+        self._invalidate_course_structure(draft_location)
 
-        self.refresh_cached_metadata_inheritance_tree(draft_location)
+        # the draft is a copy of the source, so the metadata inheritance tree is unchanged
         self.fire_updated_modulestore_signal(get_course_id_no_run(draft_location), draft_location)
 
         return self._load_items([original])[0]
@@ -176,6 +177,12 @@ class DraftModuleStore(MongoModuleStore):
 
         return super(DraftModuleStore, self).update_item(draft_loc, data)
 
+    def bulk_write_items(self, items):
+        """
+        Write the items one at a time, so that each is written as a draft
+        """
+        return ModuleStoreBase.bulk_write_items(self, items)
+
     def update_children(self, location, children):
         """
         Set the children for the item specified by the location to
@@ -230,6 +237,13 @@ class DraftModuleStore(MongoModuleStore):
         '''
         return super(DraftModuleStore, self).get_parent_locations(location, course_id)
 
+    def _found_child_urls(self, items):
+        """
+        Returns the set of the urls of those of `items` which get_children finds when they are
+        children: all of them, as drafts are found in place of their published versions.
+        """
+        return set(Location(item['_id']).replace(revision=None).url() for item in items)
+
     def publish(self, location, published_by_id):
         """
         Save a current draft to the underlying modulestore
@@ -274,10 +288,7 @@ class DraftModuleStore(MongoModuleStore):
             to_process_dict[Location(non_draft["_id"])] = non_draft
 
         # now query all draft content in another round-trip
-        query = {
-            '_id': {'$in': [namedtuple_to_son(as_draft(Location(item))) for item in items]}
-        }
-        to_process_drafts = list(self.collection.find(query))
+        to_process_drafts = self._find_by_locations([as_draft(Location(item)) for item in items])
 
         # now we have to go through all drafts and replace the non-draft
         # with the draft. This is because the semantics of the DraftStore is to
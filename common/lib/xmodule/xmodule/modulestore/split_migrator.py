@@ -78,12 +78,14 @@ class SplitMigrator(object):
                 new_locator = self.loc_mapper.translate_location(
                     old_course_id, module.location, True, add_entry_if_missing=True
                 )
-                _new_module = self.split_modulestore.create_item(
+                new_module = self.split_modulestore.create_item(
                     course_version_locator, module.category, user_id,
                     usage_id=new_locator.usage_id,
                     fields=self._get_json_fields_translate_children(module, old_course_id, True),
                     continue_version=True
                 )
+                # continuing the version gives it a new id
+                course_version_locator = new_module.location.as_course_locator()
         # after done w/ published items, add version for 'draft' pointing to the published structure
         index_info = self.split_modulestore.get_course_index_info(course_version_locator)
         versions = index_info['versions']
@@ -3,6 +3,8 @@ import datetime
 import logging
 import pymongo
 import re
+import time
+import cPickle as pickle
 from importlib import import_module
 from path import path
 import collections
@@ -14,6 +16,7 @@ from xmodule.x_module import XModuleDescriptor
 from xmodule.modulestore.locator import BlockUsageLocator, DefinitionLocator, CourseLocator, VersionTree, LocalId
 from xmodule.modulestore.exceptions import InsufficientSpecificationError, VersionConflictError, DuplicateItemError
 from xmodule.modulestore import inheritance, ModuleStoreBase, Location
+from xmodule.modulestore.lru_cache import LRUCache
 
 from ..exceptions import ItemNotFoundError
 from .definition_lazy_loader import DefinitionLazyLoader
@@ -43,6 +46,17 @@ log = logging.getLogger(__name__)
 #
 #==============================================================================
 
+# The number of course index entries kept by the course index cache
+COURSE_INDEX_CACHE_SIZE = 1000
+
+
+def document_cache_key(collection, document_id):
+    """
+    The key of the pickled document `document_id` of `collection` in the document cache
+    and the metadata_inheritance_cache_subsystem
+    """
+    return u"split.{0}.{1}".format(collection.name, document_id)
+
 
 class SplitMongoModuleStore(ModuleStoreBase):
     """
@@ -54,9 +68,19 @@ class SplitMongoModuleStore(ModuleStoreBase):
                  default_class=None,
                  error_tracker=null_error_tracker,
                  loc_mapper=None,
+                 document_cache_size=64 * 1024 * 1024,
+                 course_index_cache_timeout=0,
+                 course_cache_size=20,
                  **kwargs):
         """
         :param doc_store_config: must have a host, db, and collection entries. Other common entries: port, tz_aware.
+        :param document_cache_size: the total size, in bytes, of the pickled structures and definitions
+            kept in memory by this process. 0 disables the document cache. See `_find_document`.
+        :param course_index_cache_timeout: how many seconds this process may use the course index
+            entries it has read, rather than read them again, to find the head versions of courses.
+            0 (the default) disables the course index cache. See `_get_course_index`.
+        :param course_cache_size: the number of course versions whose descriptors are kept by each
+            thread. See `_get_cache`.
         """
 
         super(SplitMongoModuleStore, self).__init__(**kwargs)
@@ -87,10 +111,18 @@ class SplitMongoModuleStore(ModuleStoreBase):
 
         do_connection(**doc_store_config)
 
-        # Code review question: How should I expire entries?
-        # _add_cache could use a lru mechanism to control the cache size?
         self.thread_cache = threading.local()
+        self.course_cache_size = course_cache_size
 
+        if document_cache_size:
+            self.document_cache = LRUCache(document_cache_size, sizeof=len)
+        else:
+            self.document_cache = None
+        self.course_index_cache_timeout = course_index_cache_timeout
+        if course_index_cache_timeout:
+            self.course_index_cache = LRUCache(COURSE_INDEX_CACHE_SIZE)
+        else:
+            self.course_index_cache = None
 
         # every app has write access to the db (v having a flag to indicate r/o v write)
         # Force mongo to report errors, at the expense of performance
@@ -138,12 +170,9 @@ class SplitMongoModuleStore(ModuleStoreBase):
                 block['definition'] = DefinitionLazyLoader(self, block['definition'])
         else:
             # Load all descendants by id
-            descendent_definitions = self.definitions.find({
-                '_id': {'$in': [block['definition']
-                                for block in new_module_data.itervalues()]}})
-            # turn into a map
-            definitions = {definition['_id']: definition
-                           for definition in descendent_definitions}
+            definitions = self._find_documents(
+                self.definitions, [block['definition'] for block in new_module_data.itervalues()]
+            )
 
             for block in new_module_data.itervalues():
                 if block['definition'] in definitions:
@@ -177,11 +206,12 @@ class SplitMongoModuleStore(ModuleStoreBase):
 
     def _get_cache(self, course_version_guid):
         """
-        Find the descriptor cache for this course if it exists
+        Find the descriptor cache for this course if it exists. Each thread keeps those of its
+        course_cache_size most recently used course versions.
         :param course_version_guid:
         """
         if not hasattr(self.thread_cache, 'course_cache'):
-            self.thread_cache.course_cache = {}
+            self.thread_cache.course_cache = LRUCache(self.course_cache_size)
         system = self.thread_cache.course_cache
         return system.get(course_version_guid)
 
@@ -192,8 +222,8 @@ class SplitMongoModuleStore(ModuleStoreBase):
         :param system:
         """
         if not hasattr(self.thread_cache, 'course_cache'):
-            self.thread_cache.course_cache = {}
-        self.thread_cache.course_cache[course_version_guid] = system
+            self.thread_cache.course_cache = LRUCache(self.course_cache_size)
+        self.thread_cache.course_cache.set(course_version_guid, system)
         return system
 
     def _clear_cache(self, course_version_guid=None):
@@ -202,9 +232,168 @@ class SplitMongoModuleStore(ModuleStoreBase):
         :param course_version_guid: if provided, clear only this entry
         """
         if course_version_guid:
-            del self.thread_cache.course_cache[course_version_guid]
+            self.thread_cache.course_cache.delete(course_version_guid)
         else:
-            self.thread_cache.course_cache = {}
+            self.thread_cache.course_cache = LRUCache(self.course_cache_size)
+
+    def _find_document(self, collection, document_id):
+        """
+        Returns the document `document_id` of `collection` (structures or definitions), or None.
+
+        Structures and definitions aren't changed once written (edits write new versions, and
+        even continued versions get a new id, see `_continue_structure`), so they are kept,
+        pickled, in the per-process document cache, bounded by their size, and in the
+        metadata_inheritance_cache_subsystem. Each call returns a new copy, which the caller
+        may change.
+        """
+        if self.document_cache is None:
+            return collection.find_one({'_id': document_id})
+
+        pickled = self._get_cached_document(collection, document_id)
+        if pickled is not None:
+            return pickle.loads(pickled)
+
+        document = collection.find_one({'_id': document_id})
+        if document is not None:
+            self._cache_document(collection, document)
+        return document
+
+    def _find_documents(self, collection, document_ids):
+        """
+        Returns a dict of the documents of `collection` whose ids are in `document_ids`, by id,
+        reading those which aren't cached (see `_find_document`) in a single query.
+        """
+        if self.document_cache is None:
+            return {document['_id']: document for document in collection.find({'_id': {'$in': document_ids}})}
+
+        documents = {}
+        missing = []
+        for document_id in document_ids:
+            pickled = self._get_cached_document(collection, document_id)
+            if pickled is not None:
+                documents[document_id] = pickle.loads(pickled)
+            else:
+                missing.append(document_id)
+
+        if missing:
+            for document in collection.find({'_id': {'$in': missing}}):
+                self._cache_document(collection, document)
+                documents[document['_id']] = document
+        return documents
+
+    def _get_cached_document(self, collection, document_id):
+        """
+        Returns the pickled document `document_id` of `collection` from the document cache, or
+        else from the metadata_inheritance_cache_subsystem, or None if neither has it.
+        """
+        key = document_cache_key(collection, document_id)
+        pickled = self.document_cache.get(key)
+        if pickled is None and self.metadata_inheritance_cache_subsystem is not None:
+            pickled = self.metadata_inheritance_cache_subsystem.get(key)
+            if pickled is not None:
+                self.document_cache.set(key, pickled)
+        return pickled
+
+    def _cache_document(self, collection, document):
+        """
+        Adds `document`, read from `collection`, to the document cache and the
+        metadata_inheritance_cache_subsystem
+        """
+        key = document_cache_key(collection, document['_id'])
+        pickled = pickle.dumps(document, pickle.HIGHEST_PROTOCOL)
+        self.document_cache.set(key, pickled)
+        if self.metadata_inheritance_cache_subsystem is not None:
+            self.metadata_inheritance_cache_subsystem.set(key, pickled)
+
+    def _continue_structure(self, structure, index_entry):
+        """
+        Writes `structure`, changed without starting a new version (continue_version in
+        create_item, or internal_clean_children), in place of the version it was read as.
+
+        The version keeps its history but gets a new id, so that no process can keep serving
+        its old content from the document cache: the branches of `index_entry` which pointed
+        at the old id are moved to the new one, and the old version, which only ever was an
+        intermediate state of the change, is deleted.
+
+        Returns the new id.
+        """
+        old_id = structure['_id']
+        new_id = ObjectId()
+        structure['_id'] = new_id
+        if structure['original_version'] == old_id:
+            structure['original_version'] = new_id
+        for block in structure['blocks'].itervalues():
+            edit_info = block.get('edit_info', {})
+            for key in ('update_version', 'previous_version'):
+                if edit_info.get(key) == old_id:
+                    edit_info[key] = new_id
+        self.structures.insert(structure)
+
+        for branch, version_guid in index_entry['versions'].items():
+            if version_guid == old_id:
+                self._update_head(index_entry, branch, new_id)
+        self.structures.remove({'_id': old_id})
+        self._uncache_document(self.structures, old_id)
+        self._clear_cache(old_id)
+        return new_id
+
+    def _uncache_document(self, collection, document_id):
+        """
+        Drops the document `document_id` of `collection`, which has been deleted, from this
+        process's document cache and the metadata_inheritance_cache_subsystem.
+        """
+        if self.document_cache is None:
+            return
+        key = document_cache_key(collection, document_id)
+        self.document_cache.delete(key)
+        if self.metadata_inheritance_cache_subsystem is not None:
+            self.metadata_inheritance_cache_subsystem.delete(key)
+
+    def _find_definition(self, definition_id):
+        """
+        Returns the definition `definition_id`, or None. See `_find_document`.
+        """
+        return self._find_document(self.definitions, definition_id)
+
+    def _get_course_index(self, course_id, fresh=False):
+        """
+        Returns the index entry of course_id, or None if there's none.
+
+        Unless `fresh`, an entry read by this process within the last course_index_cache_timeout
+        seconds may be returned, so the heads of its branches may be that much out of date.
+        Writes read the entry fresh, which also updates the cache (see `_refresh_course_index`).
+        """
+        if self.course_index_cache is None:
+            return self.course_index.find_one({'_id': course_id})
+
+        if not fresh:
+            cached = self.course_index_cache.get(course_id)
+            if cached is not None and cached[0] > time.time():
+                return copy.deepcopy(cached[1])
+
+        index = self.course_index.find_one({'_id': course_id})
+        if index is None:
+            self.course_index_cache.delete(course_id)
+        else:
+            self.course_index_cache.set(
+                course_id, (time.time() + self.course_index_cache_timeout, copy.deepcopy(index))
+            )
+        return index
+
+    def _refresh_course_index(self, locator):
+        """
+        Reads the index entry of the course of `locator`, if any, afresh, so that a write looks
+        up the current head of the course, rather than the one in the course index cache.
+        """
+        if self.course_index_cache is not None and locator.course_id is not None:
+            self._get_course_index(locator.course_id, fresh=True)
+
+    def _uncache_course_index(self, course_id):
+        """
+        Drops the index entry of course_id, which has been written, from the course index cache
+        """
+        if self.course_index_cache is not None:
+            self.course_index_cache.delete(course_id)
 
     def _lookup_course(self, course_locator):
         '''
@@ -219,14 +408,14 @@ class SplitMongoModuleStore(ModuleStoreBase):
 
         :param course_locator: any subclass of CourseLocator
         '''
-        # NOTE: if and when this uses cache, the update if changed logic will break if the cache
-        # holds the same objects as the descriptors!
+        # NOTE: the update if changed logic relies on each lookup returning new objects, rather than
+        # the objects which the descriptors hold (see _find_document)!
         if not course_locator.is_fully_specified():
             raise InsufficientSpecificationError('Not fully specified: %s' % course_locator)
 
         if course_locator.course_id is not None and course_locator.branch is not None:
             # use the course_id
-            index = self.course_index.find_one({'_id': course_locator.course_id})
+            index = self._get_course_index(course_locator.course_id)
             if index is None:
                 raise ItemNotFoundError(course_locator)
             if course_locator.branch not in index['versions']:
@@ -241,7 +430,7 @@ class SplitMongoModuleStore(ModuleStoreBase):
 
         # cast string to ObjectId if necessary
         version_guid = course_locator.as_object_id(version_guid)
-        entry = self.structures.find_one({'_id': version_guid})
+        entry = self._find_document(self.structures, version_guid)
 
         # b/c more than one course can use same structure, the 'course_id' and 'branch' are not intrinsic to structure
         # and the one assoc'd w/ it by another fetch may not be the one relevant to this fetch; so,
@@ -279,11 +468,11 @@ class SplitMongoModuleStore(ModuleStoreBase):
             version_guids.append(version_guid)
             id_version_map[version_guid] = structure['_id']
 
-        course_entries = self.structures.find({'_id': {'$in': version_guids}})
+        course_entries = self._find_documents(self.structures, version_guids)
 
         # get the block for the course element (s/b the root)
         result = []
-        for entry in course_entries:
+        for entry in course_entries.itervalues():
             envelope = {
                 'course_id': id_version_map[entry['_id']],
                 'branch': branch,
@@ -469,7 +658,7 @@ class SplitMongoModuleStore(ModuleStoreBase):
             'edited_on': when the change was made
         }
         """
-        definition = self.definitions.find_one({'_id': definition_locator.definition_id})
+        definition = self._find_definition(definition_locator.definition_id)
         if definition is None:
             return None
         return definition['edit_info']
@@ -600,7 +789,7 @@ class SplitMongoModuleStore(ModuleStoreBase):
 
         # if this looks in cache rather than fresh fetches, then it will probably not detect
         # actual change b/c the descriptor and cache probably point to the same objects
-        old_definition = self.definitions.find_one({'_id': definition_locator.definition_id})
+        old_definition = self._find_definition(definition_locator.definition_id)
         if old_definition is None:
             raise ItemNotFoundError(definition_locator.url())
 
@@ -706,6 +895,7 @@ class SplitMongoModuleStore(ModuleStoreBase):
         the new version_guid from the locator in the returned object!
         """
         # find course_index entry if applicable and structures entry
+        self._refresh_course_index(course_or_parent_locator)
         index_entry = self._get_index_if_valid(course_or_parent_locator, force, continue_version)
         structure = self._lookup_course(course_or_parent_locator)['structure']
 
@@ -760,10 +950,7 @@ class SplitMongoModuleStore(ModuleStoreBase):
                 parent['edit_info']['previous_version'] = parent['edit_info']['update_version']
                 parent['edit_info']['update_version'] = new_id
         if continue_version:
-            # db update
-            self.structures.update({'_id': new_id}, new_structure)
-            # clear cache so things get refetched and inheritance recomputed
-            self._clear_cache(new_id)
+            new_id = self._continue_structure(new_structure, index_entry)
         else:
             self.structures.insert(new_structure)
 
@@ -880,7 +1067,7 @@ class SplitMongoModuleStore(ModuleStoreBase):
                 if block_fields is not None:
                     root_block['fields'].update(block_fields)
                 if definition_fields is not None:
-                    definition = self.definitions.find_one({'_id': root_block['definition']})
+                    definition = self._find_definition(root_block['definition'])
                     definition['fields'].update(definition_fields)
                     definition['edit_info']['previous_version'] = definition['_id']
                     definition['edit_info']['edited_by'] = user_id
@@ -926,6 +1113,7 @@ class SplitMongoModuleStore(ModuleStoreBase):
         The implementation tries to detect which, if any changes, actually need to be saved and thus won't version
         the definition, structure, nor course if they didn't change.
         """
+        self._refresh_course_index(descriptor.location)
         original_structure = self._lookup_course(descriptor.location)['structure']
         index_entry = self._get_index_if_valid(descriptor.location, force)
 
@@ -991,6 +1179,7 @@ class SplitMongoModuleStore(ModuleStoreBase):
         :param user_id: who's doing the change
         """
         # find course_index entry if applicable and structures entry
+        self._refresh_course_index(xblock.location)
         index_entry = self._get_index_if_valid(xblock.location, force)
         structure = self._lookup_course(xblock.location)['structure']
         new_structure = self._version_structure(structure, user_id)
@@ -1122,6 +1311,7 @@ class SplitMongoModuleStore(ModuleStoreBase):
             raise ValueError("Cannot override versions without setting update_versions")
         self.course_index.update({'_id': course_locator.course_id},
             {'$set': new_values_dict})
+        self._uncache_course_index(course_locator.course_id)
 
     def delete_item(self, usage_locator, user_id, delete_children=False, force=False):
         """
@@ -1139,6 +1329,7 @@ class SplitMongoModuleStore(ModuleStoreBase):
         the course but leaves the head pointer where it is (this change will not be in the course head).
         """
         assert isinstance(usage_locator, BlockUsageLocator) and usage_locator.is_initialized()
+        self._refresh_course_index(usage_locator)
         original_structure = self._lookup_course(usage_locator)['structure']
         if original_structure['root'] == usage_locator.usage_id:
             raise ValueError("Cannot delete the root of a course")
@@ -1191,6 +1382,7 @@ class SplitMongoModuleStore(ModuleStoreBase):
             raise ItemNotFoundError(course_id)
         # this is the only real delete in the system. should it do something else?
         self.course_index.remove(index['_id'])
+        self._uncache_course_index(index['_id'])
 
     def get_errored_courses(self):
         """
@@ -1268,19 +1460,20 @@ class SplitMongoModuleStore(ModuleStoreBase):
         """
         Only intended for rather low level methods to use. Goes through the children attrs of
         each block removing any whose usage_id is not a member of the course. Does not generate
-        a new version of the course but overwrites the existing one.
+        a new version of the course but replaces the existing one (see `_continue_structure`), so
+        the locator must point to the head of a branch.
 
         :param course_locator: the course to clean
         """
+        self._refresh_course_index(course_locator)
+        index_entry = self._get_index_if_valid(course_locator, continue_version=True)
         original_structure = self._lookup_course(course_locator)['structure']
         for block in original_structure['blocks'].itervalues():
             if 'fields' in block and 'children' in block['fields']:
                 block['fields']["children"] = [
                     usage_id for usage_id in block['fields']["children"] if usage_id in original_structure['blocks']
                 ]
-        self.structures.update({'_id': original_structure['_id']}, original_structure)
-        # clear cache again b/c inheritance may be wrong over orphans
-        self._clear_cache(original_structure['_id'])
+        self._continue_structure(original_structure, index_entry)
 
     def _block_matches(self, value, qualifiers):
         '''
@@ -1361,7 +1554,7 @@ class SplitMongoModuleStore(ModuleStoreBase):
             else:
                 return None
         else:
-            index_entry = self.course_index.find_one({'_id': locator.course_id})
+            index_entry = self._get_course_index(locator.course_id, fresh=True)
             is_head = (
                 locator.version_guid is None or
                 index_entry['versions'][locator.branch] == locator.version_guid
@@ -1409,6 +1602,7 @@ class SplitMongoModuleStore(ModuleStoreBase):
         self.course_index.update(
             {"_id": index_entry["_id"]},
             {"$set": {"versions.{}".format(branch): new_id}})
+        self._uncache_course_index(index_entry["_id"])
 
     def _partition_fields_by_scope(self, category, fields):
         """
@@ -0,0 +1,65 @@
+"""
+Tests for the modulestore LRU cache.
+"""
+from unittest import TestCase
+
+from xmodule.modulestore.lru_cache import LRUCache
+
+
+class TestLRUCache(TestCase):
+    """
+    Tests for LRUCache.
+    """
+    def test_get_set(self):
+        cache = LRUCache(2)
+        cache.set('a', 1)
+        self.assertEqual(cache.get('a'), 1)
+        self.assertEqual(cache.get('b'), None)
+        self.assertEqual(cache.get('b', 2), 2)
+
+    def test_eviction(self):
+        cache = LRUCache(2)
+        cache.set('a', 1)
+        cache.set('b', 2)
+        # 'a' becomes the most recently used entry
+        cache.get('a')
+        cache.set('c', 3)
+        self.assertIn('a', cache)
+        self.assertNotIn('b', cache)
+        self.assertIn('c', cache)
+        self.assertEqual(len(cache), 2)
+
+    def test_delete_and_clear(self):
+        cache = LRUCache(2)
+        cache.set('a', 1)
+        cache.set('b', 2)
+        cache.delete('a')
+        cache.delete('missing')
+        self.assertNotIn('a', cache)
+        cache.clear()
+        self.assertEqual(len(cache), 0)
+
+    def test_invalid_size(self):
+        with self.assertRaises(ValueError):
+            LRUCache(0)
+
+    def test_sizeof(self):
+        cache = LRUCache(10, sizeof=len)
+        cache.set('a', 'xxxx')
+        cache.set('b', 'xxxx')
+        self.assertEqual(cache.size, 8)
+        # replacing an entry replaces its size
+        cache.set('a', 'xx')
+        self.assertEqual(cache.size, 6)
+        # 'b' is evicted to make room
+        cache.set('c', 'xxxxxx')
+        self.assertNotIn('b', cache)
+        self.assertEqual(cache.size, 8)
+        # entries larger than the cache aren't kept
+        cache.set('d', 'x' * 11)
+        self.assertNotIn('d', cache)
+        self.assertEqual(len(cache), 0)
+        self.assertEqual(cache.size, 0)
+        cache.set('a', 'xx')
+        cache.delete('a')
+        self.assertEqual(cache.size, 0)
@@ -1,3 +1,4 @@
+# -*- coding: utf-8 -*-
 from pprint import pprint
 # pylint: disable=E0611
 from nose.tools import assert_equals, assert_raises, \
@@ -6,6 +7,7 @@ from itertools import ifilter
 # pylint: enable=E0611
 import pymongo
 import logging
+from path import path
 from uuid import uuid4
 
 from xblock.fields import Scope
@@ -15,14 +17,17 @@ from xblock.exceptions import InvalidScopeError
 from xmodule.tests import DATA_DIR
 from xmodule.modulestore import Location
 from xmodule.modulestore.mongo import MongoModuleStore, MongoKeyValueStore
+from xmodule.modulestore.mongo.base import structure_cache_key
 from xmodule.modulestore.draft import DraftModuleStore
-from xmodule.modulestore.xml_importer import import_from_xml, perform_xlint
+from xmodule.modulestore.xml_importer import import_from_xml, import_static_content, perform_xlint
+from xmodule.contentstore.content import StaticContent
 from xmodule.contentstore.mongo import MongoContentStore
 
 from xmodule.modulestore.tests.test_modulestore import check_path_to_location
 from IPython.testing.nose_assert_methods import assert_in, assert_not_in
 from xmodule.exceptions import NotFoundError
-from xmodule.modulestore.exceptions import InsufficientSpecificationError
+from xmodule.modulestore.exceptions import InsufficientSpecificationError, ItemNotFoundError
+from mock import patch, Mock
 
 log = logging.getLogger(__name__)
 
@@ -268,6 +273,218 @@ class TestMongoModuleStore(object):
             {'displayname': 'hello'}
         )
 
+    def test_course_structure_cache(self):
+        """
+        Loading a whole course from a warm course structure cache makes no queries,
+        until the course is written to.
+        """
+        store = MongoModuleStore(
+            {'host': HOST, 'db': DB, 'collection': COLLECTION},
+            FS_ROOT, RENDER_TEMPLATE, default_class=DEFAULT_CLASS, course_structure_cache_size=2
+        )
+        course_location = Location("i4x://edX/toy/course/2012_Fall")
+        expected = self.store.get_item(course_location, depth=None)
+
+        # warm the cache
+        store.get_item(course_location, depth=None)
+
+        with patch.object(store, 'collection') as mock_collection:
+            course = store.get_item(course_location, depth=None)
+            assert_equals(
+                [child.location for child in course.get_children()],
+                [child.location for child in expected.get_children()]
+            )
+            assert_equals(
+                [child.display_name for child in course.get_children()[0].get_children()],
+                [child.display_name for child in expected.get_children()[0].get_children()]
+            )
+            assert_false(mock_collection.find.called)
+            assert_false(mock_collection.find_one.called)
+
+        # a write to the course (through any store) invalidates the cached structure
+        self.store._invalidate_course_structure(course_location)
+        with patch.object(store, 'collection') as mock_collection:
+            mock_collection.find.return_value = []
+            with assert_raises(ItemNotFoundError):
+                store.get_item(course_location, depth=None)
+            assert mock_collection.find.called
+
+    def test_oversized_course_structure(self):
+        """
+        Course structures too big for the metadata_inheritance_cache_subsystem are only
+        cached in memory, and logged.
+        """
+        cache = Mock()
+        cache.get.return_value = None
+        store = MongoModuleStore(
+            {'host': HOST, 'db': DB, 'collection': COLLECTION},
+            FS_ROOT, RENDER_TEMPLATE, default_class=DEFAULT_CLASS, course_structure_cache_size=2,
+            metadata_inheritance_cache_subsystem=cache
+        )
+        course_location = Location("i4x://edX/toy/course/2012_Fall")
+        version = store._get_course_structure_version(course_location)
+
+        with patch('xmodule.modulestore.mongo.base.MAX_SHARED_STRUCTURE_SIZE', 10):
+            with patch('xmodule.modulestore.mongo.base.log') as mock_log:
+                structure = store._get_course_structure(course_location)
+                assert mock_log.warning.called
+        assert_in(course_location, structure)
+        assert_not_in(structure_cache_key(course_location, version), [args[0][0] for args in cache.set.call_args_list])
+
+        # it's still cached by this process
+        with patch.object(store, 'collection') as mock_collection:
+            assert store._get_course_structure(course_location) is structure
+            assert_false(mock_collection.find.called)
+
+        # smaller structures are shared
+        store.course_structure_cache.clear()
+        store._get_course_structure(course_location)
+        assert_in(structure_cache_key(course_location, version), [args[0][0] for args in cache.set.call_args_list])
+
+    def test_update_cached_metadata_inheritance_tree(self):
+        """
+        Writes which don't change the tree leave the cached inheritance tree alone; others
+        drop it, for the next read to recompute.
+        """
+        request_cache = Mock(data={})
+        store = MongoModuleStore(
+            {'host': HOST, 'db': DB, 'collection': COLLECTION},
+            FS_ROOT, RENDER_TEMPLATE, default_class=DEFAULT_CLASS, request_cache=request_cache
+        )
+        course_location = Location("i4x://edX/toy/course/2012_Fall")
+        chapter = Location("i4x://edX/toy/chapter/Overview")
+        videosequence = Location("i4x://edX/toy/videosequence/Toy_Videos")
+        leaf = "i4x://edX/toy/html/toyhtml"
+
+        tree = store.get_cached_metadata_inheritance_tree(course_location)
+        # leaves of the same container share the metadata they inherit
+        assert tree[leaf] is tree["i4x://edX/toy/html/toyjumpto"]
+        container = tree.containers[chapter.url()]
+
+        # leaves take no part in the tree, nor do unchanged children or non-inheritable metadata
+        store.update_cached_metadata_inheritance_tree(Location(leaf), metadata={'showanswer': 'always'})
+        store.update_cached_metadata_inheritance_tree(chapter, children=container['children'])
+        store.update_cached_metadata_inheritance_tree(
+            chapter, metadata=dict(container['own'], display_name='Renamed')
+        )
+        with patch.object(store, 'compute_metadata_inheritance_tree') as mock_compute:
+            assert store.get_cached_metadata_inheritance_tree(course_location) is tree
+            assert_false(mock_compute.called)
+
+        # changed inheritable metadata, or changed children, drop the tree
+        for update in ({'metadata': {'showanswer': 'never'}}, {'children': [videosequence.url()]}):
+            store.update_cached_metadata_inheritance_tree(chapter, **update)
+            with patch.object(store, 'compute_metadata_inheritance_tree') as mock_compute:
+                mock_compute.return_value = tree
+                store.get_cached_metadata_inheritance_tree(course_location)
+                assert mock_compute.called
+
+    def test_parent_index(self):
+        """
+        Parents and positions come from the cached parent index, which is rebuilt
+        after the course is written to.
+        """
+        chapter = Location("i4x://edX/toy/chapter/Overview")
+        videosequence = Location("i4x://edX/toy/videosequence/Toy_Videos")
+        leaf = Location("i4x://edX/toy/html/toyhtml")
+        course_id = "edX/toy/2012_Fall"
+
+        expected = [child.location for child in self.store.get_instance(course_id, videosequence).get_children()]
+        assert_equals(self.store.get_child_position(course_id, videosequence, leaf), expected.index(leaf))
+
+        with patch.object(self.store, 'collection') as mock_collection:
+            assert_equals(
+                [Location(parent) for parent in self.store.get_parent_locations(leaf, course_id)],
+                [videosequence]
+            )
+            assert_equals(
+                [Location(parent) for parent in self.store.get_parent_locations(videosequence, course_id)],
+                [chapter]
+            )
+            assert_false(mock_collection.find.called)
+
+        with assert_raises(ValueError):
+            self.store.get_child_position(course_id, chapter, leaf)
+
+        self.store._invalidate_course_structure(chapter)
+        with patch.object(self.store, 'collection') as mock_collection:
+            mock_collection.find.return_value = []
+            assert_equals(self.store.get_parent_locations(leaf, course_id), [])
+            assert mock_collection.find.called
+        # don't leave the index of the empty course behind for the other tests
+        self.store._invalidate_course_structure(chapter)
+
+    def test_parent_index_draft_only_child(self):
+        """
+        A child which only exists as a draft isn't counted in the positions of its
+        siblings, as get_children skips it.
+        """
+        videosequence = Location("i4x://edX/toy/videosequence/Toy_Videos")
+        leaf = Location("i4x://edX/toy/html/toyhtml")
+        draft_only = Location("i4x://edX/toy/html/draft_only_html")
+        course_id = "edX/toy/2012_Fall"
+        children = self.store.get_item(videosequence).children
+        position = self.store.get_child_position(course_id, videosequence, leaf)
+
+        self.draft_store.create_and_save_xmodule(draft_only)
+        self.store.update_children(videosequence, [draft_only.url()] + children)
+        try:
+            found = [child.location for child in self.store.get_instance(course_id, videosequence).get_children()]
+            assert_equals(found.index(leaf), position)
+            assert_equals(self.store.get_child_position(course_id, videosequence, leaf), position)
+        finally:
+            self.store.update_children(videosequence, children)
+            self.draft_store.delete_item(draft_only)
+
+    def test_bulk_write_items(self):
+        """
+        bulk_write_items creates new items and updates existing ones, in batches.
+        """
+        first = Location("i4x://edX/toy/html/bulk_written_1")
+        second = Location("i4x://edX/toy/html/bulk_written_2")
+        vertical = Location("i4x://edX/toy/vertical/bulk_written_vertical")
+
+        with patch('xmodule.modulestore.mongo.base.BULK_WRITE_BATCH_SIZE', 2):
+            self.store.bulk_write_items([
+                (first, '<p>first</p>', None, {'display_name': 'First'}),
+                (second, '<p>second</p>', [], {}),
+                (vertical, {}, [first.url(), second.url()], {'display_name': 'Vertical'}),
+            ])
+        assert_equals(self.store.get_item(first).data, '<p>first</p>')
+        assert_equals(self.store.get_item(first).display_name, 'First')
+        assert_equals(self.store.get_item(vertical).children, [first.url(), second.url()])
+
+        # updating leaves the children of items written without any
+        self.store.bulk_write_items([
+            (first, '<p>updated</p>', None, {'display_name': 'Updated'}),
+            (vertical, {}, None, {'display_name': 'Updated vertical'}),
+        ])
+        assert_equals(self.store.get_item(first).data, '<p>updated</p>')
+        assert_equals(self.store.get_item(first).display_name, 'Updated')
+        assert_equals(self.store.get_item(vertical).display_name, 'Updated vertical')
+        assert_equals(self.store.get_item(vertical).children, [first.url(), second.url()])
+
+        for location in (first, second, vertical):
+            self.store.delete_item(location)
+
+    def test_reimport_static_content(self):
+        """
+        Importing static content which is already in the contentstore only uploads what changed.
+        """
+        course_location = Location("i4x://edX/test_unicode/course/2012_Fall")
+        course_data_path = path(DATA_DIR) / 'test_unicode'
+
+        with patch.object(self.content_store, 'save') as mock_save:
+            remap = import_static_content([], course_location, course_data_path, self.content_store, course_location)
+            assert_false(mock_save.called)
+        assert_equals(remap.keys(), [u'unicø∂é.txt'])
+
+        content_location = StaticContent.compute_location('edX', 'test_unicode', u'unicø∂é.txt')
+        self.content_store.set_attr(content_location, 'displayname', 'changed')
+        with patch.object(self.content_store, 'save') as mock_save:
+            import_static_content([], course_location, course_data_path, self.content_store, course_location)
+            assert_equals(mock_save.call_count, 1)
+
 
 class TestMongoKeyValueStore(object):
     """
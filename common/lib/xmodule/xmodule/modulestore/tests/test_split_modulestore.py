@@ -8,6 +8,7 @@ import subprocess
 import unittest
 import uuid
 from importlib import import_module
+from mock import patch
 
 from xblock.fields import Scope
 from xmodule.course_module import CourseDescriptor
@@ -15,6 +16,7 @@ from xmodule.modulestore.exceptions import InsufficientSpecificationError, ItemN
     DuplicateItemError
 from xmodule.modulestore.locator import CourseLocator, BlockUsageLocator, VersionTree, DefinitionLocator
 from xmodule.modulestore.inheritance import InheritanceMixin
+from xmodule.modulestore.lru_cache import LRUCache
 from xmodule.x_module import XModuleMixin
 from pytz import UTC
 from path import path
@@ -632,21 +634,26 @@ class TestItemCrud(SplitModuleTest):
             fields={'display_name': 'chapter 1'},
             continue_version=True
         )
-        # version info shouldn't change
-        self.assertEqual(new_ele.update_version, course_block_update_version)
-        self.assertEqual(new_ele.update_version, new_ele.location.version_guid)
+        # the version is replaced by one with a new id but the same history
+        continued_guid = new_ele.location.version_guid
+        self.assertNotEqual(continued_guid, new_course.location.version_guid)
+        self.assertEqual(new_ele.update_version, continued_guid)
         refetch_course = modulestore().get_course(versionless_course_locator)
-        self.assertEqual(refetch_course.location.version_guid, new_course.location.version_guid)
+        self.assertEqual(refetch_course.location.version_guid, continued_guid)
         self.assertEqual(refetch_course.previous_version, course_block_prev_version)
-        self.assertEqual(refetch_course.update_version, course_block_update_version)
+        self.assertEqual(refetch_course.update_version, continued_guid)
         refetch_index_history_info = modulestore().get_course_history_info(refetch_course.location)
+        index_history_info['original_version'] = continued_guid
         self.assertEqual(refetch_index_history_info, index_history_info)
         self.assertIn(new_ele.location.usage_id, refetch_course.children)
+        # the replaced version is gone
+        replaced_guid = new_course.location.as_object_id(new_course.location.version_guid)
+        self.assertIsNone(modulestore().structures.find_one({'_id': replaced_guid}))
 
         # try to create existing item
         with self.assertRaises(DuplicateItemError):
             _fail = modulestore().create_item(
-                new_course.location, 'chapter', user,
+                refetch_course.location, 'chapter', user,
                 usage_id=new_ele.location.usage_id,
                 fields={'display_name': 'chapter 2'},
                 continue_version=True
@@ -687,13 +694,15 @@ class TestItemCrud(SplitModuleTest):
             continue_version=True
         )
         self.assertNotEqual(new_ele.update_version, course_block_update_version)
-        self.assertEqual(new_ele.location.version_guid, transaction_guid)
+        self.assertNotEqual(new_ele.location.version_guid, transaction_guid)
 
         # check children, previous_version
         refetch_course = modulestore().get_course(versionless_course_locator)
         self.assertIn(new_ele.location.usage_id, refetch_course.children)
-        self.assertEqual(refetch_course.previous_version, course_block_update_version)
-        self.assertEqual(refetch_course.update_version, transaction_guid)
+        self.assertEqual(refetch_course.previous_version, continued_guid)
+        self.assertEqual(refetch_course.update_version, new_ele.location.version_guid)
+        refetch_index_history_info = modulestore().get_course_history_info(refetch_course.location)
+        self.assertEqual(refetch_index_history_info['previous_version'], continued_guid)
 
     def test_update_metadata(self):
         """
@@ -1100,6 +1109,81 @@ class TestInheritance(SplitModuleTest):
     # TODO test inheritance after set and delete of attrs
 
 
+class TestDocumentCaches(SplitModuleTest):
+    """
+    Test the caches of structures, definitions and course index entries
+    """
+    def setUp(self):
+        super(TestDocumentCaches, self).setUp()
+        modulestore().document_cache.clear()
+
+    def test_structure_cache(self):
+        locator = CourseLocator(version_guid=self.GUID_D0)
+        store = modulestore()
+        with patch.object(store.structures, 'find_one', wraps=store.structures.find_one) as find_one:
+            structure = store._lookup_course(locator)['structure']  # pylint: disable=protected-access
+            self.assertEqual(find_one.call_count, 1)
+            structure['blocks'].clear()
+
+            # cached, and unaffected by changes to the copies which were returned
+            cached_structure = store._lookup_course(locator)['structure']  # pylint: disable=protected-access
+            self.assertEqual(find_one.call_count, 1)
+            self.assertEqual(str(cached_structure['_id']), self.GUID_D0)
+            self.assertGreater(len(cached_structure['blocks']), 0)
+        self.assertGreater(store.document_cache.size, 0)
+
+    def test_continued_version_not_stale(self):
+        store = modulestore()
+        course = store.create_course('test_org', 'continued course', 'user123')
+        versionless = CourseLocator(course_id=course.location.course_id, branch=course.location.branch)
+        store._lookup_course(versionless)  # pylint: disable=protected-access
+
+        chapter = store.create_item(course.location, 'chapter', 'user123', continue_version=True)
+        store._lookup_course(versionless)  # pylint: disable=protected-access
+        # the changed structure has a new id, so the cached one is used without asking the db
+        # whether it changed
+        with patch.object(store.structures, 'find', side_effect=AssertionError):
+            with patch.object(store.structures, 'find_one', side_effect=AssertionError):
+                structure = store._lookup_course(versionless)['structure']  # pylint: disable=protected-access
+        self.assertEqual(structure['_id'], chapter.location.as_object_id(chapter.location.version_guid))
+        self.assertIn(chapter.location.usage_id, structure['blocks'][structure['root']]['fields']['children'])
+
+    def test_definition_cache(self):
+        store = modulestore()
+        definition_locator = DefinitionLocator("ad00000000000000dddd0000")
+        with patch.object(store.definitions, 'find_one', wraps=store.definitions.find_one) as find_one:
+            edit_info = store.get_definition_history_info(definition_locator)
+            self.assertEqual(store.get_definition_history_info(definition_locator), edit_info)
+            self.assertEqual(find_one.call_count, 1)
+
+    def test_course_index_cache(self):
+        store = modulestore()
+        store.course_index_cache, store.course_index_cache_timeout = LRUCache(10), 60
+        try:
+            course = store.create_course('test_org', 'index cache course', 'user123')
+            locator = CourseLocator(course_id=course.location.course_id, branch='draft')
+            with patch.object(store.course_index, 'find_one', wraps=store.course_index.find_one) as find_one:
+                store.get_course(locator)
+                store.get_course(locator)
+                self.assertEqual(find_one.call_count, 1)
+
+            # another process moves the head of the course
+            new_module = store.create_item(locator, 'chapter', 'user123')
+            new_version = new_module.location.version_guid
+            self.assertEqual(store.get_course(locator).location.version_guid, new_version)
+            store.course_index.update(
+                {'_id': locator.course_id}, {'$set': {'versions.draft': course.location.version_guid}}
+            )
+            # reads may use the head read by this process...
+            self.assertEqual(store.get_course(locator).location.version_guid, new_version)
+            # ...but writes apply to the current head
+            store.create_item(locator, 'chapter', 'user123')
+            history_info = store.get_course_history_info(locator)
+            self.assertEqual(history_info['previous_version'], course.location.version_guid)
+        finally:
+            store.course_index_cache, store.course_index_cache_timeout = None, 0
+
+
 #===========================================
 # This mocks the django.modulestore() function and is intended purely to disentangle
 # the tests from django
@@ -3,6 +3,11 @@ Methods for exporting course data to XML
 """
 
 import logging
+import os
+import tarfile
+import time
+from contextlib import closing
+from StringIO import StringIO
 from xmodule.modulestore import Location
 from xmodule.modulestore.inheritance import own_metadata
 from fs.osfs import OSFS
@@ -33,6 +38,170 @@ class EdxJSONEncoder(json.JSONEncoder):
             return super(EdxJSONEncoder, self).default(obj)
 
 
+class _TarMemberFile(StringIO):
+    """
+    A file opened for writing on a TarExportFS, which is added to the archive once closed
+    """
+    def __init__(self, tar_fs, path):
+        StringIO.__init__(self)
+        self.tar_fs = tar_fs
+        self.path = path
+
+    def close(self):
+        if not self.closed:
+            self.seek(0)
+            self.tar_fs.setcontents(self.path, self)
+            StringIO.close(self)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+class TarExportFS(object):
+    """
+    A write-only filesystem which adds the files written to it to a gzipped tar archive,
+    streamed to `fileobj` (which is only written to, so may be a socket or a response) as
+    they are written, under the directory `root`.
+
+    This implements the parts of the pyfilesystem API that the export of xml and of the
+    assets of a course use: opening files for writing, setting their contents and making
+    directories. Files opened for writing are buffered in memory until they are closed, and
+    files whose contents are set from a file are copied to the archive chunk-wise, so that
+    assets don't need to be read into memory or written to disk.
+    """
+    def __init__(self, fileobj, root, progress_callback=None):
+        self.tar_file = tarfile.open(fileobj=fileobj, mode='w|gz')
+        self.root = root
+        self.progress_callback = progress_callback
+        self.directories = set()
+        self.files = set()
+        self.makedir('')
+
+    def _archive_path(self, path):
+        """The path in the archive of `path`"""
+        return '/'.join(part for part in [self.root] + path.split('/') if part)
+
+    def _add_member(self, path, member_type, size=0, fileobj=None):
+        """Add the file or directory `path` to the archive"""
+        info = tarfile.TarInfo(self._archive_path(path).encode('utf-8'))
+        info.type = member_type
+        info.size = size
+        info.mtime = int(time.time())
+        info.mode = 0755 if member_type == tarfile.DIRTYPE else 0644
+        self.tar_file.addfile(info, fileobj)
+
+        if self.progress_callback is not None:
+            self.progress_callback('exporting', len(self.files), None)
+
+    def isdir(self, path):
+        return self._archive_path(path) in self.directories
+
+    def isfile(self, path):
+        return self._archive_path(path) in self.files
+
+    def exists(self, path):
+        return self.isdir(path) or self.isfile(path)
+
+    def makedir(self, path, recursive=False, allow_recreate=False):
+        """
+        Add the directory `path`, and with `recursive`, any missing parent directories
+        """
+        parent = os.path.dirname(path.rstrip('/'))
+        if parent and not self.isdir(parent):
+            if not recursive:
+                raise ValueError("Parent directory of {0} doesn't exist".format(path))
+            self.makedir(parent, recursive=True, allow_recreate=True)
+
+        if self.isdir(path):
+            if not allow_recreate:
+                raise ValueError("Directory {0} already exists".format(path))
+            return
+        self.directories.add(self._archive_path(path))
+        self._add_member(path, tarfile.DIRTYPE)
+
+    def opendir(self, path):
+        return _SubTarExportFS(self, path)
+
+    def makeopendir(self, path, recursive=False):
+        self.makedir(path, recursive=recursive, allow_recreate=True)
+        return self.opendir(path)
+
+    def open(self, path, mode='r', **kwargs):
+        """
+        Open the file `path` for writing. Files can't be read or appended to.
+        """
+        if 'w' not in mode:
+            raise ValueError("Files on a TarExportFS can only be opened for writing, not {0}".format(mode))
+        return _TarMemberFile(self, path)
+
+    def setcontents(self, path, data, chunk_size=64 * 1024):
+        """
+        Add the file `path` to the archive, with `data`, a string or a seekable file whose
+        remaining contents are copied chunk-wise (in tarfile's own chunk size, so `chunk_size`
+        is ignored)
+
+        A file that's written again, as a block with several parents is, is added to the
+        archive again, and the last copy replaces the earlier ones when it's extracted.
+        """
+        if isinstance(data, basestring):
+            data = StringIO(data)
+
+        start = data.tell()
+        data.seek(0, os.SEEK_END)
+        size = data.tell() - start
+        data.seek(start)
+
+        self.files.add(self._archive_path(path))
+        self._add_member(path, tarfile.REGTYPE, size, data)
+
+    def close(self):
+        """
+        Finish the archive. This doesn't close the file it was written to.
+        """
+        self.tar_file.close()
+
+
+class _SubTarExportFS(object):
+    """
+    A directory of a TarExportFS, with paths relative to it
+    """
+    def __init__(self, tar_fs, path):
+        self.tar_fs = tar_fs
+        self.path = path.strip('/')
+
+    def _path(self, path):
+        """The path in the parent TarExportFS of `path`"""
+        return self.path + '/' + path
+
+    def isdir(self, path):
+        return self.tar_fs.isdir(self._path(path))
+
+    def isfile(self, path):
+        return self.tar_fs.isfile(self._path(path))
+
+    def exists(self, path):
+        return self.tar_fs.exists(self._path(path))
+
+    def makedir(self, path, recursive=False, allow_recreate=False):
+        self.tar_fs.makedir(self._path(path), recursive=recursive, allow_recreate=allow_recreate)
+
+    def opendir(self, path):
+        return _SubTarExportFS(self.tar_fs, self._path(path))
+
+    def makeopendir(self, path, recursive=False):
+        self.makedir(path, recursive=recursive, allow_recreate=True)
+        return self.opendir(path)
+
+    def open(self, path, mode='r', **kwargs):
+        return self.tar_fs.open(self._path(path), mode, **kwargs)
+
+    def setcontents(self, path, data, chunk_size=64 * 1024):
+        self.tar_fs.setcontents(self._path(path), data, chunk_size)
+
+
 def export_to_xml(modulestore, contentstore, course_location, root_dir, course_dir, draft_modulestore=None):
     """
     Export all modules from `modulestore` and content from `contentstore` as xml to `root_dir`.
@@ -45,6 +214,35 @@ def export_to_xml(modulestore, contentstore, course_location, root_dir, course_d
     `draft_modulestore`: An optional `DraftModuleStore` that contains draft content, which will be exported
         alongside the public content in the course.
     """
+    fs = OSFS(root_dir)
+    export_fs = fs.makeopendir(course_dir)
+
+    export_to_fs(modulestore, contentstore, course_location, export_fs, draft_modulestore)
+
+
+def export_to_tar(modulestore, contentstore, course_location, fileobj, course_dir, draft_modulestore=None,
+                  progress_callback=None):
+    """
+    Export all modules from `modulestore` and content from `contentstore` as xml to a gzipped tar
+    archive written to `fileobj`, without writing the course to disk first.
+
+    `fileobj`: The file to write the archive to. It's only written to, in order, so the archive
+        can be streamed.
+    `course_dir`: The name of the directory inside the archive to write the course content to
+    `progress_callback`: If specified, called with ('exporting', files, None) as each of the files
+        of the course is added to the archive
+
+    The other arguments are those of `export_to_xml`.
+    """
+    with closing(TarExportFS(fileobj, course_dir, progress_callback=progress_callback)) as export_fs:
+        export_to_fs(modulestore, contentstore, course_location, export_fs, draft_modulestore)
+
+
+def export_to_fs(modulestore, contentstore, course_location, export_fs, draft_modulestore=None):
+    """
+    Export all modules from `modulestore` and content from `contentstore` as xml to the
+    pyfilesystem `export_fs`. The other arguments are those of `export_to_xml`.
+    """
 
     # we use get_instance instead of get_item to support modulestores
     # that can't guarantee that definitions are unique
@@ -53,9 +251,6 @@ def export_to_xml(modulestore, contentstore, course_location, root_dir, course_d
         course_location
     )
 
-    fs = OSFS(root_dir)
-    export_fs = fs.makeopendir(course_dir)
-
     xml = course.export_to_xml(export_fs)
     with export_fs.open('course.xml', 'w') as course_xml:
         course_xml.write(xml)
@@ -63,11 +258,9 @@ def export_to_xml(modulestore, contentstore, course_location, root_dir, course_d
     # export the static assets
     policies_dir = export_fs.makeopendir('policies')
     if contentstore:
-        contentstore.export_all_for_course(
-            course_location,
-            root_dir + '/' + course_dir + '/static/',
-            root_dir + '/' + course_dir + '/policies/assets.json',
-        )
+        assets_policy = contentstore.export_all_for_course_to_fs(course_location, export_fs)
+        with policies_dir.open('assets.json', 'w') as assets_policy_file:
+            assets_policy_file.write(dumps(assets_policy))
 
     # export the static tabs
     export_extra_content(export_fs, modulestore, course_location, 'static_tab', 'tabs', '.html')
@@ -1,9 +1,12 @@
+import hashlib
 import logging
 import os
 import mimetypes
+import time
 from path import path
 import json
 
+from multiprocessing.pool import ThreadPool
 from xblock.fields import Scope
 
 from .xml import XMLModuleStore, ImportSystem, ParentTracker
@@ -16,8 +19,48 @@ from .store_utilities import rewrite_nonportable_content_links
 log = logging.getLogger(__name__)
 
 
+# The number of static assets uploaded to the contentstore at once
+STATIC_CONTENT_IMPORT_WORKERS = 4
+
+# The size of the chunks in which static assets are read from disk
+STATIC_CONTENT_READ_CHUNK_SIZE = 256 * 1024
+
+
+def _read_chunks(file_path):
+    """
+    Yields the contents of the file at file_path, in chunks
+    """
+    with open(file_path, 'rb') as f:
+        while True:
+            chunk = f.read(STATIC_CONTENT_READ_CHUNK_SIZE)
+            if not chunk:
+                break
+            yield chunk
+
+
+def _file_md5(file_path):
+    """
+    Returns the md5 hex digest of the contents of the file at file_path, as GridFS computes it
+    """
+    md5 = hashlib.md5()
+    for chunk in _read_chunks(file_path):
+        md5.update(chunk)
+    return md5.hexdigest()
+
+
 def import_static_content(modules, course_loc, course_data_path, static_content_store, target_location_namespace,
-                          subpath='static', verbose=False):
+                          subpath='static', verbose=False, workers=STATIC_CONTENT_IMPORT_WORKERS,
+                          progress_callback=None):
+    """
+    Import the files in course_data_path/subpath into static_content_store, and return a dict
+    mapping their paths to their new names.
+
+    Files are streamed into the contentstore by a pool of `workers` threads, and files which
+    are already in the contentstore, unchanged, aren't uploaded again. The thumbnails of the
+    uploaded images are generated once all of the files have been uploaded.
+
+    progress_callback: if specified, called with ('assets', done, total) as each file is imported
+    """
 
     remap_dict = {}
 
@@ -33,16 +76,61 @@ def import_static_content(modules, course_loc, course_data_path, static_content_
 
     verbose = True
 
+    # the assets already in the contentstore, to skip those which haven't changed
+    existing = dict(
+        (Location(item['_id']), item)
+        for item in static_content_store.get_all_content_for_course(target_location_namespace)
+    )
+
+    def import_file(content_path, content):
+        """
+        Upload the file at content_path to the contentstore as content, unless it's unchanged.
+        Returns True if the file was uploaded.
+        """
+        if verbose:
+            log.debug('importing static content %s...', content_path)
+
+        try:
+            current = existing.get(content.location)
+            if current is not None and current.get('md5') == _file_md5(content_path) and all(
+                current.get(attr) == value for attr, value in (
+                    ('displayname', content.name),
+                    ('contentType', content.content_type),
+                    ('import_path', content.import_path),
+                    ('locked', content.locked),
+                )
+            ):
+                return False
+
+            # commit the content, straight from the file
+            content.thumbnail_location = current.get('thumbnail_location') if current is not None else None
+            static_content_store.save(content)
+            return True
+        except Exception as err:
+            log.exception('Error importing {0}, error={1}'.format(content.import_path, err))
+            return False
+
+    def generate_thumbnail(content_path, content):
+        """
+        Generate the thumbnail of the uploaded file at content_path, and point content to it
+        """
+        try:
+            thumbnail_content, thumbnail_location = static_content_store.generate_thumbnail(
+                content, tempfile_path=content_path
+            )
+            if thumbnail_content is not None:
+                static_content_store.set_attr(content.location, 'thumbnail_location', thumbnail_location)
+        except Exception as err:
+            log.exception('Error generating thumbnail of {0}, error={1}'.format(content.import_path, err))
+
+    files = []
     for dirname, _, filenames in os.walk(static_dir):
         for filename in filenames:
 
             content_path = os.path.join(dirname, filename)
-            if verbose:
-                log.debug('importing static content %s...', content_path)
-
             try:
-                with open(content_path, 'rb') as f:
-                    data = f.read()
+                # the file is read later, by the upload
+                open(content_path, 'rb').close()
             except IOError:
                 if filename.startswith('._'):
                     # OS X "companion files". See http://www.diigo.com/annotated/0c936fda5da4aa1159c189cea227e174
@@ -55,31 +143,35 @@ def import_static_content(modules, course_loc, course_data_path, static_content_
                 fullname_with_subpath = fullname_with_subpath[1:]
             content_loc = StaticContent.compute_location(target_location_namespace.org, target_location_namespace.course, fullname_with_subpath)
 
-
             policy_ele = policy.get(content_loc.name, {})
             displayname = policy_ele.get('displayname', filename)
             locked = policy_ele.get('locked', False)
             mime_type = policy_ele.get('contentType', mimetypes.guess_type(filename)[0])
             content = StaticContent(
-                content_loc, displayname, mime_type, data,
+                content_loc, displayname, mime_type, _read_chunks(content_path),
                 import_path=fullname_with_subpath, locked=locked
             )
-
-            # first let's save a thumbnail so we can get back a thumbnail location
-            (thumbnail_content, thumbnail_location) = static_content_store.generate_thumbnail(content)
-
-            if thumbnail_content is not None:
-                content.thumbnail_location = thumbnail_location
-
-            #then commit the content
-            try:
-                static_content_store.save(content)
-            except Exception as err:
-                log.exception('Error importing {0}, error={1}'.format(fullname_with_subpath, err))
+            files.append((content_path, content))
 
             #store the remapping information which will be needed to subsitute in the module data
             remap_dict[fullname_with_subpath] = content_loc.name
 
+    pool = ThreadPool(workers)
+    try:
+        uploaded = []
+        for was_uploaded in pool.imap(lambda args: import_file(*args), files):
+            uploaded.append(was_uploaded)
+            if progress_callback is not None:
+                progress_callback('assets', len(uploaded), len(files))
+        # then generate the thumbnails of the files which were uploaded
+        pool.map(
+            lambda args: generate_thumbnail(*args),
+            [args for args, was_uploaded in zip(files, uploaded) if was_uploaded]
+        )
+    finally:
+        pool.close()
+        pool.join()
+
     return remap_dict
 
 
@@ -87,7 +179,7 @@ def import_from_xml(store, data_dir, course_dirs=None,
                     default_class='xmodule.raw_module.RawDescriptor',
                     load_error_modules=True, static_content_store=None, target_location_namespace=None,
                     verbose=False, draft_store=None,
-                    do_import_static=True):
+                    do_import_static=True, progress_callback=None):
     """
     Import the specified xml data_dir into the "store" modulestore,
     using org and course as the location org and course.
@@ -104,8 +196,12 @@ def import_from_xml(store, data_dir, course_dirs=None,
                       have substantial unchanging static content, which is to inefficient to import every time the course is loaded.
                       Static content for some courses may also be served directly by nginx, instead of going through django.
 
+    progress_callback: if specified, called with (phase, done, total) as the static content ('assets'), the
+                       modules ('blocks') and the drafts ('drafts') of each course are imported
+
     """
 
+    parse_start = time.time()
     xml_module_store = XMLModuleStore(
         data_dir,
         default_class=default_class,
@@ -113,6 +209,7 @@ def import_from_xml(store, data_dir, course_dirs=None,
         load_error_modules=load_error_modules,
         xblock_mixins=store.xblock_mixins,
     )
+    log.info('Parsed {0} in {1:.2f}s'.format(course_dirs or data_dir, time.time() - parse_start))
 
     # NOTE: the XmlModuleStore does not implement get_items() which would be a preferable means
     # to enumerate the entire collection of course modules. It will be left as a TBD to implement that
@@ -171,12 +268,14 @@ def import_from_xml(store, data_dir, course_dirs=None,
                     course_items.append(module)
 
             # then import all the static content
+            static_start = time.time()
             if static_content_store is not None and do_import_static:
                 _namespace_rename = target_location_namespace if target_location_namespace is not None else course_location
 
                 # first pass to find everything in /static/
                 import_static_content(xml_module_store.modules[course_id], course_location, course_data_path, static_content_store,
-                                      _namespace_rename, subpath='static', verbose=verbose)
+                                      _namespace_rename, subpath='static', verbose=verbose,
+                                      progress_callback=progress_callback)
 
             elif verbose and not do_import_static:
                 log.debug('Skipping import of static content, since do_import_static={0}'.format(do_import_static))
@@ -193,28 +292,49 @@ def import_from_xml(store, data_dir, course_dirs=None,
                 _namespace_rename = target_location_namespace if target_location_namespace is not None else course_location
 
                 import_static_content(xml_module_store.modules[course_id], course_location, course_data_path, static_content_store,
-                                      _namespace_rename, subpath=simport, verbose=verbose)
-
-            # finally loop through all the modules
-            for module in xml_module_store.modules[course_id].itervalues():
-                if module.scope_ids.block_type == 'course':
-                    # we've already saved the course module up at the top of the loop
-                    # so just skip over it in the inner loop
-                    continue
-
-                # remap module to the new namespace
-                if target_location_namespace is not None:
-                    module = remap_namespace(module, target_location_namespace)
-
-                if verbose:
-                    log.debug('importing module location {0}'.format(module.location))
-
-                import_module(module, store, course_data_path, static_content_store, course_location,
-                              target_location_namespace if target_location_namespace else course_location,
-                              do_import_static=do_import_static)
+                                      _namespace_rename, subpath=simport, verbose=verbose,
+                                      progress_callback=progress_callback)
+
+            # finally write all the modules, in bulk
+            modules_start = time.time()
+            static_time = modules_start - static_start
+
+            def module_writes():
+                """
+                Yields the writes for each module of the course other than the course module
+                """
+                total = len(xml_module_store.modules[course_id]) - 1
+                done = 0
+                for module in xml_module_store.modules[course_id].itervalues():
+                    if module.scope_ids.block_type == 'course':
+                        # we've already saved the course module up at the top of the loop
+                        # so just skip over it in the inner loop
+                        continue
+
+                    if progress_callback is not None:
+                        progress_callback('blocks', done, total)
+                    done += 1
+
+                    # remap module to the new namespace
+                    if target_location_namespace is not None:
+                        module = remap_namespace(module, target_location_namespace)
+
+                    if verbose:
+                        log.debug('importing module location {0}'.format(module.location))
+
+                    yield module_write(
+                        module, course_location, target_location_namespace if target_location_namespace else course_location,
+                        do_import_static=do_import_static
+                    )
+
+            store.bulk_write_items(module_writes())
 
             # now import any 'draft' items
+            drafts_start = time.time()
+            modules_time = drafts_start - modules_start
             if draft_store is not None:
+                if progress_callback is not None:
+                    progress_callback('drafts', 0, None)
                 import_course_draft(
                     xml_module_store,
                     store,
@@ -225,6 +345,10 @@ def import_from_xml(store, data_dir, course_dirs=None,
                     target_location_namespace if target_location_namespace else course_location
                 )
 
+            log.info('Imported {0}: static content in {1:.2f}s, modules in {2:.2f}s, drafts in {3:.2f}s'.format(
+                course_id, static_time, modules_time, time.time() - drafts_start
+            ))
+
         finally:
             # turn back on all write signalling
             if pseudo_course_id in store.ignore_write_events_on_courses:
@@ -240,6 +364,26 @@ def import_module(module, store, course_data_path, static_content_store,
                   source_course_location, dest_course_location, allow_not_found=False,
                   do_import_static=True):
 
+    location, module_data, children, metadata = module_write(
+        module, source_course_location, dest_course_location, do_import_static=do_import_static
+    )
+
+    if allow_not_found:
+        store.update_item(location, module_data, allow_not_found=allow_not_found)
+    else:
+        store.update_item(location, module_data)
+
+    if children:
+        store.update_children(location, children)
+
+    store.update_metadata(location, metadata)
+
+
+def module_write(module, source_course_location, dest_course_location, do_import_static=True):
+    """
+    Returns the (location, data, children, metadata) to write to a modulestore to import
+    module, as expected by ModuleStore.bulk_write_items
+    """
     logging.debug('processing import of module {0}...'.format(module.location.url()))
 
     content = {}
@@ -264,13 +408,9 @@ def import_module(module, store, course_data_path, static_content_store,
         module_data = rewrite_nonportable_content_links(
             source_course_location.course_id, dest_course_location.course_id, module_data)
 
-    if allow_not_found:
-        store.update_item(module.location, module_data, allow_not_found=allow_not_found)
-    else:
-        store.update_item(module.location, module_data)
-
+    children = None
     if hasattr(module, 'children') and module.children != []:
-        store.update_children(module.location, module.children)
+        children = module.children
 
     # NOTE: It's important to use own_metadata here to avoid writing
     # inherited metadata everywhere.
@@ -283,7 +423,7 @@ def import_module(module, store, course_data_path, static_content_store,
         del module.xml_attributes['index_in_children_list']
     module.save()
 
-    store.update_metadata(module.location, dict(own_metadata(module)))
+    return module.location, module_data, children, dict(own_metadata(module))
 
 
 def import_course_draft(xml_module_store, store, draft_store, course_data_path, static_content_store, source_location_namespace, target_location_namespace):
@@ -16,14 +16,14 @@ import json
 import xmodule
 from capa.responsetypes import (StudentInputError, LoncapaProblemError,
                                 ResponseError)
-from xmodule.capa_module import CapaModule, ComplexEncoder
+from xmodule.capa_module import CapaDescriptor, CapaModule, ComplexEncoder
 from xmodule.modulestore import Location
 from xblock.field_data import DictFieldData
 from xblock.fields import ScopeIds
 
 from django.http import QueryDict
 
-from . import get_test_system
+from . import get_test_system, get_test_descriptor_system
 from pytz import UTC
 from capa.correctmap import CorrectMap
 
@@ -1289,6 +1289,73 @@ class CapaModuleTest(unittest.TestCase):
         self.assertEquals(module.get_problem("data"), {'html': module.get_problem_html(encapsulate=False)})
 
 
+class DictCache(object):
+    """A cache for ModuleSystem which keeps its values in a dict"""
+    def __init__(self):
+        self.values = {}
+
+    def get(self, key):
+        return self.values.get(key)
+
+    def set(self, key, value, timeout=None):
+        self.values[key] = value
+
+
+class CapaDescriptorScoreTest(unittest.TestCase):
+    """
+    Tests that the scores of problems are computed without building them, once their
+    max score is cached.
+    """
+    def setUp(self):
+        self.cache = DictCache()
+
+    def create_descriptor(self, **state):
+        location = Location(["i4x", "edX", "capa_test", "problem",
+                             "SampleProblem{0}".format(CapaFactory.next_num())])
+        field_data = {'data': CapaFactory.sample_problem_xml}
+        field_data.update(state)
+        descriptor = get_test_descriptor_system().construct_xblock_from_class(
+            CapaDescriptor,
+            ScopeIds(None, None, location, location),
+            DictFieldData(field_data),
+        )
+        descriptor.xmodule_runtime = get_test_system()
+        descriptor.xmodule_runtime.cache = self.cache
+        return descriptor
+
+    def test_max_score_cached(self):
+        self.assertEqual(self.create_descriptor().max_score(), 1)
+
+        with patch.object(CapaModule, 'new_lcp', side_effect=AssertionError):
+            self.assertEqual(self.create_descriptor().max_score(), 1)
+
+    def test_max_score_without_module(self):
+        with patch.object(CapaModule, '__init__', side_effect=AssertionError):
+            self.assertEqual(self.create_descriptor().max_score(), 1)
+
+    def test_max_score_of_broken_problem(self):
+        descriptor = self.create_descriptor(data='<problem><p>unclosed</problem>')
+        self.assertIsNone(descriptor.max_score())
+
+    def test_get_score_from_state(self):
+        self.create_descriptor().max_score()
+        answer_id = 'i4x-edX-capa_test-problem-SampleProblem1_2_1'
+        with patch.object(CapaModule, 'new_lcp', side_effect=AssertionError):
+            self.assertEqual(self.create_descriptor().get_score(), {'score': 0, 'total': 1})
+
+            descriptor = self.create_descriptor(
+                student_answers={answer_id: '3.14'},
+                correct_map={answer_id: {'correctness': 'correct'}},
+            )
+            self.assertEqual(descriptor.get_score(), {'score': 1, 'total': 1})
+
+            descriptor = self.create_descriptor(
+                student_answers={answer_id: '3'},
+                correct_map={answer_id: {'correctness': 'incorrect'}},
+            )
+            self.assertEqual(descriptor.get_score(), {'score': 0, 'total': 1})
+
+
 class ComplexEncoderTest(unittest.TestCase):
     def test_default(self):
         """
@@ -3,9 +3,11 @@ Tests of XML export
 """
 
 from datetime import datetime, timedelta, tzinfo
+from StringIO import StringIO
 from tempfile import mkdtemp
 import unittest
 import shutil
+import tarfile
 from textwrap import dedent
 import mock
 
@@ -15,7 +17,7 @@ from path import path
 
 from xmodule.modulestore import Location
 from xmodule.modulestore.xml import XMLModuleStore
-from xmodule.modulestore.xml_exporter import EdxJSONEncoder
+from xmodule.modulestore.xml_exporter import EdxJSONEncoder, TarExportFS
 from xmodule.tests import DATA_DIR
 
 
@@ -136,6 +138,116 @@ class RoundTripTestCase(unittest.TestCase):
         self.check_export_roundtrip(DATA_DIR, "word_cloud")
 
 
+class _WriteOnlyFile(object):
+    """A file which can only be written to, in order, like a socket"""
+    def __init__(self):
+        self.buffer = StringIO()
+
+    def write(self, data):
+        self.buffer.write(data)
+
+
+class TarExportFSTestCase(unittest.TestCase):
+    """
+    Tests of the filesystem which writes an export into a streamed tar archive
+    """
+    def setUp(self):
+        self.output = _WriteOnlyFile()
+        self.export_fs = TarExportFS(self.output, 'course')
+
+    def archive(self):
+        """Close the export, and return the tar archive that was written"""
+        self.export_fs.close()
+        return tarfile.open(fileobj=StringIO(self.output.buffer.getvalue()), mode='r:gz')
+
+    def test_write_files(self):
+        with self.export_fs.open('course.xml', 'w') as course_xml:
+            course_xml.write('<course/>')
+        self.export_fs.makedir('html/sub', recursive=True, allow_recreate=True)
+        with self.export_fs.open('html/sub/intro.html', 'w') as html:
+            html.write('<p>Hello</p>')
+        static_fs = self.export_fs.makeopendir('static')
+        static_fs.setcontents('data.bin', StringIO('x' * 100000))
+
+        archive = self.archive()
+        self.assertEquals(
+            sorted(archive.getnames()),
+            ['course', 'course/course.xml', 'course/html', 'course/html/sub', 'course/html/sub/intro.html',
+             'course/static', 'course/static/data.bin']
+        )
+        self.assertTrue(archive.getmember('course/html').isdir())
+        self.assertEquals(archive.extractfile('course/course.xml').read(), '<course/>')
+        self.assertEquals(archive.extractfile('course/html/sub/intro.html').read(), '<p>Hello</p>')
+        self.assertEquals(archive.extractfile('course/static/data.bin').read(), 'x' * 100000)
+
+    def test_paths(self):
+        self.assertTrue(self.export_fs.isdir(''))
+        policies_fs = self.export_fs.makeopendir('policies')
+        policies_fs.setcontents('assets.json', '{}')
+        self.assertTrue(self.export_fs.isfile('policies/assets.json'))
+        self.assertTrue(policies_fs.exists('assets.json'))
+        self.assertFalse(self.export_fs.exists('static'))
+
+        with self.assertRaises(ValueError):
+            self.export_fs.makedir('a/b')
+        with self.assertRaises(ValueError):
+            self.export_fs.makedir('policies')
+        with self.assertRaises(ValueError):
+            self.export_fs.open('course.xml', 'r')
+
+    def test_rewrite_file(self):
+        self.export_fs.setcontents('course.xml', '<course/>')
+        self.export_fs.setcontents('course.xml', '<course name="rewritten"/>')
+        self.assertTrue(self.export_fs.isfile('course.xml'))
+
+        temp_dir = mkdtemp()
+        self.addCleanup(shutil.rmtree, temp_dir)
+        self.archive().extractall(temp_dir)
+        self.assertEquals((path(temp_dir) / 'course' / 'course.xml').text(), '<course name="rewritten"/>')
+
+    def test_shared_child(self):
+        store = XMLModuleStore(DATA_DIR, course_dirs=['simple'])
+        initial_course = store.get_courses()[0]
+        html_location = Location('i4x', 'edX', 'simple', 'html', 'test_html')
+        sequence_location = Location('i4x', 'edX', 'simple', 'videosequence', 'A_simple_sequence')
+        # the html is a child of test_vertical, make it a child of the sequence too
+        sequence = store.get_instance(initial_course.id, sequence_location)
+        sequence.children = sequence.children + [html_location.url()]
+
+        xml = initial_course.export_to_xml(self.export_fs)
+        with self.export_fs.open('course.xml', 'w') as course_xml:
+            course_xml.write(xml)
+
+        temp_dir = mkdtemp()
+        self.addCleanup(shutil.rmtree, temp_dir)
+        self.archive().extractall(temp_dir)
+        exported_store = XMLModuleStore(temp_dir, course_dirs=['course'])
+        course_id = exported_store.get_courses()[0].id
+        self.assertEquals(exported_store.get_instance(course_id, sequence_location).children[-1], html_location.url())
+        self.assertEquals(
+            exported_store.get_instance(course_id, html_location).data,
+            store.get_instance(initial_course.id, html_location).data
+        )
+
+    def test_simple_roundtrip(self):
+        initial_course = XMLModuleStore(DATA_DIR, course_dirs=['simple']).get_courses()[0]
+
+        xml = initial_course.export_to_xml(self.export_fs)
+        with self.export_fs.open('course.xml', 'w') as course_xml:
+            course_xml.write(xml)
+
+        temp_dir = mkdtemp()
+        self.addCleanup(shutil.rmtree, temp_dir)
+        self.archive().extractall(temp_dir)
+        exported_course = XMLModuleStore(temp_dir, course_dirs=['course']).get_courses()[0]
+
+        self.assertEquals(initial_course.id, exported_course.id)
+        self.assertEquals(
+            [child.location for child in initial_course.get_children()],
+            [child.location for child in exported_course.get_children()]
+        )
+
+
 class TestEdxJsonEncoder(unittest.TestCase):
     """
     Tests for xml_exporter.EdxJSONEncoder
@@ -7,6 +7,8 @@ Serve miscellaneous course and student data
 from django.contrib.auth.models import User
 import xmodule.graders as xmgraders
 
+from courseware.grading_context import get_grading_context
+
 
 STUDENT_FEATURES = ('username', 'first_name', 'last_name', 'is_staff', 'email')
 PROFILE_FEATURES = ('name', 'language', 'location', 'year_of_birth', 'gender',
@@ -72,7 +74,7 @@ def dump_grading_context(course):
     msg += hbar
     msg += "Listing grading context for course %s\n" % course.id
 
-    gcontext = course.grading_context
+    gcontext = get_grading_context(course)
     msg += "graded sections:\n"
 
     msg += '%s\n' % gcontext['graded_sections'].keys()
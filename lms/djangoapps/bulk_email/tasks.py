@@ -6,8 +6,10 @@ import math
 import re
 import random
 import json
+import threading
+from itertools import islice
 from uuid import uuid4
-from time import sleep
+from time import sleep, time
 
 from dogapi import dog_stats_api
 from smtplib import SMTPServerDisconnected, SMTPDataError, SMTPConnectError, SMTPException
@@ -24,7 +26,7 @@ from boto.ses.exceptions import (
 )
 from boto.exception import AWSConnectionError
 
-from celery import task, current_task, group
+from celery import task, current_task
 from celery.utils.log import get_task_logger
 from celery.states import SUCCESS, FAILURE, RETRY
 from celery.exceptions import RetryTaskError
@@ -93,6 +95,142 @@ BULK_EMAIL_FAILURE_ERRORS = (
 )
 
 
+class SendRateLimiter(object):
+    """
+    Limits the rate at which a worker sends emails with a token bucket, which holds
+    up to one second's worth of sends.
+
+    The rate starts at `max_rate` emails per second.  Each throttling response from the
+    email provider halves it, down to `min_rate`, and it then recovers by `min_rate`
+    per second of sending, so that workers settle just below the provider's limit.
+    """
+    def __init__(self, max_rate, min_rate):
+        self.max_rate = float(max_rate)
+        self.min_rate = float(min_rate)
+        self.rate = self.max_rate
+        self.tokens = 1.0
+        self.last_refill = time()
+        self.lock = threading.Lock()
+
+    def wait(self):
+        """
+        Wait until an email may be sent at the current rate
+        """
+        with self.lock:
+            now = time()
+            self.tokens = min(max(self.rate, 1.0), self.tokens + (now - self.last_refill) * self.rate)
+            self.last_refill = now
+            if self.tokens < 1.0:
+                sleep((1.0 - self.tokens) / self.rate)
+                self.tokens = 1.0
+                self.last_refill = time()
+            self.tokens -= 1.0
+
+    def sent(self):
+        """
+        Record that an email was sent without being throttled
+        """
+        with self.lock:
+            self.rate = min(self.max_rate, self.rate + self.min_rate / self.rate)
+
+    def throttled(self):
+        """
+        Record that the provider rejected an email because of its sending rate
+        """
+        with self.lock:
+            self.rate = max(self.min_rate, self.rate / 2.0)
+            self.tokens = 0.0
+
+
+class EmailConnectionPool(object):
+    """
+    Keeps up to `max_size` open email connections between subtasks, so that a worker
+    doesn't connect and authenticate to the email provider again for every subtask.
+
+    Connections which have been idle for more than `max_idle` seconds are closed
+    rather than reused, as the provider may already have dropped them.
+    """
+    def __init__(self, max_size, max_idle):
+        self.max_size = max_size
+        self.max_idle = max_idle
+        self.idle_connections = []
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        """
+        Returns an open email connection, which must be passed to release() once used
+        """
+        connection = None
+        stale_connections = []
+        with self.lock:
+            expired_at = time() - self.max_idle
+            while self.idle_connections and connection is None:
+                idle_connection, released_at = self.idle_connections.pop()
+                if released_at < expired_at:
+                    stale_connections.append(idle_connection)
+                else:
+                    connection = idle_connection
+        for stale_connection in stale_connections:
+            _close_connection(stale_connection)
+
+        if connection is None:
+            connection = get_connection()
+        try:
+            # opening an already open connection does nothing
+            connection.open()
+        except Exception:
+            _close_connection(connection)
+            raise
+        return connection
+
+    def release(self, connection, reusable=True):
+        """
+        Returns `connection` to the pool, or closes it if it's not `reusable` or the pool is full
+        """
+        with self.lock:
+            if reusable and len(self.idle_connections) < self.max_size:
+                self.idle_connections.append((connection, time()))
+                return
+        _close_connection(connection)
+
+
+def _close_connection(connection):
+    """
+    Closes the email connection `connection`, ignoring errors, as it's no longer needed
+    """
+    try:
+        connection.close()
+    except Exception:  # pylint: disable=broad-except
+        log.warning("Unable to close email connection", exc_info=True)
+
+
+# The email connections and send rate limit shared by the subtasks run by this worker process
+_connection_pool = None
+_rate_limiter = None
+
+
+def _get_connection_pool():
+    """
+    Returns the email connection pool of this worker process
+    """
+    global _connection_pool  # pylint: disable=global-statement
+    if _connection_pool is None:
+        _connection_pool = EmailConnectionPool(
+            settings.BULK_EMAIL_CONNECTION_POOL_SIZE, settings.BULK_EMAIL_CONNECTION_MAX_IDLE
+        )
+    return _connection_pool
+
+
+def _get_rate_limiter():
+    """
+    Returns the send rate limiter of this worker process, or None if sending isn't rate limited
+    """
+    global _rate_limiter  # pylint: disable=global-statement
+    if _rate_limiter is None and settings.BULK_EMAIL_MAX_SEND_RATE:
+        _rate_limiter = SendRateLimiter(settings.BULK_EMAIL_MAX_SEND_RATE, settings.BULK_EMAIL_MIN_SEND_RATE)
+    return _rate_limiter
+
+
 def _get_recipient_queryset(user_id, to_option, course_id, course_location):
     """
     Returns a query set of email recipients corresponding to the requested to_option category.
@@ -152,51 +290,69 @@ def _get_course_email_context(course):
     return email_context
 
 
-def _generate_subtasks(create_subtask_fcn, recipient_qset):
+def _get_optout_user_ids(course_id):
     """
-    Generates a list of subtasks to send email to a given set of recipients.
+    Returns the set of the ids of the users who have opted out of email from the course.
 
-    Arguments:
-        `create_subtask_fcn` : a function whose inputs are a list of recipients and a subtask_id
-            to assign to the new subtask.  Returns the subtask that will send email to that
-            list of recipients.
-        `recipient_qset` : a query set that defines the recipients who should receive emails.
+    This is read once per email, and the optouts subtracted from the recipients as they are
+    read, rather than checking each batch of recipients against the Optout table.
+    """
+    return set(Optout.objects.filter(course_id=course_id).values_list('user_id', flat=True))
 
-    Returns:  a tuple, containing:
 
-      * A list of subtasks that will send emails to all recipients.
-      * A list of subtask_ids corresponding to those subtasks.
-      * A count of the total number of emails being sent.
+def _iter_recipients(recipient_qset):
+    """
+    Yields the recipients in `recipient_qset`, which must be ordered by pk, as dicts
+    with their 'profile__name', 'email' and 'pk'.
 
+    Recipients are read in pages of settings.BULK_EMAIL_EMAILS_PER_QUERY, each starting
+    after the pk of the last recipient of the previous page, so that every page is
+    read with the same, indexed, query.
+    """
+    last_pk = None
+    while True:
+        page_qset = recipient_qset if last_pk is None else recipient_qset.filter(pk__gt=last_pk)
+        page = list(page_qset.values('profile__name', 'email', 'pk')[:settings.BULK_EMAIL_EMAILS_PER_QUERY])
+        for recipient in page:
+            yield recipient
+        if len(page) < settings.BULK_EMAIL_EMAILS_PER_QUERY:
+            return
+        last_pk = page[-1]['pk']
+
+
+def _queue_subtasks(create_subtask_fcn, subtask_id_list, recipients, optout_ids):
+    """
+    Queues subtasks to send email to recipients, as the recipients are read.
+
+    Arguments:
+        `create_subtask_fcn` : a function whose inputs are a list of recipients, a subtask_id
+            to assign to the new subtask, and the number of recipients skipped because they
+            opted out.  Returns the subtask that will send email to that list of recipients.
+        `subtask_id_list` : the ids of the subtasks to queue, one for each batch of
+            settings.BULK_EMAIL_EMAILS_PER_TASK recipients.
+        `recipients` : an iterator over the recipients, as produced by `_iter_recipients`.
+        `optout_ids` : the set of the ids of the users who have opted out, who are counted as
+            skipped rather than being sent email.
+
+    Each subtask is given at most settings.BULK_EMAIL_EMAILS_PER_TASK recipients. The
+    recipients may have changed since the number of subtasks was computed: subtasks for which
+    no recipients are left are still queued (with no recipients) so that the task can complete,
+    and any recipients left over once every subtask is full are not sent email.
+
+    Returns the number of recipients queued, including those who opted out.
     """
-    total_num_emails = recipient_qset.count()
-    num_queries = int(math.ceil(float(total_num_emails) / float(settings.BULK_EMAIL_EMAILS_PER_QUERY)))
-    last_pk = recipient_qset[0].pk - 1
     num_emails_queued = 0
-    task_list = []
-    subtask_id_list = []
-    for _ in range(num_queries):
-        recipient_sublist = list(recipient_qset.order_by('pk').filter(pk__gt=last_pk).values('profile__name', 'email', 'pk')[:settings.BULK_EMAIL_EMAILS_PER_QUERY])
-        last_pk = recipient_sublist[-1]['pk']
-        num_emails_this_query = len(recipient_sublist)
-        num_tasks_this_query = int(math.ceil(float(num_emails_this_query) / float(settings.BULK_EMAIL_EMAILS_PER_TASK)))
-        chunk = int(math.ceil(float(num_emails_this_query) / float(num_tasks_this_query)))
-        for i in range(num_tasks_this_query):
-            to_list = recipient_sublist[i * chunk:i * chunk + chunk]
-            subtask_id = str(uuid4())
-            subtask_id_list.append(subtask_id)
-            new_subtask = create_subtask_fcn(to_list, subtask_id)
-            task_list.append(new_subtask)
-
-        num_emails_queued += num_emails_this_query
-
-    # Sanity check: we expect the chunking to be properly summing to the original count:
-    if num_emails_queued != total_num_emails:
-        error_msg = "Task {}: number of emails generated by chunking {} not equal to original total {}".format(num_emails_queued, total_num_emails)
-        log.error(error_msg)
-        raise ValueError(error_msg)
+    for subtask_id in subtask_id_list:
+        recipient_sublist = list(islice(recipients, settings.BULK_EMAIL_EMAILS_PER_TASK))
+        to_list = [recipient for recipient in recipient_sublist if recipient['pk'] not in optout_ids]
+        new_subtask = create_subtask_fcn(to_list, subtask_id, len(recipient_sublist) - len(to_list))
+        new_subtask.apply_async()
+        num_emails_queued += len(recipient_sublist)
 
-    return task_list, subtask_id_list, total_num_emails
+    num_left_over = sum(1 for _ in recipients)
+    if num_left_over:
+        log.warning("%d recipients added since the subtasks were defined were not queued", num_left_over)
+    return num_emails_queued
 
 
 def perform_delegate_email_batches(entry_id, course_id, task_input, action_name):
@@ -256,9 +412,9 @@ def perform_delegate_email_batches(entry_id, course_id, task_input, action_name)
     recipient_qset = _get_recipient_queryset(user_id, to_option, course_id, course.location)
     global_email_context = _get_course_email_context(course)
 
-    def _create_send_email_subtask(to_list, subtask_id):
+    def _create_send_email_subtask(to_list, subtask_id, num_optout):
         """Creates a subtask to send email to a given recipient list."""
-        subtask_status = create_subtask_status(subtask_id)
+        subtask_status = create_subtask_status(subtask_id, skipped=num_optout)
         new_subtask = send_course_email.subtask(
             (
                 entry_id,
@@ -272,22 +428,33 @@ def perform_delegate_email_batches(entry_id, course_id, task_input, action_name)
         )
         return new_subtask
 
-    log.info("Task %s: Preparing to generate subtasks for course %s, email %s, to_option %s",
-             task_id, course_id, email_id, to_option)
-    task_list, subtask_id_list, total_num_emails = _generate_subtasks(_create_send_email_subtask, recipient_qset)
+    # Define the subtasks, one per batch of recipients, before any of them are queued, so that
+    # the subtasks are known to the InstructorTask by the time they run. The recipients are
+    # bounded by the last pk at the time they are counted, so that accounts created since then
+    # don't overflow the last subtask.
+    last_pk = list(recipient_qset.reverse().values_list('pk', flat=True)[:1])
+    recipient_qset = recipient_qset.filter(pk__lte=last_pk[0] if last_pk else 0)
+    total_num_emails = recipient_qset.count()
+    num_subtasks = int(math.ceil(float(total_num_emails) / float(settings.BULK_EMAIL_EMAILS_PER_TASK)))
+    subtask_id_list = [str(uuid4()) for _ in range(num_subtasks)]
 
     # Update the InstructorTask  with information about the subtasks we've defined.
     log.info("Task %s: Preparing to update task for sending %d emails for course %s, email %s, to_option %s",
              task_id, total_num_emails, course_id, email_id, to_option)
     progress = initialize_subtask_info(entry, action_name, total_num_emails, subtask_id_list)
-    num_subtasks = len(subtask_id_list)
 
-    # Now group the subtasks, and start them running.  This allows all the subtasks
-    # in the list to be submitted at the same time.
+    # Now read the recipients, and start each subtask running as soon as its recipients are read.
     log.info("Task %s: Preparing to queue %d email tasks (%d emails) for course %s, email %s, to %s",
              task_id, num_subtasks, total_num_emails, course_id, email_id, to_option)
-    task_group = group(task_list)
-    task_group.apply_async(routing_key=settings.BULK_EMAIL_ROUTING_KEY)
+    num_emails_queued = _queue_subtasks(
+        _create_send_email_subtask,
+        subtask_id_list,
+        _iter_recipients(recipient_qset),
+        _get_optout_user_ids(course_id),
+    )
+    if num_emails_queued != total_num_emails:
+        log.warning("Task %s: number of emails queued %d not equal to original total %d, as recipients changed",
+                    task_id, num_emails_queued, total_num_emails)
 
     # We want to return progress here, as this is what will be stored in the
     # AsyncResult for the parent task as its return value.
@@ -328,7 +495,8 @@ def send_course_email(entry_id, email_id, to_list, global_email_context, subtask
         Most values will be zero on initial call, but may be different when the task is
         invoked as part of a retry.
 
-    Sends to all addresses contained in to_list that are not also in the Optout table.
+    Sends to all addresses contained in to_list.  Recipients who opted out have already been
+    left out of the to_list, and counted as skipped in the initial `subtask_status`.
     Emails are sent multi-part, in both plain text and html.  Updates InstructorTask object
     with status information (sends, failures, skips) and updates number of subtasks completed.
     """
@@ -390,26 +558,6 @@ def send_course_email(entry_id, email_id, to_list, global_email_context, subtask
     return new_subtask_status
 
 
-def _filter_optouts_from_recipients(to_list, course_id):
-    """
-    Filters a recipient list based on student opt-outs for a given course.
-
-    Returns the filtered recipient list, as well as the number of optouts
-    removed from the list.
-    """
-    optouts = Optout.objects.filter(
-        course_id=course_id,
-        user__in=[i['pk'] for i in to_list]
-    ).values_list('user__email', flat=True)
-    optouts = set(optouts)
-    # Only count the num_optout for the first time the optouts are calculated.
-    # We assume that the number will not change on retries, and so we don't need
-    # to calculate it each time.
-    num_optout = len(optouts)
-    to_list = [recipient for recipient in to_list if recipient['email'] not in optouts]
-    return to_list, num_optout
-
-
 def _get_source_address(course_id, course_title):
     """
     Calculates an email address to be used as the 'from-address' for sent emails.
@@ -462,7 +610,7 @@ def _send_course_email(entry_id, email_id, to_list, global_email_context, subtas
             should have a maximum count applied
         'state' : celery state of the subtask (e.g. QUEUING, PROGRESS, RETRY, FAILURE, SUCCESS)
 
-    Sends to all addresses contained in to_list that are not also in the Optout table.
+    Sends to all addresses contained in to_list, from which optouts have already been removed.
     Emails are sent multi-part, in both plain text and html.
 
     Returns a tuple of two values:
@@ -477,7 +625,6 @@ def _send_course_email(entry_id, email_id, to_list, global_email_context, subtas
     task_id = subtask_status['task_id']
 
     # collect stats on progress:
-    num_optout = 0
     num_sent = 0
     num_error = 0
 
@@ -487,42 +634,35 @@ def _send_course_email(entry_id, email_id, to_list, global_email_context, subtas
         log.exception("Task %s: could not find email id:%s to send.", task_id, email_id)
         raise
 
-    # Exclude optouts (if not a retry):
-    # Note that we don't have to do the optout logic at all if this is a retry,
-    # because we have presumably already performed the optout logic on the first
-    # attempt.  Anyone on the to_list on a retry has already passed the filter
-    # that existed at that time, and we don't need to keep checking for changes
-    # in the Optout list.
-    if (subtask_status['retried_nomax'] + subtask_status['retried_withmax']) == 0:
-        to_list, num_optout = _filter_optouts_from_recipients(to_list, course_email.course_id)
-
     course_title = global_email_context['course_title']
     subject = "[" + course_title + "] " + course_email.subject
     from_addr = _get_source_address(course_email.course_id, course_title)
 
     course_email_template = CourseEmailTemplate.get_template()
+    rate_limiter = _get_rate_limiter()
+    connection_pool = _get_connection_pool()
+    connection = None
+    connection_reusable = False
     try:
-        connection = get_connection()
-        connection.open()
+        # Render everything but the recipient's name and email address once for all recipients:
+        plaintext_template = course_email_template.prerender_plaintext(course_email.text_message, global_email_context)
+        html_template = course_email_template.prerender_htmltext(course_email.html_message, global_email_context)
 
-        # Define context values to use in all course emails:
-        email_context = {'name': '', 'email': ''}
-        email_context.update(global_email_context)
+        connection = connection_pool.acquire()
 
         while to_list:
-            # Update context with user-specific values from the user at the end of the list.
+            # Render the email for the user at the end of the list.
             # At the end of processing this user, they will be popped off of the to_list.
             # That way, the to_list will always contain the recipients remaining to be emailed.
             # This is convenient for retries, which will need to send to those who haven't
             # yet been emailed, but not send to those who have already been sent to.
             current_recipient = to_list[-1]
             email = current_recipient['email']
-            email_context['email'] = email
-            email_context['name'] = current_recipient['profile__name']
+            recipient_context = {'name': current_recipient['profile__name'], 'email': email}
 
             # Construct message content using templates and context:
-            plaintext_msg = course_email_template.render_plaintext(course_email.text_message, email_context)
-            html_msg = course_email_template.render_htmltext(course_email.html_message, email_context)
+            plaintext_msg = plaintext_template.render(recipient_context)
+            html_msg = html_template.render(recipient_context)
 
             # Create email:
             email_msg = EmailMultiAlternatives(
@@ -534,13 +674,10 @@ def _send_course_email(entry_id, email_id, to_list, global_email_context, subtas
             )
             email_msg.attach_alternative(html_msg, 'text/html')
 
-            # Throttle if we have gotten the rate limiter.  This is not very high-tech,
-            # but if a task has been retried for rate-limiting reasons, then we sleep
-            # for a period of time between all emails within this task.  Choice of
-            # the value depends on the number of workers that might be sending email in
-            # parallel, and what the SES throttle rate is.
-            if subtask_status['retried_nomax'] > 0:
-                sleep(settings.BULK_EMAIL_RETRY_DELAY_BETWEEN_SENDS)
+            # Keep to the sending rate of this worker, which is lowered whenever
+            # the email provider throttles us.
+            if rate_limiter is not None:
+                rate_limiter.wait()
 
             try:
                 log.debug('Email with id %s to be sent to %s', email_id, email)
@@ -556,17 +693,16 @@ def _send_course_email(entry_id, email_id, to_list, global_email_context, subtas
                 else:
                     # This will fall through and not retry the message.
                     log.warning('Task %s: email with id %s not delivered to %s due to error %s', task_id, email_id, email, exc.smtp_error)
-                    dog_stats_api.increment('course_email.error', tags=[_statsd_tag(course_title)])
                     num_error += 1
 
             except SINGLE_EMAIL_FAILURE_ERRORS as exc:
                 # This will fall through and not retry the message.
                 log.warning('Task %s: email with id %s not delivered to %s due to error %s', task_id, email_id, email, exc)
-                dog_stats_api.increment('course_email.error', tags=[_statsd_tag(course_title)])
                 num_error += 1
 
             else:
-                dog_stats_api.increment('course_email.sent', tags=[_statsd_tag(course_title)])
+                if rate_limiter is not None:
+                    rate_limiter.sent()
                 if settings.BULK_EMAIL_LOG_SENT_EMAILS:
                     log.info('Email with id %s sent to %s', email_id, email)
                 else:
@@ -580,13 +716,16 @@ def _send_course_email(entry_id, email_id, to_list, global_email_context, subtas
 
     except INFINITE_RETRY_ERRORS as exc:
         dog_stats_api.increment('course_email.infinite_retry', tags=[_statsd_tag(course_title)])
+        # The provider is throttling us, so slow down, though the connection can still be used.
+        if rate_limiter is not None:
+            rate_limiter.throttled()
+        connection_reusable = True
         # Increment the "retried_nomax" counter, update other counters with progress to date,
         # and set the state to RETRY:
         subtask_progress = increment_subtask_status(
             subtask_status,
             succeeded=num_sent,
             failed=num_error,
-            skipped=num_optout,
             retried_nomax=1,
             state=RETRY
         )
@@ -605,7 +744,6 @@ def _send_course_email(entry_id, email_id, to_list, global_email_context, subtas
             subtask_status,
             succeeded=num_sent,
             failed=num_error,
-            skipped=num_optout,
             retried_withmax=1,
             state=RETRY
         )
@@ -624,7 +762,6 @@ def _send_course_email(entry_id, email_id, to_list, global_email_context, subtas
             subtask_status,
             succeeded=num_sent,
             failed=(num_error + num_pending),
-            skipped=num_optout,
             state=FAILURE
         )
         return subtask_progress, exc
@@ -643,7 +780,6 @@ def _send_course_email(entry_id, email_id, to_list, global_email_context, subtas
             subtask_status,
             succeeded=num_sent,
             failed=num_error,
-            skipped=num_optout,
             retried_withmax=1,
             state=RETRY
         )
@@ -652,20 +788,26 @@ def _send_course_email(entry_id, email_id, to_list, global_email_context, subtas
         )
 
     else:
+        connection_reusable = True
         # All went well.  Update counters with progress to date,
         # and set the state to SUCCESS:
         subtask_progress = increment_subtask_status(
             subtask_status,
             succeeded=num_sent,
             failed=num_error,
-            skipped=num_optout,
             state=SUCCESS
         )
         # Successful completion is marked by an exception value of None.
         return subtask_progress, None
     finally:
-        # Clean up at the end.
-        connection.close()
+        # Keep the connection open for the next subtask, unless it failed, and record
+        # the emails sent and not delivered by this subtask.
+        if connection is not None:
+            connection_pool.release(connection, reusable=connection_reusable)
+        if num_sent:
+            dog_stats_api.increment('course_email.sent', value=num_sent, tags=[_statsd_tag(course_title)])
+        if num_error:
+            dog_stats_api.increment('course_email.error', value=num_error, tags=[_statsd_tag(course_title)])
 
 
 def _get_current_task():
@@ -103,6 +103,30 @@ class CourseEmailTemplateTest(TestCase):
         context = self._get_sample_plain_context()
         template.render_plaintext("My new plain text.", context)
 
+    def test_prerender_html(self):
+        template = CourseEmailTemplate.get_template()
+        context = self._get_sample_html_context()
+        recipient_context = {'name': 'Robot', 'email': context.pop('email')}
+        prerendered = template.prerender_htmltext("My new html text.", context)
+        context.update(recipient_context)
+        self.assertEquals(prerendered.render(recipient_context), template.render_htmltext("My new html text.", context))
+
+    def test_prerender_plain(self):
+        template = CourseEmailTemplate.get_template()
+        context = self._get_sample_plain_context()
+        recipient_context = {'name': 'Robot', 'email': context.pop('email')}
+        prerendered = template.prerender_plaintext("My new {plain} text.", context)
+        context.update(recipient_context)
+        self.assertEquals(prerendered.render(recipient_context), template.render_plaintext("My new {plain} text.", context))
+
+    def test_prerender_without_recipient_context(self):
+        template = CourseEmailTemplate.get_template()
+        context = self._get_sample_plain_context()
+        del context['email']
+        prerendered = template.prerender_plaintext("My new plain text.", context)
+        with self.assertRaises(KeyError):
+            prerendered.render({'name': 'Robot'})
+
 
 class CourseAuthorizationTest(TestCase):
     """Test the CourseAuthorization model."""
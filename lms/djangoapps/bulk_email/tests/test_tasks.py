@@ -26,9 +26,13 @@ from boto.exception import AWSConnectionError
 from celery.states import SUCCESS, FAILURE
 
 from django.conf import settings
+from django.contrib.auth.models import User
 from django.core.management import call_command
+from django.test import TestCase
+from django.test.utils import override_settings
 
 from bulk_email.models import CourseEmail, Optout, SEND_TO_ALL
+from bulk_email.tasks import _iter_recipients, _queue_subtasks, EmailConnectionPool, SendRateLimiter
 
 from instructor_task.tasks import send_bulk_course_email
 from instructor_task.subtasks import update_subtask_status
@@ -413,3 +417,145 @@ class TestBulkEmailInstructorTask(InstructorTaskCourseTestCase):
 
     def test_failure_on_ses_domain_not_confirmed(self):
         self._test_immediate_failure(SESDomainNotConfirmedError(403, "You're out of bounds!"))
+
+    @override_settings(BULK_EMAIL_EMAILS_PER_QUERY=3)
+    def test_iter_recipients(self):
+        students = self._create_students(7)
+        recipient_qset = User.objects.filter(id__in=[student.id for student in students]).order_by('pk')
+        recipients = list(_iter_recipients(recipient_qset))
+        self.assertEquals([recipient['pk'] for recipient in recipients], sorted(student.id for student in students))
+        self.assertEquals(set(recipients[0].keys()), set(['pk', 'email', 'profile__name']))
+
+    @override_settings(BULK_EMAIL_EMAILS_PER_TASK=3)
+    def test_queue_subtasks(self):
+        def _queue(num_recipients, optout_ids):
+            """Queue three subtasks for num_recipients, returning their recipients and optout counts"""
+            subtasks = []
+
+            def create_subtask(to_list, subtask_id, num_optout):
+                """Record the subtask"""
+                subtasks.append((subtask_id, [recipient['pk'] for recipient in to_list], num_optout))
+                return Mock()
+
+            recipients = iter([{'pk': pk, 'email': 'robot{0}@edx.org'.format(pk)} for pk in range(num_recipients)])
+            num_queued = _queue_subtasks(create_subtask, ['a', 'b', 'c'], recipients, optout_ids)
+            self.assertEquals(num_queued, min(num_recipients, 9))
+            return subtasks
+
+        self.assertEquals(_queue(9, set([1, 7])), [('a', [0, 2], 1), ('b', [3, 4, 5], 0), ('c', [6, 8], 1)])
+        # no subtask is given more than BULK_EMAIL_EMAILS_PER_TASK recipients
+        self.assertEquals(_queue(11, set()), [('a', [0, 1, 2], 0), ('b', [3, 4, 5], 0), ('c', [6, 7, 8], 0)])
+        # and subtasks are still queued if recipients have been removed
+        self.assertEquals(_queue(2, set()), [('a', [0, 1], 0), ('b', [], 0), ('c', [], 0)])
+
+    @override_settings(BULK_EMAIL_EMAILS_PER_TASK=3)
+    def test_connection_reused_between_subtasks(self):
+        # We also send email to the instructor, for two subtasks:
+        self._create_students(5)
+        with patch('bulk_email.tasks._connection_pool', EmailConnectionPool(1, 60)):
+            with patch('bulk_email.tasks.get_connection', autospec=True) as get_conn:
+                get_conn.return_value.send_messages.side_effect = cycle([None])
+                task_entry = self._create_input_entry()
+                parent_status = self._run_task_with_mock_celery(send_bulk_course_email, task_entry.id, task_entry.task_id)
+        self.assertEquals(parent_status.get('succeeded'), 6)
+        self.assertEquals(get_conn.call_count, 1)
+        self.assertFalse(get_conn.return_value.close.called)
+
+    def test_throttling_lowers_send_rate(self):
+        # We also send email to the instructor:
+        self._create_students(1)
+        rate_limiter = SendRateLimiter(50, 1)
+        with patch('bulk_email.tasks._rate_limiter', rate_limiter):
+            with patch('bulk_email.tasks.get_connection', autospec=True) as get_conn:
+                get_conn.return_value.send_messages.side_effect = cycle(
+                    [SMTPDataError(455, "Throttling: Sending rate exceeded"), None]
+                )
+                self._test_run_with_task(send_bulk_course_email, 'emailed', 2, 2, retried_nomax=2)
+        self.assertLess(rate_limiter.rate, 50)
+
+
+@patch('bulk_email.tasks.sleep')
+@patch('bulk_email.tasks.time')
+class TestSendRateLimiter(TestCase):
+    """Tests the token bucket which limits the rate at which a worker sends emails."""
+
+    def test_wait(self, mock_time, mock_sleep):
+        mock_time.return_value = 100.0
+        rate_limiter = SendRateLimiter(2, 1)
+        rate_limiter.wait()
+        self.assertFalse(mock_sleep.called)
+        rate_limiter.wait()
+        mock_sleep.assert_called_once_with(0.5)
+
+        # no more than a second's worth of emails can be sent at once after a pause:
+        mock_sleep.reset_mock()
+        mock_time.return_value = 200.0
+        rate_limiter.wait()
+        rate_limiter.wait()
+        self.assertFalse(mock_sleep.called)
+        rate_limiter.wait()
+        mock_sleep.assert_called_once_with(0.5)
+
+    def test_throttled(self, mock_time, _mock_sleep):
+        mock_time.return_value = 100.0
+        rate_limiter = SendRateLimiter(8, 1)
+        rate_limiter.throttled()
+        self.assertEquals(rate_limiter.rate, 4)
+        for _ in range(3):
+            rate_limiter.throttled()
+        self.assertEquals(rate_limiter.rate, 1)
+
+        # the rate recovers as emails are sent, up to its maximum:
+        rate_limiter.sent()
+        self.assertEquals(rate_limiter.rate, 2)
+        for _ in range(100):
+            rate_limiter.sent()
+        self.assertEquals(rate_limiter.rate, 8)
+
+
+@patch('bulk_email.tasks.get_connection', side_effect=lambda: Mock())
+class TestEmailConnectionPool(TestCase):
+    """Tests the pool of email connections kept open by a worker."""
+
+    def test_reuse(self, get_conn):
+        pool = EmailConnectionPool(1, 60)
+        connection = pool.acquire()
+        self.assertTrue(connection.open.called)
+        pool.release(connection)
+        self.assertIs(pool.acquire(), connection)
+        self.assertEquals(get_conn.call_count, 1)
+        self.assertFalse(connection.close.called)
+
+    def test_not_reusable(self, get_conn):
+        pool = EmailConnectionPool(1, 60)
+        connection = pool.acquire()
+        pool.release(connection, reusable=False)
+        self.assertTrue(connection.close.called)
+        self.assertIsNot(pool.acquire(), connection)
+        self.assertEquals(get_conn.call_count, 2)
+
+    def test_pool_full(self, _get_conn):
+        pool = EmailConnectionPool(1, 60)
+        first_connection = pool.acquire()
+        second_connection = pool.acquire()
+        pool.release(first_connection)
+        pool.release(second_connection)
+        self.assertFalse(first_connection.close.called)
+        self.assertTrue(second_connection.close.called)
+
+    def test_idle_connection_closed(self, _get_conn):
+        pool = EmailConnectionPool(1, 60)
+        connection = pool.acquire()
+        with patch('bulk_email.tasks.time', return_value=1000.0):
+            pool.release(connection)
+        with patch('bulk_email.tasks.time', return_value=1061.0):
+            self.assertIsNot(pool.acquire(), connection)
+        self.assertTrue(connection.close.called)
+
+    def test_open_failure(self, get_conn):
+        get_conn.side_effect = None
+        get_conn.return_value.open.side_effect = SMTPConnectError(424, "Bad Connection")
+        pool = EmailConnectionPool(1, 60)
+        with self.assertRaises(SMTPConnectError):
+            pool.acquire()
+        self.assertTrue(get_conn.return_value.close.called)
@@ -6,7 +6,9 @@ from datetime import datetime, timedelta
 from functools import partial
 
 from django.conf import settings
-from django.contrib.auth.models import Group
+from django.contrib.auth.models import Group, User
+from django.db.models.signals import m2m_changed, post_save
+from django.dispatch import receiver
 
 from xmodule.course_module import CourseDescriptor
 from xmodule.error_module import ErrorDescriptor
@@ -18,6 +20,8 @@ from external_auth.models import ExternalAuthMap
 from courseware.masquerade import is_masquerading_as_student
 from django.utils.timezone import UTC
 from student.models import CourseEnrollment
+from request_cache.middleware import RequestCache
+from crum import get_current_request
 
 DEBUG_ACCESS = False
 
@@ -63,6 +67,24 @@ def has_access(user, obj, action, course_context=None):
 
     Returns a bool.  It is up to the caller to actually deny access in a way
     that makes sense in context.
+
+    Decisions about descriptors and locations are cached for the rest of the
+    request, as rendering a module checks them for each of its children.
+    """
+    cache_key = _access_cache_key(user, obj, action, course_context)
+    access_cache = _get_access_cache() if cache_key is not None else None
+    if access_cache is None:
+        return _has_access(user, obj, action, course_context)
+
+    decisions = access_cache.setdefault('decisions', {})
+    if cache_key not in decisions:
+        decisions[cache_key] = _has_access(user, obj, action, course_context)
+    return decisions[cache_key]
+
+
+def _has_access(user, obj, action, course_context):
+    """
+    Does the work of has_access, without caching
     """
     # delegate the work to type-specific functions.
     # (start with more specific types, then get more general)
@@ -108,6 +130,80 @@ def get_access_group_name(obj, action):
 
 
 # ================ Implementation helpers ================================
+def _get_access_cache():
+    """
+    Returns the dict in which access decisions, group memberships and enrollments are
+    cached for the current request, or None outside of requests (e.g. in celery tasks), where nothing
+    is cached.
+    """
+    if get_current_request() is None:
+        return None
+    return RequestCache.get_request_cache().data.setdefault('courseware.access', {})
+
+
+def _access_cache_key(user, obj, action, course_context):
+    """
+    Returns the key of the decision of has_access(user, obj, action, course_context) in
+    the access cache, or None if it isn't cached.
+    """
+    if isinstance(obj, XModuleDescriptor):
+        obj_key = ('descriptor', obj.location)
+    elif isinstance(obj, Location):
+        obj_key = ('location', obj)
+    else:
+        # modules delegate to their descriptors, and string permissions are cheap
+        return None
+    user_key = (getattr(user, 'id', None), is_masquerading_as_student(user))
+    return user_key + (action, course_context) + obj_key
+
+
+@receiver(m2m_changed, sender=User.groups.through)
+@receiver(post_save, sender=CourseEnrollment)
+def _clear_access_cache(sender, **kwargs):  # pylint: disable=unused-argument
+    """
+    Forget the access decisions of the current request when group membership or
+    enrollments change during it.
+    """
+    access_cache = _get_access_cache()
+    if access_cache is not None:
+        access_cache.clear()
+
+
+def _get_user_group_names(user):
+    """
+    Returns the set of the names of the groups of user, which decide its staff and
+    beta tester status, fetched once per request.
+    """
+    access_cache = _get_access_cache()
+    if access_cache is None:
+        return set(g.name for g in user.groups.all())
+
+    group_names = access_cache.setdefault('group_names', {})
+    if user.id not in group_names:
+        group_names[user.id] = set(g.name for g in user.groups.all())
+    return group_names[user.id]
+
+
+def _is_enrolled(user, course_id):
+    """
+    Returns whether user is enrolled in course_id. The ids of all the courses the user
+    is enrolled in are fetched once per request.
+    """
+    access_cache = _get_access_cache()
+    if access_cache is None:
+        return CourseEnrollment.is_enrolled(user, course_id)
+
+    enrollments = access_cache.setdefault('enrollments', {})
+    if user.id not in enrollments:
+        if user.is_authenticated():
+            enrollments[user.id] = set(CourseEnrollment.objects.filter(
+                user=user, is_active=True
+            ).values_list('course_id', flat=True))
+        else:
+            enrollments[user.id] = set()
+    return course_id in enrollments[user.id]
+
+
 def _has_access_course_desc(user, course, action):
     """
     Check if user has access to a course descriptor.
@@ -135,7 +231,7 @@ def _has_access_course_desc(user, course, action):
         Can this user access the forums in this course?
         """
         return (can_load() and \
-            (CourseEnrollment.is_enrolled(user, course.id) or \
+            (_is_enrolled(user, course.id) or \
                 _has_staff_access_to_descriptor(user, course)
             ))
 
@@ -530,7 +626,7 @@ def _adjust_start_date_for_beta_testers(user, descriptor):
         # bail early if no beta testing is set up
         return descriptor.start
 
-    user_groups = [g.name for g in user.groups.all()]
+    user_groups = _get_user_group_names(user)
 
     beta_group = course_beta_test_group_name(descriptor.location)
     if beta_group in user_groups:
@@ -577,7 +673,7 @@ def _has_access_to_location(user, location, access_level, course_context):
         return True
 
     # If not global staff, is the user in the Auth group for this class?
-    user_groups = [g.name for g in user.groups.all()]
+    user_groups = _get_user_group_names(user)
 
     if access_level == 'staff':
         staff_groups = group_names_for_staff(location, course_context) + \
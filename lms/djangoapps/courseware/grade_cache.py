@@ -0,0 +1,190 @@
+"""
+Persistent per-student cache of the section scores computed by `courseware.grades.grade`.
+
+Grading a student means walking every graded section of the course and
+instantiating an XModule for each scorable problem, which makes it the single
+most expensive thing the LMS does.  The output of that walk (one list of
+problem Scores per graded section) only changes when the student is graded on
+a problem, or when the structure or policy of the course changes, so we store
+it in the `StudentGradeSummary` table and:
+
+- update it in place when a problem publishes a new grade for the student
+  (see `update_cached_score`, called from the `publish` function in
+  `courseware.module_render`),
+- discard it when a StudentModule is deleted (e.g. "delete student state"),
+- ignore it when the grading policy hash stored with it no longer matches
+  the course.
+
+Every change to a summary row increments its version, and computed section
+scores are only stored if the version is still the one read before they were
+computed, so that a grade published while a student is being graded isn't
+overwritten by scores computed without it.
+
+The grader itself is cheap and is always re-run on read, so only the section
+scores are stored.
+"""
+# Compute grades using real division, with no integer truncation
+from __future__ import division
+
+import hashlib
+import json
+import logging
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from xmodule.graders import Score
+from .grading_context import get_grading_context
+from .models import StudentGradeSummary
+
+log = logging.getLogger("mitx.courseware")
+
+
+def cache_enabled(course):
+    """
+    Returns True if grades for `course` may be read from and written to the cache.
+
+    Courses containing problems whose score is updated outside of the LMS
+    (`always_recalculate_grades`, e.g. foldit) are never cached.
+    """
+    if not settings.MITX_FEATURES.get('ENABLE_GRADE_SUMMARY_CACHE', False):
+        return False
+    if settings.GENERATE_PROFILE_SCORES:
+        return False
+    return not get_grading_context(course)['always_recalculate_grades']
+
+
+def grading_policy_hash(course):
+    """
+    Returns a hash of everything in `course` that the cached section scores depend on:
+    the grading policy, and the location, format and weight of every graded
+    section and scorable problem, and the content of those problems (from
+    which the max scores of the problems the student hasn't attempted come).
+    """
+    structure = []
+    for section_format, sections in sorted(get_grading_context(course)['graded_sections'].iteritems()):
+        for section in sections:
+            structure.append([
+                section_format, section['location'], section['scorable'], section.get('content_hash')
+            ])
+
+    policy = [course.raw_grader, course.grade_cutoffs, structure]
+    return hashlib.sha1(json.dumps(policy, sort_keys=True)).hexdigest()
+
+
+def weighted_score(correct, total, weight, problem=None):
+    """
+    Re-weight a (correct, total) score so that `total` equals `weight`, if specified.
+    """
+    if weight is None:
+        return (correct, total)
+
+    if total == 0:
+        log.exception("Cannot reweight a problem with zero total points. Problem: " + str(problem))
+        return (correct, total)
+
+    return (correct * weight / total, weight)
+
+
+def get_cached_sections(student, course):
+    """
+    Returns a (sections, version) tuple, where sections are the cached section
+    scores for `student` in `course`, or None if there aren't any or they are
+    out of date, and version is the version of the summary row, to pass to
+    `cache_sections` with the scores computed instead.
+
+    The row is created empty if there isn't one yet, so that grades published
+    while the student is being graded change its version.
+
+    sections has the same shape as the argument of `cache_sections`.
+    """
+    summary, _ = StudentGradeSummary.objects.get_or_create(user=student, course_id=course.id)
+
+    if summary.summary is None or summary.policy_hash != grading_policy_hash(course):
+        return None, summary.version
+
+    sections = json.loads(summary.summary)
+    for format_sections in sections.itervalues():
+        for section in format_sections:
+            if section['scores'] is not None:
+                section['scores'] = [
+                    (location, Score(*score)) for location, score in section['scores']
+                ]
+    return sections, summary.version
+
+
+def cache_sections(student, course, sections, version):
+    """
+    Store the section scores for `student` in `course`, unless the summary row
+    has changed since its `version` was read by `get_cached_sections`, before
+    the scores were computed.
+
+    `sections` is a dict keyed by section format, whose values are lists of
+    dicts with the keys:
+        name: the display name of the section
+        location: the location url of the section
+        scores: a list of (problem location url, Score) tuples, or None if
+            the student has not attempted anything in the section
+    """
+    StudentGradeSummary.objects.filter(user=student, course_id=course.id, version=version).update(
+        policy_hash=grading_policy_hash(course),
+        summary=json.dumps(sections),
+        version=version + 1,
+        updated=timezone.now(),
+    )
+
+
+@transaction.commit_on_success
+def update_cached_score(user, course_id, descriptor, grade, max_grade):
+    """
+    Patch the cached score of the problem `descriptor` after `user` was
+    graded `grade` out of `max_grade` on it.
+
+    If the problem isn't in a section that the cache already has scores for
+    (e.g. this is the first problem the user attempts in a section), the cached
+    summary is discarded so that the next read regrades the student. Either way,
+    the version of the summary changes.
+
+    The summary row is locked while it's patched, so that problems graded at
+    the same time for the same student don't lose each other's updates.
+    """
+    if not settings.MITX_FEATURES.get('ENABLE_GRADE_SUMMARY_CACHE', False):
+        return
+
+    try:
+        summary = StudentGradeSummary.objects.select_for_update().get(user=user, course_id=course_id)
+    except StudentGradeSummary.DoesNotExist:
+        return
+
+    summary.summary = _patch_score(summary.summary, descriptor, grade, max_grade)
+    summary.version += 1
+    summary.save()
+
+
+def _patch_score(summary, descriptor, grade, max_grade):
+    """
+    Returns the JSON `summary` of section scores with the score of the problem
+    `descriptor` set to `grade` out of `max_grade`, or None if it has no score
+    for the problem.
+    """
+    if summary is None or max_grade is None:
+        return None
+
+    location = descriptor.location.url()
+    sections = json.loads(summary)
+    for format_sections in sections.itervalues():
+        for section in format_sections:
+            for score in (section['scores'] or []):
+                if score[0] != location:
+                    continue
+
+                correct, total = weighted_score(
+                    grade if grade is not None else 0, max_grade, descriptor.weight, location
+                )
+                graded = descriptor.graded if total > 0 else False
+                score[1] = Score(correct, total, graded, descriptor.display_name_with_default)
+                return json.dumps(sections)
+
+    return None
+
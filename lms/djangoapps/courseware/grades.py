@@ -1,23 +1,32 @@
 # Compute grades using real division, with no integer truncation
 from __future__ import division
 
+import itertools
 import random
 import logging
+import numpy
 
 from collections import defaultdict
 from django.conf import settings
-from django.contrib.auth.models import User
+from django.contrib.auth.models import AnonymousUser, User
 
+from courseware import grade_cache
+from courseware.access import has_access
+from courseware.grading_context import get_grading_context
 from courseware.model_data import FieldDataCache, DjangoKeyValueStore
 from xblock.fields import Scope
 from .module_render import get_module, get_module_for_descriptor
 from xmodule import graders
 from xmodule.capa_module import CapaModule
 from xmodule.graders import Score
+from xmodule.modulestore import Location
 from .models import StudentModule
 
 log = logging.getLogger("mitx.courseware")
 
+# Number of students whose scores are loaded and aggregated together by grade_students
+BULK_GRADING_CHUNK_SIZE = 500
+
 
 def yield_module_descendents(module):
     stack = module.get_display_items()
@@ -29,6 +38,17 @@ def yield_module_descendents(module):
         yield next_module
 
 
+def yield_descriptor_descendents(descriptor):
+    """
+    Yields `descriptor` and all of its (static) descendants.
+    """
+    stack = [descriptor]
+    while len(stack) > 0:
+        next_descriptor = stack.pop()
+        stack.extend(next_descriptor.get_children())
+        yield next_descriptor
+
+
 def yield_dynamic_descriptor_descendents(descriptor, module_creator):
     """
     This returns all of the descendants of a descriptor. If the descriptor
@@ -58,23 +78,19 @@ def yield_problems(request, course, student):
     potentially answered.  (all that student has answered will definitely be in
     the list, but there may be others as well).
     """
-    grading_context = course.grading_context
+    grading_context = get_grading_context(course)
 
-    descriptor_locations = (descriptor.location.url() for descriptor in grading_context['all_descriptors'])
     existing_student_modules = set(StudentModule.objects.filter(
-        module_state_key__in=descriptor_locations
+        module_state_key__in=grading_context['all_locations']
     ).values_list('module_state_key', flat=True))
 
     sections_to_list = []
     for _, sections in grading_context['graded_sections'].iteritems():
         for section in sections:
-
-            section_descriptor = section['section_descriptor']
-
             # If the student hasn't seen a single problem in the section, skip it.
-            for moduledescriptor in section['xmoduledescriptors']:
-                if moduledescriptor.location.url() in existing_student_modules:
-                    sections_to_list.append(section_descriptor)
+            for location, _weight in section['scorable']:
+                if location in existing_student_modules:
+                    sections_to_list.append(section['section_descriptor'])
                     break
 
     field_data_cache = FieldDataCache(sections_to_list, course.id, student)
@@ -137,45 +153,66 @@ def grade(student, request, course, field_data_cache=None, keep_raw_scores=False
         make up the final grade. (For display)
     - keep_raw_scores : if True, then value for key 'raw_scores' contains scores for every graded module
 
+    If the grade summary cache is enabled, the section scores are read from
+    (and stored in) the StudentGradeSummary table instead of being recomputed.
+    See courseware.grade_cache.
+
     More information on the format is in the docstring for CourseGrader.
     """
+    use_cache = grade_cache.cache_enabled(course)
 
-    grading_context = course.grading_context
-    raw_scores = []
+    section_scores = None
+    if use_cache:
+        section_scores, version = grade_cache.get_cached_sections(student, course)
+
+    if section_scores is None:
+        section_scores = _grade_sections(student, request, course, field_data_cache)
+        if use_cache:
+            grade_cache.cache_sections(student, course, section_scores, version)
+
+    return _summarize_grade(course, section_scores, keep_raw_scores)
+
+
+def _grade_sections(student, request, course, field_data_cache=None):
+    """
+    Compute the scores of `student` for every graded section of `course`.
+
+    Returns a dict keyed by section format, whose values are lists (in course
+    order) of dicts with the section 'name', 'location' and 'scores'. 'scores'
+    is a list of (problem location url, Score) tuples, or None if the student
+    hasn't seen any problem in the section.
+    """
+    grading_context = get_grading_context(course)
 
     if field_data_cache is None:
         field_data_cache = FieldDataCache(grading_context['all_descriptors'], course.id, student)
 
-    totaled_scores = {}
-    # This next complicated loop is just to collect the totaled_scores, which is
-    # passed to the grader
+    section_scores = {}
+    # This next complicated loop is just to collect the scores of every section
     for section_format, sections in grading_context['graded_sections'].iteritems():
-        format_scores = []
+        format_sections = []
         for section in sections:
             section_descriptor = section['section_descriptor']
             section_name = section_descriptor.display_name_with_default
 
-            should_grade_section = False
+            # some problems have state that is updated independently of interaction
+            # with the LMS, so they need to always be scored. (E.g. foldit.)
+            should_grade_section = section['always_recalculate_grades']
             # If we haven't seen a single problem in the section, we don't have to grade it at all! We can assume 0%
-            for moduledescriptor in section['xmoduledescriptors']:
-                # some problems have state that is updated independently of interaction
-                # with the LMS, so they need to always be scored. (E.g. foldit.)
-                if moduledescriptor.always_recalculate_grades:
-                    should_grade_section = True
-                    break
-
-                # Create a fake key to pull out a StudentModule object from the FieldDataCache
-
-                key = DjangoKeyValueStore.Key(
-                    Scope.user_state,
-                    student.id,
-                    moduledescriptor.location,
-                    None
-                )
-                if field_data_cache.find(key):
-                    should_grade_section = True
-                    break
-
+            if not should_grade_section:
+                for location, _weight in section['scorable']:
+                    # Create a fake key to pull out a StudentModule object from the FieldDataCache
+                    key = DjangoKeyValueStore.Key(
+                        Scope.user_state,
+                        student.id,
+                        Location(location),
+                        None
+                    )
+                    if field_data_cache.find(key):
+                        should_grade_section = True
+                        break
+
+            scores = None
             if should_grade_section:
                 scores = []
 
@@ -202,8 +239,35 @@ def grade(student, request, course, field_data_cache=None, keep_raw_scores=False
                         #We simply cannot grade a problem that is 12/0, because we might need it as a percentage
                         graded = False
 
-                    scores.append(Score(correct, total, graded, module_descriptor.display_name_with_default))
+                    scores.append((
+                        module_descriptor.location.url(),
+                        Score(correct, total, graded, module_descriptor.display_name_with_default)
+                    ))
+
+            format_sections.append({
+                'name': section_name,
+                'location': section_descriptor.location.url(),
+                'scores': scores,
+            })
+
+        section_scores[section_format] = format_sections
+
+    return section_scores
+
 
+def _summarize_grade(course, section_scores, keep_raw_scores=False):
+    """
+    Run the course grader over the section scores computed by _grade_sections.
+    """
+    raw_scores = []
+    totaled_scores = {}
+    for section_format in get_grading_context(course)['graded_sections']:
+        format_scores = []
+        for section in section_scores[section_format]:
+            section_name = section['name']
+
+            if section['scores'] is not None:
+                scores = [score for _, score in section['scores']]
                 _, graded_total = graders.aggregate_scores(scores, section_name)
                 if keep_raw_scores:
                     raw_scores += scores
@@ -215,10 +279,21 @@ def grade(student, request, course, field_data_cache=None, keep_raw_scores=False
                 format_scores.append(graded_total)
             else:
                 log.exception("Unable to grade a section with a total possible score of zero. " +
-                              str(section_descriptor.location))
+                              str(section['location']))
 
         totaled_scores[section_format] = format_scores
 
+    grade_summary = _grade_totaled_scores(course, totaled_scores)
+    if keep_raw_scores:
+        grade_summary['raw_scores'] = raw_scores        # way to get all RAW scores out to instructor
+                                                        # so grader can be double-checked
+    return grade_summary
+
+
+def _grade_totaled_scores(course, totaled_scores):
+    """
+    Run the course grader over the per-section totals, and add the letter grade.
+    """
     grade_summary = course.grader.grade(totaled_scores, generate_random_scores=settings.GENERATE_PROFILE_SCORES)
 
     # We round the grade here, to make sure that the grade is an whole percentage and
@@ -228,12 +303,251 @@ def grade(student, request, course, field_data_cache=None, keep_raw_scores=False
     letter_grade = grade_for_percentage(course.grade_cutoffs, grade_summary['percent'])
     grade_summary['grade'] = letter_grade
     grade_summary['totaled_scores'] = totaled_scores  	# make this available, eg for instructor download & debugging
-    if keep_raw_scores:
-        grade_summary['raw_scores'] = raw_scores        # way to get all RAW scores out to instructor
-                                                        # so grader can be double-checked
     return grade_summary
 
 
+def grade_students(students, request, course, keep_raw_scores=False, chunk_size=BULK_GRADING_CHUNK_SIZE):
+    """
+    Grade many students at once. Yields (student, grade_summary) pairs in the
+    order of `students`, where grade_summary is what grade() would return for
+    that student.
+
+    The course structure is walked once, the maximum score of every problem is
+    computed once, and the StudentModule scores of `chunk_size` students are
+    fetched with a single query and aggregated with numpy arrays, instead of
+    building a FieldDataCache and XModules for every student.
+
+    Courses with problems whose score can't be read from StudentModule (dynamic
+    children, or `always_recalculate_grades`) are graded one student at a time
+    with grade().
+    """
+    if not _can_bulk_grade(course):
+        for student in students:
+            yield student, grade(student, request, course, keep_raw_scores=keep_raw_scores)
+        return
+
+    problems = None
+    students = iter(students)
+    while True:
+        chunk = list(itertools.islice(students, chunk_size))
+        if not chunk:
+            return
+
+        if problems is None:
+            problems = _BulkGradingProblems(request, course)
+
+        for result in _grade_students_chunk(chunk, course, problems, keep_raw_scores):
+            yield result
+
+
+def _can_bulk_grade(course):
+    """
+    Returns True if grades in `course` can be computed from StudentModule rows alone.
+    """
+    if settings.GENERATE_PROFILE_SCORES:
+        return False
+
+    grading_context = get_grading_context(course)
+    return not (grading_context['always_recalculate_grades'] or grading_context['has_dynamic_children'])
+
+
+class _BulkGradingProblems(object):
+    """
+    The scorable problems of a course, laid out as the columns of the score
+    matrices used by grade_students.
+
+    Attributes:
+        locations: the location url of each problem
+        names: the display name of each problem
+        graded: boolean array, whether each problem is graded
+        weights: float array of problem weights, nan if the problem has none
+        default_max: float array of the max score of each problem, used for
+            students that don't have one stored; nan if it couldn't be computed
+            (see default_max_for)
+        restricted: the columns of the problems which not everyone can load
+        sections: dict keyed by section format, whose values are lists of
+            (section name, section location url, array of column indices)
+    """
+    def __init__(self, request, course):
+        self.request = request
+        self.course_id = course.id
+        descriptors = []
+        self.sections = {}
+        for section_format, sections in get_grading_context(course)['graded_sections'].iteritems():
+            format_sections = []
+            for section in sections:
+                section_descriptor = section['section_descriptor']
+                columns = []
+                # Walk the section in the same order as grade() does, so that raw scores line up
+                for descriptor in yield_dynamic_descriptor_descendents(section_descriptor, None):
+                    if not descriptor.has_score:
+                        continue
+                    columns.append(len(descriptors))
+                    descriptors.append(descriptor)
+                format_sections.append((
+                    section_descriptor.display_name_with_default,
+                    section_descriptor.location.url(),
+                    numpy.array(columns, dtype=int),
+                ))
+            self.sections[section_format] = format_sections
+
+        self.locations = [descriptor.location.url() for descriptor in descriptors]
+        self.names = [descriptor.display_name_with_default for descriptor in descriptors]
+        self.index = dict((location, column) for column, location in enumerate(self.locations))
+        self.graded = numpy.array([bool(descriptor.graded) for descriptor in descriptors], dtype=bool)
+        self.weights = numpy.array(
+            [descriptor.weight if descriptor.weight is not None else numpy.nan for descriptor in descriptors],
+            dtype=float
+        )
+        self.descriptors = descriptors
+
+        # The problems which not everyone can load (e.g. unreleased ones), whose access has
+        # to be checked for every student
+        anonymous = AnonymousUser()
+        self.restricted = [
+            column for column, descriptor in enumerate(descriptors)
+            if not has_access(anonymous, descriptor, 'load', course.id)
+        ]
+
+        self.default_max = numpy.empty(len(descriptors), dtype=float)
+        self.default_max.fill(numpy.nan)
+        self.computed = numpy.zeros(len(descriptors), dtype=bool)
+        restricted = set(self.restricted)
+        self._compute_default_max(request.user, [
+            column for column in range(len(descriptors)) if column not in restricted
+        ])
+
+    def default_max_for(self, student):
+        """
+        Returns the float array of the max score of each problem for `student`, to use
+        where they don't have one stored. Like grade(), this is nan for the problems
+        that the student can't load.
+
+        The max score of a problem only depends on its definition, so it's only computed
+        once, as the first user who can load the problem.
+        """
+        denied = [
+            column for column in self.restricted
+            if not has_access(student, self.descriptors[column], 'load', self.course_id)
+        ]
+        denied_set = set(denied)
+        self._compute_default_max(student, [
+            column for column in self.restricted
+            if column not in denied_set and not self.computed[column]
+        ])
+
+        default_max = self.default_max.copy()
+        default_max[denied] = numpy.nan
+        return default_max
+
+    def _compute_default_max(self, user, columns):
+        """
+        Instantiate the problems in `columns` once, as `user`, to get their max score.
+        """
+        if not columns:
+            return
+        descriptors = [self.descriptors[column] for column in columns]
+        field_data_cache = FieldDataCache(descriptors, self.course_id, user)
+        for column, descriptor in zip(columns, descriptors):
+            problem = get_module_for_descriptor(user, self.request, descriptor, field_data_cache, self.course_id)
+            total = problem.max_score() if problem is not None else None
+            self.default_max[column] = total if total is not None else numpy.nan
+            self.computed[column] = True
+
+
+def _grade_students_chunk(students, course, problems, keep_raw_scores):
+    """
+    Grade a list of students with one StudentModule query. See grade_students.
+    """
+    num_students = len(students)
+    num_problems = len(problems.locations)
+    rows = dict((student.id, row) for row, student in enumerate(students))
+
+    # seen[i, j] is True if student i has a StudentModule for problem j.
+    # stored[i, j] is True if that StudentModule has a max_grade.
+    seen = numpy.zeros((num_students, num_problems), dtype=bool)
+    stored = numpy.zeros((num_students, num_problems), dtype=bool)
+    earned = numpy.zeros((num_students, num_problems), dtype=float)
+    possible = numpy.zeros((num_students, num_problems), dtype=float)
+
+    student_modules = StudentModule.objects.filter(
+        course_id=course.id,
+        student__in=rows.keys(),
+    ).values_list('student_id', 'module_state_key', 'grade', 'max_grade')
+
+    for student_id, module_state_key, module_grade, max_grade in student_modules.iterator():
+        column = problems.index.get(module_state_key)
+        if column is None:
+            continue
+        row = rows[student_id]
+        seen[row, column] = True
+        if max_grade is not None:
+            stored[row, column] = True
+            earned[row, column] = module_grade if module_grade is not None else 0
+            possible[row, column] = max_grade
+
+    # Problems without a stored max score use the max score of the problem
+    # definition, and are skipped altogether if that isn't available either
+    default_max = numpy.array([problems.default_max_for(student) for student in students], dtype=float)
+    possible = numpy.where(stored, possible, default_max)
+    scored = stored | ~numpy.isnan(possible)
+    possible[~scored] = 0
+
+    # Now we re-weight the problems, if specified
+    reweight = ~numpy.isnan(problems.weights) & (possible != 0)
+    with numpy.errstate(divide='ignore', invalid='ignore'):
+        earned = numpy.where(reweight, earned * problems.weights / possible, earned)
+    possible = numpy.where(reweight, problems.weights, possible)
+
+    #We simply cannot grade a problem that is 12/0, because we might need it as a percentage
+    graded = scored & problems.graded & (possible > 0)
+
+    graded_earned = numpy.where(graded, earned, 0)
+    graded_possible = numpy.where(graded, possible, 0)
+
+    section_totals = {}
+    for section_format, sections in problems.sections.iteritems():
+        section_totals[section_format] = [
+            (
+                seen[:, columns].any(axis=1),
+                graded_earned[:, columns].sum(axis=1),
+                graded_possible[:, columns].sum(axis=1),
+            )
+            for _, _, columns in sections
+        ]
+
+    for row, student in enumerate(students):
+        raw_scores = []
+        totaled_scores = {}
+        for section_format in get_grading_context(course)['graded_sections']:
+            format_scores = []
+            sections = problems.sections[section_format]
+            for (name, location, columns), totals in zip(sections, section_totals[section_format]):
+                attempted, section_earned, section_possible = totals
+                if not attempted[row]:
+                    graded_total = Score(0.0, 1.0, True, name)
+                else:
+                    graded_total = Score(float(section_earned[row]), float(section_possible[row]), True, name)
+                    if keep_raw_scores:
+                        raw_scores += [
+                            Score(float(earned[row, column]), float(possible[row, column]),
+                                  bool(graded[row, column]), problems.names[column])
+                            for column in columns if scored[row, column]
+                        ]
+
+                if graded_total.possible > 0:
+                    format_scores.append(graded_total)
+                else:
+                    log.exception("Unable to grade a section with a total possible score of zero. " + location)
+
+            totaled_scores[section_format] = format_scores
+
+        grade_summary = _grade_totaled_scores(course, totaled_scores)
+        if keep_raw_scores:
+            grade_summary['raw_scores'] = raw_scores
+        yield student, grade_summary
+
+
 def grade_for_percentage(grade_cutoffs, percentage):
     """
     Returns a letter grade as defined in grading_policy (e.g. 'A' 'B' 'C' for 6.002x) or None.
@@ -256,10 +570,7 @@ def grade_for_percentage(grade_cutoffs, percentage):
     return letter_grade
 
 
-# TODO: This method is not very good. It was written in the old course style and
-# then converted over and performance is not good. Once the progress page is redesigned
-# to not have the progress summary this method should be deleted (so it won't be copied).
-def progress_summary(student, request, course, field_data_cache):
+def progress_summary(student, request, course, field_data_cache=None):
     """
     This pulls a summary of all problems in the course.
 
@@ -274,71 +585,102 @@ def progress_summary(student, request, course, field_data_cache):
         student: A User object for the student to grade
         course: A Descriptor containing the course to grade
         field_data_cache: A FieldDataCache initialized with all
-             instance_modules for the student
+             instance_modules for the student, or None to load those of the
+             sections that need it
+
+    The chapters and sections are read from the course descriptors. The scores of
+    the graded sections that the student has attempted are read from the grade
+    summary cache (see courseware.grade_cache) when it has them, so only the
+    problems of the other sections are loaded to be scored.
 
     If the student does not have access to load the course module, this function
     will return None.
 
     """
-
-    # TODO: We need the request to pass into here. If we could forego that, our arguments
-    # would be simpler
-    course_module = get_module(student, request, course.location, field_data_cache, course.id, depth=None)
-    if not course_module:
+    if not has_access(student, course, 'load', course.id):
         # This student must not have access to the course.
         return None
 
-    chapters = []
-    # Don't include chapters that aren't displayable (e.g. due to error)
-    for chapter_module in course_module.get_display_items():
-        # Skip if the chapter is hidden
-        if chapter_module.hide_from_toc:
-            continue
-
-        sections = []
-        for section_module in chapter_module.get_display_items():
-            # Skip if the section is hidden
-            if section_module.hide_from_toc:
-                continue
-
-            # Same for sections
-            graded = section_module.graded
-            scores = []
+    cached_scores = {}
+    if grade_cache.cache_enabled(course):
+        section_scores, _ = grade_cache.get_cached_sections(student, course)
+        for format_sections in (section_scores or {}).itervalues():
+            for section in format_sections:
+                if section['scores'] is not None:
+                    cached_scores[section['location']] = [score for _, score in section['scores']]
 
-            module_creator = section_module.xmodule_runtime.get_module
+    chapter_sections = [
+        (chapter, _displayed_children(student, chapter, course.id))
+        for chapter in _displayed_children(student, course, course.id)
+    ]
 
-            for module_descriptor in yield_dynamic_descriptor_descendents(section_module, module_creator):
+    if field_data_cache is None:
+        skipped = set()
+        for _, sections in chapter_sections:
+            for section in sections:
+                if section.location.url() in cached_scores:
+                    skipped.update(descriptor.location.url() for descriptor in yield_descriptor_descendents(section))
+        field_data_cache = FieldDataCache.cache_for_descriptor_descendents(
+            course.id, student, course, depth=None,
+            descriptor_filter=lambda descriptor: descriptor.location.url() not in skipped
+        )
+
+    def create_module(descriptor):
+        '''creates an XModule instance given a descriptor'''
+        return get_module_for_descriptor(student, request, descriptor, field_data_cache, course.id)
 
-                course_id = course.id
-                (correct, total) = get_score(course_id, student, module_descriptor, module_creator, field_data_cache)
-                if correct is None and total is None:
-                    continue
+    chapters = []
+    for chapter, chapter_sections in chapter_sections:
+        sections = []
+        for section in chapter_sections:
+            graded = section.graded
+            cached = cached_scores.get(section.location.url())
+            if cached is not None:
+                # cached in the order the section is graded in, the reverse of the order shown
+                scores = [Score(score.earned, score.possible, graded, score.section) for score in reversed(cached)]
+            else:
+                scores = []
+                for module_descriptor in yield_dynamic_descriptor_descendents(section, create_module):
+                    (correct, total) = get_score(course.id, student, module_descriptor, create_module, field_data_cache)
+                    if correct is None and total is None:
+                        continue
 
-                scores.append(Score(correct, total, graded, module_descriptor.display_name_with_default))
+                    scores.append(Score(correct, total, graded, module_descriptor.display_name_with_default))
+                scores.reverse()
 
-            scores.reverse()
             section_total, _ = graders.aggregate_scores(
-                scores, section_module.display_name_with_default)
+                scores, section.display_name_with_default)
 
-            module_format = section_module.format if section_module.format is not None else ''
+            module_format = section.format if section.format is not None else ''
             sections.append({
-                'display_name': section_module.display_name_with_default,
-                'url_name': section_module.url_name,
+                'display_name': section.display_name_with_default,
+                'url_name': section.url_name,
                 'scores': scores,
                 'section_total': section_total,
                 'format': module_format,
-                'due': section_module.due,
+                'due': section.due,
                 'graded': graded,
             })
 
         chapters.append({'course': course.display_name_with_default,
-                         'display_name': chapter_module.display_name_with_default,
-                         'url_name': chapter_module.url_name,
+                         'display_name': chapter.display_name_with_default,
+                         'url_name': chapter.url_name,
                          'sections': sections})
 
     return chapters
 
 
+def _displayed_children(student, descriptor, course_id):
+    """
+    Returns the display items of `descriptor` which are shown to `student` in the table
+    of contents: those they can load and which aren't hidden from it.
+    """
+    return [
+        child for child in descriptor.get_display_items()
+        if not child.hide_from_toc and has_access(student, child, 'load', course_id)
+    ]
+
+
 def get_score(course_id, user, problem_descriptor, module_creator, field_data_cache):
     """
     Return the score for a user on a problem, as a tuple (correct, total).
@@ -402,12 +744,4 @@ def get_score(course_id, user, problem_descriptor, module_creator, field_data_ca
             return (None, None)
 
     # Now we re-weight the problem, if specified
-    weight = problem_descriptor.weight
-    if weight is not None:
-        if total == 0:
-            log.exception("Cannot reweight a problem with zero total points. Problem: " + str(student_module))
-            return (correct, total)
-        correct = correct * weight / total
-        total = weight
-
-    return (correct, total)
+    return grade_cache.weighted_score(correct, total, problem_descriptor.weight, student_module)
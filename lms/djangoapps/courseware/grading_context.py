@@ -0,0 +1,76 @@
+"""
+Caches the grading context of courses between requests.
+
+CourseDescriptor.grading_context walks every graded section of the course, which is repeated
+for every request (and every row of a grade report) for courses from Mongo, whose descriptors
+aren't kept between requests. Its plain data form, CourseDescriptor.grading_context_structure,
+is cached instead, keyed by the version of the course, and the grading context is rebuilt from
+it, loading descriptors only when they're used.
+"""
+from django.core.cache import cache
+
+from xmodule.modulestore.django import modulestore
+
+# The grading_context_structure of each course in this process, and the version it was computed at
+_STRUCTURES = {}
+
+
+def grading_context_cache_key(course_id, version):
+    """The key of the grading context structure of course_id at version in the django cache"""
+    return u"courseware.grading_context.{0}.{1}".format(course_id, version)
+
+
+def get_grading_context(course):
+    """
+    Returns the grading context of `course` (see CourseDescriptor.grading_context).
+
+    For courses whose modulestore tracks their version (i.e. courses that can be edited in
+    Studio), its structure is cached in this process and in the django cache, keyed by the
+    version of the course, so that editing the course invalidates it.
+    """
+    if 'grading_context' in course.__dict__:
+        # already built for this descriptor
+        return course.grading_context
+
+    store = modulestore()
+    version = store.get_course_version(course.id)
+    if version is None:
+        # the descriptors of courses whose versions aren't tracked are kept between requests
+        return course.grading_context
+
+    cached = _STRUCTURES.get(course.id)
+    if cached is not None and cached[0] == version:
+        structure = cached[1]
+    else:
+        structure = cache.get(grading_context_cache_key(course.id, version))
+        if structure is None:
+            structure = course.grading_context_structure
+            cache.set(grading_context_cache_key(course.id, version), structure)
+        _connect_to_update_signals(store)
+        _STRUCTURES[course.id] = (version, structure)
+
+    # the lazy grading_context is then built from the cached structure
+    course.grading_context_structure = structure
+    return course.grading_context
+
+
+def _connect_to_update_signals(store):
+    """
+    Forget the structures of courses as they are updated through `store`, or through any of the
+    modulestores it combines, so that this process doesn't keep them until they're next used.
+    """
+    for substore in getattr(store, 'modulestores', {}).values() + [store]:
+        signal = getattr(substore, 'modulestore_update_signal', None)
+        if signal is not None:
+            signal.connect(_forget_updated_course, dispatch_uid='courseware.grading_context')
+
+
+def _forget_updated_course(sender, course_id, **kwargs):  # pylint: disable=unused-argument
+    """
+    Drops the cached structures of the course updated in the modulestore `sender`.
+    `course_id` doesn't include the course run, so every run of the course is dropped.
+    """
+    prefix = course_id + '/'
+    for cached_course_id in _STRUCTURES.keys():
+        if cached_course_id.startswith(prefix):
+            _STRUCTURES.pop(cached_course_id, None)
@@ -3,17 +3,20 @@ Classes to provide the LMS runtime data storage to XBlocks
 """
 
 import json
-from collections import defaultdict
+from collections import defaultdict, OrderedDict
+from contextlib import contextmanager
 from itertools import chain
 from .models import (
     StudentModule,
+    StudentModuleHistory,
     XModuleUserStateSummaryField,
     XModuleStudentPrefsField,
     XModuleStudentInfoField
 )
 import logging
 
-from django.db import DatabaseError
+from django.db import DatabaseError, transaction
+from django.utils import timezone
 
 from xblock.runtime import KeyValueStore
 from xblock.exceptions import KeyValueMultiSaveError, InvalidScopeError
@@ -60,6 +63,11 @@ class FieldDataCache(object):
         self.select_for_update = select_for_update
         self.course_id = course_id
         self.user = user
+        # StudentModule states decoded from json, by cache key, so that each is decoded once
+        self._states = {}
+        # While writes are deferred, the cache keys of the field objects to save on flush
+        self._defer_writes = False
+        self._dirty = OrderedDict()
 
         if user.is_authenticated():
             for scope, fields in self._fields_to_cache().items():
@@ -226,7 +234,16 @@ class FieldDataCache(object):
         if field_object is not None:
             return field_object
 
-        if key.scope == Scope.user_state:
+        if key.scope == Scope.user_state and self._defer_writes:
+            # inserted by flush, along with any other new StudentModules
+            field_object = StudentModule(
+                course_id=self.course_id,
+                student=self.user,
+                module_state_key=key.block_scope_id.url(),
+                state=json.dumps({}),
+                module_type=key.block_scope_id.category,
+            )
+        elif key.scope == Scope.user_state:
             field_object, _ = StudentModule.objects.get_or_create(
                 course_id=self.course_id,
                 student=self.user,
@@ -257,6 +274,147 @@ class FieldDataCache(object):
         self.cache[cache_key] = field_object
         return field_object
 
+    def get_state(self, key):
+        """
+        Returns the decoded state of the StudentModule for `key` (a `DjangoKeyValueStore.Key`
+        in Scope.user_state), which must exist. Changes to the returned dict are written
+        by `save`.
+        """
+        cache_key = self._cache_key_from_kvs_key(key)
+        if cache_key not in self._states:
+            self._states[cache_key] = json.loads(self.cache[cache_key].state)
+        return self._states[cache_key]
+
+    def save(self, key):
+        """
+        Save the model data object for `key` (a `DjangoKeyValueStore.Key`), or, while
+        writes are deferred, mark it to be saved by `flush`
+        """
+        cache_key = self._cache_key_from_kvs_key(key)
+        if self._defer_writes:
+            self._dirty[cache_key] = True
+            return
+
+        self._encode_state(cache_key)
+        self.cache[cache_key].save()
+
+    def _encode_state(self, cache_key):
+        """
+        Copy the decoded state for `cache_key`, if any, back onto its StudentModule
+        """
+        if cache_key in self._states:
+            self.cache[cache_key].state = json.dumps(self._states[cache_key])
+
+    @contextmanager
+    def deferred_writes(self):
+        """
+        A context manager within which `save` only records which model data objects
+        have changed. All of them are written by `flush` when the context exits, however
+        many times each was saved.
+        """
+        self._defer_writes = True
+        try:
+            yield
+        finally:
+            self._defer_writes = False
+            self.flush()
+
+    @transaction.commit_on_success
+    def flush(self):
+        """
+        Write the model data objects saved while writes were deferred: new StudentModules
+        are inserted in bulk, existing rows are updated without being re-read, and the
+        StudentModuleHistory entries of all of the StudentModules are inserted in bulk.
+        """
+        dirty_keys, self._dirty = self._dirty.keys(), OrderedDict()
+        for cache_key in dirty_keys:
+            self._encode_state(cache_key)
+        field_objects = [self.cache[cache_key] for cache_key in dirty_keys]
+
+        new_modules = [field_object for field_object in field_objects if field_object.pk is None]
+        created = self._create_student_modules(new_modules)
+
+        now = timezone.now()
+        for field_object in field_objects:
+            if isinstance(field_object, StudentModule) and field_object.pk in created:
+                continue
+            if isinstance(field_object, StudentModule):
+                changes = {
+                    'state': field_object.state,
+                    'grade': field_object.grade,
+                    'max_grade': field_object.max_grade,
+                }
+            else:
+                changes = {'value': field_object.value}
+            field_object.__class__.objects.filter(pk=field_object.pk).update(modified=now, **changes)
+            field_object.modified = now
+
+        StudentModuleHistory.objects.bulk_create([
+            StudentModuleHistory(
+                student_module=module,
+                version=None,
+                created=module.modified,
+                state=module.state,
+                grade=module.grade,
+                max_grade=module.max_grade,
+            )
+            for module in field_objects
+            if isinstance(module, StudentModule) and module.module_type in StudentModuleHistory.HISTORY_SAVING_TYPES
+        ])
+
+    def _create_student_modules(self, modules):
+        """
+        Insert the unsaved StudentModules `modules` in bulk, and set their ids.
+
+        Modules whose row was created by someone else since they were added to the cache
+        take that row's id, and merge its state into theirs, to be updated by `flush`.
+
+        Returns the set of ids of the modules that were inserted.
+        """
+        if not modules:
+            return set()
+
+        existing = dict(
+            (module.module_state_key, module)
+            for module in self._chunked_query(
+                StudentModule,
+                'module_state_key__in',
+                [module.module_state_key for module in modules],
+                course_id=self.course_id,
+                student=self.user.pk,
+            )
+        )
+        new_modules = []
+        for module in modules:
+            if module.module_state_key in existing:
+                row = existing[module.module_state_key]
+                state = json.loads(row.state or '{}')
+                state.update(json.loads(module.state))
+                module.id = row.id
+                module.created = row.created
+                module.state = json.dumps(state)
+            else:
+                new_modules.append(module)
+
+        if not new_modules:
+            return set()
+
+        StudentModule.objects.bulk_create(new_modules)
+        # bulk_create doesn't set the ids of the new rows
+        ids = dict(
+            (module.module_state_key, module.id)
+            for module in self._chunked_query(
+                StudentModule,
+                'module_state_key__in',
+                [module.module_state_key for module in new_modules],
+                course_id=self.course_id,
+                student=self.user.pk,
+            )
+        )
+        for module in new_modules:
+            module.id = ids[module.module_state_key]
+        return set(ids.values())
+
 
 class DjangoKeyValueStore(KeyValueStore):
     """
@@ -296,7 +454,7 @@ class DjangoKeyValueStore(KeyValueStore):
             raise KeyError(key.field_name)
 
         if key.scope == Scope.user_state:
-            return json.loads(field_object.state)[key.field_name]
+            return self._field_data_cache.get_state(key)[key.field_name]
         else:
             return json.loads(field_object.value)
 
@@ -315,8 +473,9 @@ class DjangoKeyValueStore(KeyValueStore):
 
         """
         saved_fields = []
-        # field_objects maps a field_object to a list of associated fields
-        field_objects = dict()
+        # field_objects maps the id of a field_object to a list of associated fields.
+        # Unsaved model objects all compare equal, so they can't be used as keys
+        field_objects = OrderedDict()
         for field in kv_dict:
             # Check field for validity
             if field.scope not in self._allowed_scopes:
@@ -324,30 +483,27 @@ class DjangoKeyValueStore(KeyValueStore):
 
             # If the field is valid and isn't already in the dictionary, add it.
             field_object = self._field_data_cache.find_or_create(field)
-            if field_object not in field_objects.keys():
-                field_objects[field_object] = []
             # Update the list of associated fields
-            field_objects[field_object].append(field)
+            field_objects.setdefault(id(field_object), []).append(field)
 
-            # Special case when scope is for the user state, because this scope saves fields in a single row
+            # Special case when scope is for the user state, because this scope saves fields in a single row,
+            # which is decoded and encoded only once
             if field.scope == Scope.user_state:
-                state = json.loads(field_object.state)
-                state[field.field_name] = kv_dict[field]
-                field_object.state = json.dumps(state)
+                self._field_data_cache.get_state(field)[field.field_name] = kv_dict[field]
             else:
             # The remaining scopes save fields on different rows, so
             # we don't have to worry about conflicts
                 field_object.value = json.dumps(kv_dict[field])
 
-        for field_object in field_objects:
+        for fields in field_objects.values():
             try:
                 # Save the field object that we made above
-                field_object.save()
+                self._field_data_cache.save(fields[0])
                 # If save is successful on this scope, add the saved fields to
                 # the list of successful saves
-                saved_fields.extend([field.field_name for field in field_objects[field_object]])
+                saved_fields.extend([field.field_name for field in fields])
             except DatabaseError:
-                log.error('Error saving fields %r', field_objects[field_object])
+                log.error('Error saving fields %r', fields)
                 raise KeyValueMultiSaveError(saved_fields)
 
     def delete(self, key):
@@ -359,10 +515,8 @@ class DjangoKeyValueStore(KeyValueStore):
             raise KeyError(key.field_name)
 
         if key.scope == Scope.user_state:
-            state = json.loads(field_object.state)
-            del state[key.field_name]
-            field_object.state = json.dumps(state)
-            field_object.save()
+            del self._field_data_cache.get_state(key)[key.field_name]
+            self._field_data_cache.save(key)
         else:
             field_object.delete()
 
@@ -375,6 +529,6 @@ class DjangoKeyValueStore(KeyValueStore):
             return False
 
         if key.scope == Scope.user_state:
-            return key.field_name in json.loads(field_object.state)
+            return key.field_name in self._field_data_cache.get_state(key)
         else:
             return True
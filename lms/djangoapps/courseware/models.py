@@ -14,8 +14,10 @@ ASSUMPTIONS: modules have unique IDs, even across different module_types
 """
 from django.contrib.auth.models import User
 from django.db import models
-from django.db.models.signals import post_save
+from django.db.models import F
+from django.db.models.signals import post_delete, post_save
 from django.dispatch import receiver
+from django.utils import timezone
 
 
 class StudentModule(models.Model):
@@ -230,5 +232,45 @@ class OfflineComputedGradeLog(models.Model):
     seconds = models.IntegerField(default=0)  	# seconds elapsed for computation
     nstudents = models.IntegerField(default=0)
 
+    # Set on the checkpoints of a computation in progress, to the first and last
+    # user ids of the shard that was graded. Null for completed computations.
+    first_user_id = models.IntegerField(null=True, blank=True)
+    last_user_id = models.IntegerField(null=True, blank=True)
+
     def __unicode__(self):
         return "[OCGLog] %s: %s" % (self.course_id, self.created)
+
+
+class StudentGradeSummary(models.Model):
+    """
+    Cached section scores of a given user in a given course, as computed by grades.grade.
+
+    See courseware.grade_cache for how these are kept up to date.
+    """
+    user = models.ForeignKey(User, db_index=True)
+    course_id = models.CharField(max_length=255, db_index=True)
+
+    # Hash of the grading policy and course structure the summary was computed against
+    policy_hash = models.CharField(max_length=40, blank=True)
+    summary = models.TextField(null=True, blank=True)  # section scores, stored as JSON
+    # Incremented by every change, so that scores computed from an older version aren't stored
+    version = models.IntegerField(default=0)
+
+    created = models.DateTimeField(auto_now_add=True, db_index=True)
+    updated = models.DateTimeField(auto_now=True, db_index=True)
+
+    class Meta:
+        unique_together = (('user', 'course_id'), )
+
+    def __unicode__(self):
+        return "[StudentGradeSummary] %s: %s (%s)" % (self.user, self.course_id, self.updated)
+
+
+@receiver(post_delete, sender=StudentModule)
+def invalidate_grade_summary(sender, instance, **kwargs):  # pylint: disable=unused-argument
+    """
+    Discard the cached grade summary of a student when one of their StudentModules is deleted.
+    """
+    StudentGradeSummary.objects.filter(user_id=instance.student_id, course_id=instance.course_id).update(
+        summary=None, version=F('version') + 1, updated=timezone.now()
+    )
@@ -1,10 +1,13 @@
-from mock import Mock
+from mock import Mock, patch
 
 from django.test import TestCase
 
 from xmodule.modulestore import Location
 import courseware.access as access
-from .factories import CourseEnrollmentAllowedFactory
+from request_cache.middleware import RequestCache
+from student.models import CourseEnrollment
+from student.tests.factories import CourseEnrollmentFactory
+from .factories import CourseEnrollmentAllowedFactory, GroupFactory, UserFactory
 import datetime
 from django.utils.timezone import UTC
 
@@ -106,3 +109,60 @@ class AccessTestCase(TestCase):
 
         # TODO:
         # Non-staff cannot enroll outside the open enrollment period if not specifically allowed
+
+
+class AccessCacheTestCase(TestCase):
+    """
+    Tests that access decisions are cached for the rest of a request
+    """
+    def setUp(self):
+        self.location = Location('i4x://edX/toy/course/2012_Fall')
+        self.middleware = RequestCache()
+        self.middleware.process_request(Mock())
+        self.addCleanup(self.middleware.process_response, None, None)
+        patcher = patch('courseware.access.get_current_request', return_value=Mock())
+        self.get_current_request = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _end_request(self):
+        """Finish the current request, as the middleware would"""
+        self.get_current_request.return_value = None
+        self.middleware.process_response(None, None)
+
+    def test_decisions_cached(self):
+        u = Mock(id=1, is_staff=False)
+        g = Mock()
+        g.name = 'staff_edX/toy/2012_Fall'
+        u.groups.all.return_value = [g]
+        self.assertTrue(access.has_access(u, self.location, 'staff'))
+        self.assertTrue(access.has_access(u, self.location, 'staff'))
+        self.assertFalse(access.has_access(u, self.location, 'instructor'))
+        # the groups of the user are only fetched once
+        self.assertEqual(u.groups.all.call_count, 1)
+
+        # but nothing is cached outside of requests
+        self._end_request()
+        g.name = 'student_only'
+        self.assertFalse(access.has_access(u, self.location, 'staff'))
+        self.assertFalse(access.has_access(u, self.location, 'staff'))
+        self.assertEqual(u.groups.all.call_count, 3)
+
+    def test_group_change_clears_cache(self):
+        user = UserFactory.create()
+        self.assertFalse(access.has_access(user, self.location, 'staff'))
+
+        GroupFactory.create(name='staff_edX/toy/2012_Fall').user_set.add(user)
+        self.assertTrue(access.has_access(user, self.location, 'staff'))
+
+    def test_enrollments_fetched_once(self):
+        user = UserFactory.create()
+        CourseEnrollmentFactory.create(user=user, course_id='edX/toy/2012_Fall')
+        with patch.object(CourseEnrollment, 'is_enrolled') as mock_is_enrolled:
+            with self.assertNumQueries(1):
+                self.assertTrue(access._is_enrolled(user, 'edX/toy/2012_Fall'))
+                self.assertFalse(access._is_enrolled(user, 'edX/full/6.002_Spring_2012'))
+            self.assertFalse(mock_is_enrolled.called)
+
+        # enrolling during the request is seen by later checks
+        CourseEnrollmentFactory.create(user=user, course_id='edX/full/6.002_Spring_2012')
+        self.assertTrue(access._is_enrolled(user, 'edX/full/6.002_Spring_2012'))
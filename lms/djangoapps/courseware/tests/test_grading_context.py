@@ -0,0 +1,88 @@
+"""
+Tests of the cache of course grading contexts
+"""
+from django.core.cache import cache
+from django.test.utils import override_settings
+from mock import patch
+
+from courseware.grading_context import get_grading_context, _STRUCTURES
+from courseware.tests.tests import TEST_DATA_MONGO_MODULESTORE
+from xmodule.course_module import CourseDescriptor
+from xmodule.modulestore.django import modulestore
+from xmodule.modulestore.mongo.base import get_course_id_no_run
+from xmodule.modulestore.tests.django_utils import ModuleStoreTestCase
+from xmodule.modulestore.tests.factories import CourseFactory, ItemFactory
+
+
+@override_settings(MODULESTORE=TEST_DATA_MONGO_MODULESTORE)
+class GradingContextTestCase(ModuleStoreTestCase):
+    """
+    Tests that the grading context of a course is cached by course version
+    """
+    def setUp(self):
+        cache.clear()
+        _STRUCTURES.clear()
+        self.course = CourseFactory.create()
+        chapter = ItemFactory.create(parent_location=self.course.location, category='chapter')
+        self.section = ItemFactory.create(
+            parent_location=chapter.location,
+            category='sequential',
+            metadata={'graded': True, 'format': 'Homework'}
+        )
+        self.vertical = ItemFactory.create(parent_location=self.section.location, category='vertical')
+        self.problem = ItemFactory.create(
+            parent_location=self.vertical.location,
+            category='problem',
+            metadata={'weight': 2}
+        )
+        # an ungraded section
+        ItemFactory.create(parent_location=chapter.location, category='sequential')
+
+    def _get_course(self):
+        """Returns a new descriptor of the course, as loaded by each request"""
+        return modulestore().get_instance(self.course.id, self.course.location, depth=None)
+
+    def test_grading_context(self):
+        grading_context = get_grading_context(self._get_course())
+        self.assertEqual(grading_context['graded_sections'].keys(), ['Homework'])
+        self.assertFalse(grading_context['always_recalculate_grades'])
+        self.assertFalse(grading_context['has_dynamic_children'])
+
+        section = grading_context['graded_sections']['Homework'][0]
+        self.assertEqual(section['location'], self.section.location.url())
+        self.assertEqual(list(section['scorable']), [(self.problem.location.url(), 2)])
+        self.assertFalse(section['always_recalculate_grades'])
+
+        # the descriptors are loaded from the locations
+        self.assertEqual(section['section_descriptor'].location, self.section.location)
+        self.assertEqual([descriptor.location for descriptor in section['xmoduledescriptors']], [self.problem.location])
+        self.assertEqual(
+            [descriptor.location for descriptor in grading_context['all_descriptors']],
+            [self.vertical.location, self.problem.location, self.section.location]
+        )
+
+    def test_cached_between_requests(self):
+        expected = get_grading_context(self._get_course())['graded_sections']['Homework'][0]['location']
+
+        # the course isn't walked again, whether the structure is cached in this process or not
+        with patch.object(CourseDescriptor, 'get_children', side_effect=AssertionError):
+            grading_context = get_grading_context(self._get_course())
+            self.assertEqual(grading_context['graded_sections']['Homework'][0]['location'], expected)
+
+            _STRUCTURES.clear()
+            grading_context = get_grading_context(self._get_course())
+            self.assertEqual(grading_context['graded_sections']['Homework'][0]['location'], expected)
+
+    def test_course_update(self):
+        get_grading_context(self._get_course())
+        ItemFactory.create(parent_location=self.vertical.location, category='problem')
+
+        section = get_grading_context(self._get_course())['graded_sections']['Homework'][0]
+        self.assertEqual(len(section['scorable']), 2)
+
+    def test_update_signal(self):
+        get_grading_context(self._get_course())
+        self.assertIn(self.course.id, _STRUCTURES)
+
+        modulestore().fire_updated_modulestore_signal(get_course_id_no_run(self.course.location), self.course.location)
+        self.assertNotIn(self.course.id, _STRUCTURES)
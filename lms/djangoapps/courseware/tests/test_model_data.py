@@ -7,7 +7,7 @@ from functools import partial
 
 from courseware.model_data import DjangoKeyValueStore
 from courseware.model_data import InvalidScopeError, FieldDataCache
-from courseware.models import StudentModule, XModuleUserStateSummaryField
+from courseware.models import StudentModule, StudentModuleHistory, XModuleUserStateSummaryField
 from courseware.models import XModuleStudentInfoField, XModuleStudentPrefsField
 
 from student.tests.factories import UserFactory
@@ -184,6 +184,60 @@ class TestMissingStudentModule(TestCase):
         self.assertFalse(self.kvs.has(user_state_key('a_field')))
 
 
+class TestDeferredWrites(TestCase):
+    def setUp(self):
+        self.user = UserFactory.create(username='user')
+
+    def test_existing_student_module(self):
+        "Test that fields set while writes are deferred are written once, on exit"
+        student_module = StudentModuleFactory(student=self.user, state=json.dumps({'a_field': 'a_value'}))
+        history_count = StudentModuleHistory.objects.filter(student_module=student_module).count()
+        field_data_cache = FieldDataCache([mock_descriptor([mock_field(Scope.user_state, 'a_field')])], course_id, self.user)
+        kvs = DjangoKeyValueStore(field_data_cache)
+
+        with field_data_cache.deferred_writes():
+            kvs.set(user_state_key('a_field'), 'new_value')
+            kvs.set_many({user_state_key('b_field'): 'b_value', user_state_key('c_field'): 'c_value'})
+            kvs.delete(user_state_key('c_field'))
+            self.assertEquals('new_value', kvs.get(user_state_key('a_field')))
+            self.assertEquals({'a_field': 'a_value'}, json.loads(StudentModule.objects.get().state))
+
+        self.assertEquals({'a_field': 'new_value', 'b_field': 'b_value'}, json.loads(StudentModule.objects.get().state))
+        history = StudentModuleHistory.objects.filter(student_module=student_module)
+        self.assertEquals(history_count + 1, history.count())
+        self.assertEquals({'a_field': 'new_value', 'b_field': 'b_value'}, json.loads(history.latest().state))
+
+    def test_missing_student_module(self):
+        "Test that StudentModules created while writes are deferred are inserted on exit"
+        field_data_cache = FieldDataCache([mock_descriptor()], course_id, self.user)
+        kvs = DjangoKeyValueStore(field_data_cache)
+
+        with field_data_cache.deferred_writes():
+            kvs.set(user_state_key('a_field'), 'a_value')
+            self.assertEquals(0, StudentModule.objects.all().count())
+
+        student_module = StudentModule.objects.get()
+        self.assertEquals({'a_field': 'a_value'}, json.loads(student_module.state))
+        self.assertEquals(student_module.id, field_data_cache.find(user_state_key('a_field')).id)
+        self.assertEquals(1, StudentModuleHistory.objects.filter(student_module=student_module).count())
+
+        # later writes update the row that was inserted
+        kvs.set(user_state_key('a_field'), 'new_value')
+        self.assertEquals(1, StudentModule.objects.all().count())
+        self.assertEquals({'a_field': 'new_value'}, json.loads(StudentModule.objects.get().state))
+
+    def test_student_module_created_concurrently(self):
+        "Test that a StudentModule created by someone else while writes are deferred is merged into"
+        field_data_cache = FieldDataCache([mock_descriptor()], course_id, self.user)
+        kvs = DjangoKeyValueStore(field_data_cache)
+
+        with field_data_cache.deferred_writes():
+            kvs.set(user_state_key('a_field'), 'a_value')
+            StudentModuleFactory(student=self.user, state=json.dumps({'b_field': 'b_value'}))
+
+        self.assertEquals({'a_field': 'a_value', 'b_field': 'b_value'}, json.loads(StudentModule.objects.get().state))
+
+
 class StorageTestBase(object):
     """
     A base class for that gets subclassed when testing each of the scopes.
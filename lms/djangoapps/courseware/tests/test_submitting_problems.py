@@ -2,8 +2,10 @@
 
 # text processing dependancies
 import json
+from mock import patch
 from textwrap import dedent
 
+from django.conf import settings
 from django.contrib.auth.models import User
 from django.test.client import RequestFactory
 from django.core.urlresolvers import reverse
@@ -12,6 +14,7 @@ from django.test.utils import override_settings
 # Need access to internal func to put users in the right group
 from courseware import grades
 from courseware.model_data import FieldDataCache
+from courseware.models import StudentGradeSummary, StudentModule
 
 from xmodule.modulestore.django import modulestore, editable_modulestore
 
@@ -550,6 +553,175 @@ class TestCourseGrader(TestSubmittingProblems):
         self.assertEqual(self.earned_hw_scores(), [1.0, 2.0, 2.0])  # Order matters
         self.assertEqual(self.score_for_hw('homework3'), [1.0, 1.0])
 
+    def test_grade_students(self):
+        """
+        Check that bulk grading agrees with grading the student alone.
+        """
+        self.dropping_setup()
+        self.dropping_homework_stage1()
+
+        fake_request = self.factory.get(reverse('progress',
+                                        kwargs={'course_id': self.course.id}))
+        fake_request.user = self.student_user
+        expected = grades.grade(self.student_user, fake_request, self.course, keep_raw_scores=True)
+
+        results = list(grades.grade_students([self.student_user], fake_request, self.course, keep_raw_scores=True))
+        self.assertEqual(len(results), 1)
+        student, grade_summary = results[0]
+        self.assertEqual(student, self.student_user)
+        self.assertEqual(grade_summary['percent'], expected['percent'])
+        self.assertEqual(grade_summary['totaled_scores'], expected['totaled_scores'])
+        self.assertEqual(grade_summary['raw_scores'], expected['raw_scores'])
+
+    def test_grade_students_unreleased_problem(self):
+        """
+        Check that bulk grading by a staff member doesn't count the problems which
+        the student can't load yet.
+        """
+        self.basic_setup()
+        ItemFactory.create(
+            parent_location=self.homework.location,
+            category='problem',
+            data=OptionResponseXMLFactory().build_xml(
+                question_text='The correct answer is Correct',
+                options=['Correct', 'Incorrect'],
+                correct_option='Correct'
+            ),
+            metadata={'start': '2100-01-01T00:00'},
+            display_name='unreleased'
+        )
+        self.refresh_course()
+        self.submit_question_answer('p1', {'2_1': 'Correct'})
+
+        staff_user = User.objects.create_user('staff', 'staff@test.com', 'foo')
+        staff_user.is_staff = True
+        staff_user.save()
+        fake_request = self.factory.get(reverse('progress',
+                                        kwargs={'course_id': self.course.id}))
+        fake_request.user = staff_user
+
+        with patch.dict(settings.MITX_FEATURES, {'DISABLE_START_DATES': False}):
+            expected = grades.grade(self.student_user, fake_request, self.course, keep_raw_scores=True)
+            results = list(grades.grade_students([self.student_user], fake_request, self.course, keep_raw_scores=True))
+
+        _, grade_summary = results[0]
+        self.assertEqual(expected['percent'], 0.33)
+        self.assertEqual(grade_summary['percent'], expected['percent'])
+        self.assertEqual(grade_summary['raw_scores'], expected['raw_scores'])
+
+
+@patch.dict(settings.MITX_FEATURES, {'ENABLE_GRADE_SUMMARY_CACHE': True})
+class TestCachedCourseGrader(TestCourseGrader):
+    """
+    Run the course grader tests with the grade summary cache enabled.
+    """
+
+    def cached_summary(self):
+        """
+        Return the StudentGradeSummary of the test student, or None.
+        """
+        try:
+            return StudentGradeSummary.objects.get(user=self.student_user, course_id=self.course.id)
+        except StudentGradeSummary.DoesNotExist:
+            return None
+
+    def test_summary_updated_incrementally(self):
+        """
+        Check that grading a problem in an attempted section patches the cached summary.
+        """
+        self.basic_setup()
+        self.submit_question_answer('p1', {'2_1': 'Correct'})
+        self.check_grade_percent(0.33)
+        self.assertIsNotNone(self.cached_summary())
+
+        self.submit_question_answer('p2', {'2_1': 'Correct'})
+        self.assertIsNotNone(self.cached_summary())
+        with patch('courseware.grades._grade_sections') as mock_grade_sections:
+            self.check_grade_percent(0.67)
+            self.assertFalse(mock_grade_sections.called)
+
+    def test_policy_change_invalidates_summary(self):
+        """
+        Check that a cached summary isn't used once the grading policy changes.
+        """
+        self.basic_setup()
+        self.submit_question_answer('p1', {'2_1': 'Correct'})
+        self.check_grade_percent(0.33)
+
+        self.add_grading_policy({
+            "GRADER": [{
+                "type": "Homework",
+                "min_count": 1,
+                "drop_count": 0,
+                "short_label": "HW",
+                "weight": 0.5
+            }],
+        })
+        self.check_grade_percent(0.17)
+
+    def test_delete_student_module_invalidates_summary(self):
+        """
+        Check that deleting the state of a problem discards the cached summary.
+        """
+        self.basic_setup()
+        self.submit_question_answer('p1', {'2_1': 'Correct'})
+        self.check_grade_percent(0.33)
+
+        StudentModule.objects.filter(student=self.student_user).delete()
+        self.assertIsNone(self.cached_summary().summary)
+        self.check_grade_percent(0)
+
+    def test_grade_published_while_grading(self):
+        """
+        Check that section scores computed while a problem is graded aren't cached.
+        """
+        self.basic_setup()
+        self.submit_question_answer('p1', {'2_1': 'Correct'})
+
+        grade_sections = grades._grade_sections  # pylint: disable=protected-access
+
+        def grade_sections_then_submit(*args, **kwargs):
+            """Compute the section scores, then grade another problem before they're cached"""
+            section_scores = grade_sections(*args, **kwargs)
+            self.submit_question_answer('p2', {'2_1': 'Correct'})
+            return section_scores
+
+        with patch('courseware.grades._grade_sections', side_effect=grade_sections_then_submit):
+            self.check_grade_percent(0.33)
+        self.check_grade_percent(0.67)
+
+    def test_content_change_invalidates_summary(self):
+        """
+        Check that a cached summary isn't used once the max score of a problem changes.
+        """
+        self.basic_setup()
+        self.submit_question_answer('p1', {'2_1': 'Correct'})
+        self.check_grade_percent(0.33)
+
+        prob_xml = OptionResponseXMLFactory().build_xml(
+            question_text='The correct answer is Correct',
+            num_inputs=3,
+            weight=3,
+            options=['Correct', 'Incorrect'],
+            correct_option='Correct'
+        )
+        editable_modulestore('direct').update_item(self.problem_location('p3'), prob_xml)
+        self.refresh_course()
+        self.check_grade_percent(0.2)
+
+    def test_progress_summary_from_cache(self):
+        """
+        Check that the progress summary reads the scores of attempted sections from the cache.
+        """
+        self.basic_setup()
+        self.submit_question_answer('p1', {'2_1': 'Correct'})
+        self.check_grade_percent(0.33)
+
+        with patch.dict(settings.MITX_FEATURES, {'ENABLE_GRADE_SUMMARY_CACHE': False}):
+            expected = self.get_progress_summary()
+        with patch('courseware.grades.get_score', side_effect=AssertionError):
+            self.assertEqual(self.get_progress_summary(), expected)
+
 
 class TestPythonGradedResponse(TestSubmittingProblems):
     """
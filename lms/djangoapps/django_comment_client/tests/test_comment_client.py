@@ -0,0 +1,53 @@
+"""
+Tests of the transport of the comments service client
+"""
+from django.core.cache import cache
+from django.test import TestCase
+from mock import patch
+
+import comment_client as cc
+
+
+class CallConcurrentlyTestCase(TestCase):
+    def test_results_in_order(self):
+        results = cc.utils.call_concurrently(lambda: 1, lambda: 2, lambda: 3)
+        self.assertEqual(results, [1, 2, 3])
+
+    def test_no_calls(self):
+        self.assertEqual(cc.utils.call_concurrently(), [])
+
+    def test_reraises_error(self):
+        def fail():
+            raise cc.utils.CommentClientError("failed")
+
+        with self.assertRaises(cc.utils.CommentClientError):
+            cc.utils.call_concurrently(lambda: 1, fail)
+
+
+@patch('comment_client.utils.requests.Session.request')
+class PerformRequestTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_shared_session(self, mock_request):
+        self.assertIs(cc.utils.get_session(), cc.utils.get_session())
+
+    def test_cached_response(self, mock_request):
+        mock_request.return_value.status_code = 200
+        mock_request.return_value.text = u'{"tags": ["a"]}'
+
+        for _ in range(2):
+            response = cc.utils.perform_request('get', 'http://localhost:4567/tags', {'course_id': 'a'}, cache_timeout=30)
+            self.assertEqual(response, {'tags': ['a']})
+        self.assertEqual(mock_request.call_count, 1)
+
+        cc.utils.perform_request('get', 'http://localhost:4567/tags', {'course_id': 'b'}, cache_timeout=30)
+        self.assertEqual(mock_request.call_count, 2)
+
+    def test_uncached_response(self, mock_request):
+        mock_request.return_value.status_code = 200
+        mock_request.return_value.text = u'{}'
+
+        for _ in range(2):
+            cc.utils.perform_request('get', 'http://localhost:4567/tags', {'course_id': 'a'})
+        self.assertEqual(mock_request.call_count, 2)
@@ -1,5 +1,13 @@
+from datetime import datetime, timedelta
+
 from django.test import TestCase
+from django.test.utils import override_settings
+from mock import patch
+from pytz import UTC
 from student.tests.factories import UserFactory, CourseEnrollmentFactory
+from courseware.tests.modulestore_config import TEST_DATA_MIXED_MODULESTORE
+from xmodule.modulestore.tests.django_utils import ModuleStoreTestCase
+from xmodule.modulestore.tests.factories import CourseFactory, ItemFactory
 from django_comment_common.models import Role, Permission
 from factories import RoleFactory
 import django_comment_client.utils as utils
@@ -179,3 +187,43 @@ class AccessUtilsTestCase(TestCase):
 
         ret = utils.has_forum_access('student', self.course_id, 'NotARole')
         self.assertFalse(ret)
+
+
+@override_settings(MODULESTORE=TEST_DATA_MIXED_MODULESTORE)
+class DiscussionInfoCacheTestCase(ModuleStoreTestCase):
+    def setUp(self):
+        self.course = CourseFactory.create(org='edX', course='discussions', display_name='Discussions')
+        self.create_discussion('Chapter', 'Discussion 1')
+
+    def create_discussion(self, category, target, start=None):
+        """Create a discussion module in the course"""
+        metadata = {
+            'discussion_id': target.lower().replace(' ', '_'),
+            'discussion_category': category,
+            'discussion_target': target,
+        }
+        if start is not None:
+            metadata['start'] = start
+        ItemFactory.create(
+            parent_location=self.course.location,
+            category='discussion',
+            display_name=target,
+            metadata=metadata,
+        )
+
+    def test_cached_until_course_changes(self):
+        self.assertIn('discussion_1', utils.get_discussion_id_map(self.course))
+
+        with patch('django_comment_client.utils.initialize_discussion_info') as mock_initialize:
+            utils.get_discussion_id_map(self.course)
+            utils.get_discussion_category_map(self.course)
+            self.assertFalse(mock_initialize.called)
+
+        self.create_discussion('Chapter', 'Discussion 2')
+        self.assertIn('discussion_2', utils.get_discussion_id_map(self.course))
+
+    def test_unstarted_categories_filtered(self):
+        self.create_discussion('Future', 'Discussion 3', start=datetime.now(UTC) + timedelta(days=1))
+        category_map = utils.get_discussion_category_map(self.course)
+        self.assertEqual(category_map['children'], ['Chapter'])
+        self.assertEqual(category_map['subcategories']['Chapter']['children'], ['Discussion 1'])
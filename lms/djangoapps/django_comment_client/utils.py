@@ -1,10 +1,12 @@
 import pytz
+from bisect import bisect_left, bisect_right
 from collections import defaultdict
 import logging
 import urllib
 from datetime import datetime
 
 from django.contrib.auth.models import User
+from django.core.cache import cache
 from django.core.urlresolvers import reverse
 from django.db import connection
 from django.http import HttpResponse
@@ -22,6 +24,7 @@ log = logging.getLogger(__name__)
 
 # TODO these should be cached via django's caching rather than in-memory globals
 _FULLMODULES = None
+# course_id -> the discussion info of the course (see initialize_discussion_info)
 _DISCUSSIONINFO = defaultdict(dict)
 
 
@@ -73,19 +76,64 @@ def get_discussion_id_map(course):
     """
         return a dict of the form {category: modules}
     """
-    initialize_discussion_info(course)
-    return _DISCUSSIONINFO[course.id]['id_map']
+    return get_discussion_info(course)['id_map']
 
 
 def get_discussion_title(course, discussion_id):
-    initialize_discussion_info(course)
-    title = _DISCUSSIONINFO[course.id]['id_map'].get(discussion_id, {}).get('title', '(no title)')
+    title = get_discussion_info(course)['id_map'].get(discussion_id, {}).get('title', '(no title)')
     return title
 
 
 def get_discussion_category_map(course):
-    initialize_discussion_info(course)
-    return filter_unstarted_categories(_DISCUSSIONINFO[course.id]['category_map'])
+    """
+    Returns the category map of the course, without the categories and entries that haven't started yet.
+
+    The filtered map only changes when the current time passes one of the start dates in the
+    map, so it is computed once per position of the current time in the sorted start dates.
+    """
+    info = get_discussion_info(course)
+    now = datetime.now(UTC())
+    position = (bisect_left(info['start_dates'], now), bisect_right(info['start_dates'], now))
+    filtered_maps = info.setdefault('filtered_category_maps', {})
+    # other threads may clear filtered_maps at any time, so it's only read once
+    filtered_map = filtered_maps.get(position)
+    if filtered_map is None:
+        filtered_map = filter_unstarted_categories(info['category_map'])
+        filtered_maps.clear()
+        filtered_maps[position] = filtered_map
+    return filtered_map
+
+
+def discussion_info_cache_key(course_id, version):
+    """The key of the discussion info of course_id at version in the django cache"""
+    return u"django_comment_client.discussion_info.{0}.{1}".format(course_id, version)
+
+
+def get_discussion_info(course):
+    """
+    Returns the discussion info of the course, as computed by initialize_discussion_info.
+
+    It is cached in this process and, for courses whose modulestore tracks their version
+    (i.e. courses that can be edited in Studio), in the django cache, keyed by the version
+    of the course, so that editing the course invalidates it.
+    """
+    version = modulestore().get_course_version(course.id)
+    info = _DISCUSSIONINFO.get(course.id)
+    if info and info.get('version') == version:
+        return info
+
+    info = None
+    if version is not None:
+        info = cache.get(discussion_info_cache_key(course.id, version))
+    if info is None:
+        initialize_discussion_info(course)
+        info = _DISCUSSIONINFO[course.id]
+        info['version'] = version
+        if version is not None:
+            cache.set(discussion_info_cache_key(course.id, version), info)
+
+    _DISCUSSIONINFO[course.id] = info
+    return info
 
 
 def filter_unstarted_categories(category_map):
@@ -216,9 +264,24 @@ def initialize_discussion_info(course):
 
     sort_map_entries(category_map, course.discussion_sort_alpha)
 
-    _DISCUSSIONINFO[course.id]['id_map'] = discussion_id_map
-    _DISCUSSIONINFO[course.id]['category_map'] = category_map
-    _DISCUSSIONINFO[course.id]['timestamp'] = datetime.now(UTC())
+    _DISCUSSIONINFO[course.id] = {
+        'id_map': discussion_id_map,
+        'category_map': category_map,
+        'start_dates': sorted(_category_map_start_dates(category_map)),
+        'timestamp': datetime.now(UTC()),
+    }
+
+
+def _category_map_start_dates(category_map):
+    """
+    Yields the start dates of all of the entries and subcategories in category_map
+    """
+    for entry in category_map["entries"].itervalues():
+        yield entry["start_date"]
+    for subcategory in category_map["subcategories"].itervalues():
+        yield subcategory["start_date"]
+        for start_date in _category_map_start_dates(subcategory):
+            yield start_date
 
 
 class JsonResponse(HttpResponse):
@@ -3,7 +3,9 @@
 # django management command: dump grades to csv files
 # for use by batch processes
 
-from instructor.offline_gradecalc import offline_grade_calculation
+from optparse import make_option
+
+from instructor.offline_gradecalc import offline_grade_calculation, DEFAULT_SHARD_SIZE, DEFAULT_BATCH_SIZE
 from courseware.courses import get_course_by_id
 from xmodule.modulestore.django import modulestore
 
@@ -12,10 +14,33 @@ from django.core.management.base import BaseCommand
 
 class Command(BaseCommand):
     help = "Compute grades for all students in a course, and store result in DB.\n"
-    help += "Usage: compute_grades course_id_or_dir \n"
+    help += "Usage: compute_grades course_id_or_dir [--processes N] [--shard-size N] [--batch-size N] [--resume]\n"
     help += "   course_id_or_dir: either course_id or course_dir\n"
     help += 'Example course_id: MITx/8.01rq_MW/Classical_Mechanics_Reading_Questions_Fall_2012_MW_Section'
 
+    option_list = BaseCommand.option_list + (
+        make_option('-p', '--processes',
+                    type='int',
+                    dest='processes',
+                    default=1,
+                    help='Number of worker processes to grade with'),
+        make_option('--shard-size',
+                    type='int',
+                    dest='shard_size',
+                    default=DEFAULT_SHARD_SIZE,
+                    help='Number of students graded by a worker between checkpoints'),
+        make_option('--batch-size',
+                    type='int',
+                    dest='batch_size',
+                    default=DEFAULT_BATCH_SIZE,
+                    help='Number of computed grades written to the database at once'),
+        make_option('-r', '--resume',
+                    action='store_true',
+                    dest='resume',
+                    default=False,
+                    help='Skip the students graded by an interrupted earlier run'),
+    )
+
     def handle(self, *args, **options):
 
         print "args = ", args
@@ -40,4 +65,10 @@ class Command(BaseCommand):
         print "-----------------------------------------------------------------------------"
         print "Computing grades for %s" % (course.id)
 
-        offline_grade_calculation(course.id)
+        offline_grade_calculation(
+            course.id,
+            processes=options['processes'],
+            shard_size=options['shard_size'],
+            batch_size=options['batch_size'],
+            resume=options['resume'],
+        )
@@ -5,13 +5,22 @@
 #
 # The grades are stored in the OfflineComputedGrade table of the courseware model.
 
+from __future__ import division
+
+import itertools
 import json
+import multiprocessing
+import operator
 import time
 
 from json import JSONEncoder
 from courseware import grades, models
 from courseware.courses import get_course_by_id
+from django import db
 from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models import Q
+from xmodule.modulestore import django as modulestore_django
 
 
 class MyEncoder(JSONEncoder):
@@ -25,58 +34,191 @@ class MyEncoder(JSONEncoder):
             yield chunk
 
 
-def offline_grade_calculation(course_id):
+class DummyRequest(object):
+    """
+    Stand-in for the HttpRequest that grading expects, when grading outside of a request.
+    """
+    META = {}
+
+    def __init__(self, user=None):
+        self.user = user
+        self.session = {}
+
+    def get_host(self):
+        return 'edx.mit.edu'
+
+    def is_secure(self):
+        return False
+
+
+# Number of students graded by one worker between checkpoints
+DEFAULT_SHARD_SIZE = 1000
+
+# Number of OfflineComputedGrade rows written per query
+DEFAULT_BATCH_SIZE = 200
+
+
+def offline_grade_calculation(course_id, processes=1, shard_size=DEFAULT_SHARD_SIZE,
+                              batch_size=DEFAULT_BATCH_SIZE, resume=False):
     '''
     Compute grades for all students for a specified course, and save results to the DB.
+
+    The enrolled students are split, by user id, into shards of `shard_size`
+    students, which are graded by a pool of `processes` worker processes.  Each
+    completed shard is checkpointed as an OfflineComputedGradeLog entry.  If
+    `resume` is True, the students whose grades were stored by an earlier,
+    interrupted, run (see `_graded_user_ids`) are skipped.
     '''
 
     tstart = time.time()
-    enrolled_students = User.objects.filter(
+    enrolled_ids = list(User.objects.filter(
         courseenrollment__course_id=course_id,
         courseenrollment__is_active=1
-    ).prefetch_related("groups").order_by('username')
-
-    enc = MyEncoder()
-
-    class DummyRequest(object):
-        META = {}
-        def __init__(self):
-            return
-        def get_host(self):
-            return 'edx.mit.edu'
-        def is_secure(self):
-            return False
-
-    print "%d enrolled students" % len(enrolled_students)
-    course = get_course_by_id(course_id)
-
-    for student in enrolled_students:
-        request = DummyRequest()
-        request.user = student
-        request.session = {}
-
-        gradeset = grades.grade(student, request, course, keep_raw_scores=True)
-        gs = enc.encode(gradeset)
-        ocg, created = models.OfflineComputedGrade.objects.get_or_create(user=student, course_id=course_id)
-        ocg.gradeset = gs
-        ocg.save()
-        print "%s done" % student  	# print statement used because this is run by a management command
+    ).order_by('id').values_list('id', flat=True))
+
+    print "%d enrolled students" % len(enrolled_ids)
+
+    if resume:
+        graded_ids = _graded_user_ids(course_id)
+        user_ids = [user_id for user_id in enrolled_ids if user_id not in graded_ids]
+        print "Resuming: %d students left to grade" % len(user_ids)
+    else:
+        _checkpoints(course_id).delete()
+        user_ids = enrolled_ids
+
+    shards = [
+        (course_id, user_ids[i:i + shard_size], batch_size)
+        for i in xrange(0, len(user_ids), shard_size)
+    ]
+
+    if processes > 1 and len(shards) > 1:
+        # Don't share the parent's connections with the workers
+        db.close_connection()
+        pool = multiprocessing.Pool(processes, initializer=_init_worker)
+        results = pool.imap_unordered(_grade_shard, shards)
+    else:
+        pool = None
+        results = itertools.imap(_grade_shard, shards)
+
+    ngraded = 0
+    for first_user_id, last_user_id, nstudents, seconds in results:
+        ngraded += nstudents
+        print "shard %d-%d: %d students in %.1fs (%.1f students/sec); %d/%d done" % (
+            first_user_id, last_user_id, nstudents, seconds, nstudents / max(seconds, 0.001),
+            ngraded, len(user_ids)
+        )
+
+    if pool is not None:
+        pool.close()
+        pool.join()
 
     tend = time.time()
     dt = tend - tstart
 
-    ocgl = models.OfflineComputedGradeLog(course_id=course_id, seconds=dt, nstudents=len(enrolled_students))
+    # This run is complete, so its checkpoints are no longer needed
+    _checkpoints(course_id).delete()
+    ocgl = models.OfflineComputedGradeLog(course_id=course_id, seconds=dt, nstudents=len(enrolled_ids))
     ocgl.save()
     print ocgl
+    print "Graded %d students in %.1fs (%.1f students/sec)" % (ngraded, dt, ngraded / max(dt, 0.001))
     print "All Done!"
 
 
+def _checkpoints(course_id):
+    '''
+    Returns the shard checkpoints of the current run of the offline grade calculation of a course.
+    '''
+    return models.OfflineComputedGradeLog.objects.filter(
+        course_id=course_id,
+        first_user_id__isnull=False,
+    )
+
+
+def _graded_user_ids(course_id):
+    '''
+    Returns the set of the ids of the users graded by the current run of the offline
+    grade calculation of a course: those within the user id range of one of its
+    checkpointed shards, and whose grades are stored. An empty set if none of its
+    shards have completed.
+
+    The stored grades are checked as well as the checkpoints, as students within the
+    range of a shard may have enrolled since it was graded.
+    '''
+    ranges = list(_checkpoints(course_id).values_list('first_user_id', 'last_user_id'))
+    if not ranges:
+        return set()
+
+    in_ranges = reduce(operator.or_, [Q(user__id__range=user_id_range) for user_id_range in ranges])
+    return set(models.OfflineComputedGrade.objects.filter(
+        in_ranges,
+        course_id=course_id,
+    ).values_list('user_id', flat=True))
+
+
+def _init_worker():
+    '''
+    Runs in each worker process: make sure the worker opens its own database
+    and modulestore connections rather than using the ones inherited from the parent.
+    '''
+    db.close_connection()
+    modulestore_django._MODULESTORES.clear()  # pylint: disable=protected-access
+
+
+def _grade_shard(args):
+    '''
+    Compute and store the grades of a shard of students, and checkpoint it.
+
+    Returns (first user id, last user id, number of students graded, seconds elapsed).
+    '''
+    course_id, user_ids, batch_size = args
+    tstart = time.time()
+
+    students = list(User.objects.filter(id__in=user_ids).prefetch_related("groups").order_by('id'))
+    # every user of the shard may have been deleted since it was made
+    if students:
+        course = get_course_by_id(course_id)
+        request = DummyRequest(user=students[0])
+
+        enc = MyEncoder()
+        batch = []
+        for student, gradeset in grades.grade_students(students, request, course, keep_raw_scores=True):
+            batch.append(models.OfflineComputedGrade(user=student, course_id=course_id, gradeset=enc.encode(gradeset)))
+            if len(batch) >= batch_size:
+                _save_gradesets(course_id, batch)
+                batch = []
+        _save_gradesets(course_id, batch)
+
+    dt = time.time() - tstart
+    models.OfflineComputedGradeLog(
+        course_id=course_id,
+        seconds=dt,
+        nstudents=len(students),
+        first_user_id=user_ids[0],
+        last_user_id=user_ids[-1],
+    ).save()
+    return user_ids[0], user_ids[-1], len(students), dt
+
+
+@transaction.commit_on_success
+def _save_gradesets(course_id, offline_grades):
+    '''
+    Replace the OfflineComputedGrades of the users of `offline_grades` with a single insert.
+    '''
+    if not offline_grades:
+        return
+    models.OfflineComputedGrade.objects.filter(
+        course_id=course_id,
+        user__in=[ocg.user_id for ocg in offline_grades],
+    ).delete()
+    models.OfflineComputedGrade.objects.bulk_create(offline_grades)
+
+
 def offline_grades_available(course_id):
     '''
     Returns False if no offline grades available for specified course.
     Otherwise returns latest log field entry about the available pre-computed grades.
     '''
-    ocgl = models.OfflineComputedGradeLog.objects.filter(course_id=course_id)
+    ocgl = models.OfflineComputedGradeLog.objects.filter(course_id=course_id, first_user_id__isnull=True)
     if not ocgl:
         return False
     return ocgl.latest('created')
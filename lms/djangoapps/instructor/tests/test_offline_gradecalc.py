@@ -0,0 +1,126 @@
+"""
+Tests of the offline grade calculation
+"""
+import json
+
+from django.contrib.auth.models import User
+from django.test.utils import override_settings
+from xmodule.modulestore.tests.factories import CourseFactory, ItemFactory
+from student.tests.factories import UserFactory, CourseEnrollmentFactory
+from xmodule.modulestore.tests.django_utils import ModuleStoreTestCase
+from courseware.models import OfflineComputedGrade, OfflineComputedGradeLog
+from courseware.tests.tests import TEST_DATA_MIXED_MODULESTORE
+from capa.tests.response_xml_factory import StringResponseXMLFactory
+from courseware.tests.factories import StudentModuleFactory
+from xmodule.modulestore import Location
+
+from instructor.offline_gradecalc import offline_grade_calculation, offline_grades_available, _grade_shard
+
+
+USER_COUNT = 5
+
+
+@override_settings(MODULESTORE=TEST_DATA_MIXED_MODULESTORE)
+class TestOfflineGradeCalculation(ModuleStoreTestCase):
+    """
+    Check that offline grades are computed, checkpointed and resumed.
+    """
+
+    def setUp(self):
+        self.course = CourseFactory.create()
+        chapter = ItemFactory.create(
+            parent_location=self.course.location,
+            category="chapter",
+        )
+        section = ItemFactory.create(
+            parent_location=chapter.location,
+            category="sequential",
+            metadata={'graded': True, 'format': 'Homework'}
+        )
+        problem = ItemFactory.create(
+            parent_location=section.location,
+            category="problem",
+            data=StringResponseXMLFactory().build_xml(answer='foo'),
+        )
+
+        self.users = [UserFactory.create() for _ in xrange(USER_COUNT)]
+        for user in self.users:
+            CourseEnrollmentFactory.create(user=user, course_id=self.course.id)
+            StudentModuleFactory.create(
+                grade=1,
+                max_grade=1,
+                student=user,
+                course_id=self.course.id,
+                module_state_key=Location(problem.location).url()
+            )
+
+    def test_grades_all_students(self):
+        """Grades are stored for every student, across several shards."""
+        offline_grade_calculation(self.course.id, shard_size=2, batch_size=1)
+
+        self.assertEqual(OfflineComputedGrade.objects.filter(course_id=self.course.id).count(), USER_COUNT)
+        for ocg in OfflineComputedGrade.objects.filter(course_id=self.course.id):
+            self.assertEqual(json.loads(ocg.gradeset)['percent'], 1.0)
+
+        # Checkpoints are cleaned up, leaving a single log entry for the run
+        log = OfflineComputedGradeLog.objects.get(course_id=self.course.id)
+        self.assertIsNone(log.first_user_id)
+        self.assertEqual(log.nstudents, USER_COUNT)
+        self.assertEqual(offline_grades_available(self.course.id), log)
+
+    def _interrupted_run(self, graded_users):
+        """
+        Store the grades of `graded_users` and a checkpoint, as a run which was
+        interrupted after grading them would have.
+        """
+        OfflineComputedGradeLog.objects.create(
+            course_id=self.course.id,
+            nstudents=len(graded_users),
+            first_user_id=graded_users[0].id,
+            last_user_id=graded_users[-1].id,
+        )
+        for user in graded_users:
+            OfflineComputedGrade.objects.create(user=user, course_id=self.course.id, gradeset='{}')
+
+    def _regraded_ids(self):
+        """The ids of the users whose grades have been computed, rather than left as stored"""
+        return sorted(
+            OfflineComputedGrade.objects.filter(course_id=self.course.id).exclude(gradeset='{}').values_list(
+                'user_id', flat=True
+            )
+        )
+
+    def test_resume(self):
+        """Students graded by the interrupted run are skipped when resuming."""
+        users = sorted(self.users, key=lambda user: user.id)
+        self._interrupted_run(users[:2])
+        self.assertFalse(offline_grades_available(self.course.id))
+
+        offline_grade_calculation(self.course.id, shard_size=2, resume=True)
+
+        self.assertEqual(self._regraded_ids(), [user.id for user in users[2:]])
+        self.assertEqual(OfflineComputedGrade.objects.filter(course_id=self.course.id).count(), USER_COUNT)
+        self.assertEqual(OfflineComputedGradeLog.objects.filter(course_id=self.course.id).count(), 1)
+
+    def test_resume_late_enrollment(self):
+        """
+        Students whose ids are within the checkpoints of the interrupted run, but who
+        weren't graded by it, are graded when resuming.
+        """
+        users = sorted(self.users, key=lambda user: user.id)
+        # users[1] enrolled after the interrupted run graded users[0] and users[2]
+        self._interrupted_run([users[0], users[2]])
+        # grades stored outside of the checkpointed shards, e.g. by an earlier run, don't count
+        OfflineComputedGrade.objects.create(user=users[3], course_id=self.course.id, gradeset='{}')
+
+        offline_grade_calculation(self.course.id, shard_size=2, resume=True)
+
+        self.assertEqual(self._regraded_ids(), [users[1].id, users[3].id, users[4].id])
+
+    def test_deleted_shard(self):
+        """A shard whose users have all been deleted is skipped."""
+        user_ids = [user.id for user in self.users]
+        User.objects.filter(id__in=user_ids).delete()
+
+        self.assertEqual(_grade_shard((self.course.id, user_ids, 1))[2], 0)
+        self.assertEqual(OfflineComputedGrade.objects.filter(course_id=self.course.id).count(), 0)
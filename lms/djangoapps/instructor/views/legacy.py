@@ -3,6 +3,7 @@ Instructor Views
 """
 from collections import defaultdict
 import csv
+import itertools
 import json
 import logging
 from markupsafe import escape
@@ -35,6 +36,7 @@ from courseware import grades
 from courseware.access import (has_access, get_access_group_name,
                                course_beta_test_group_name)
 from courseware.courses import get_course_with_access, get_cms_course_link_by_id
+from courseware.grading_context import get_grading_context
 from courseware.models import StudentModule
 from django_comment_common.models import (Role,
                                           FORUM_ROLE_ADMINISTRATOR,
@@ -1122,9 +1124,19 @@ def get_student_grade_summary_data(request, course, course_id, get_grades=True,
 
     header = ['ID', 'Username', 'Full Name', 'edX email', 'External email']
     assignments = []
+    gradesets = None
     if get_grades and enrolled_students.count() > 0:
+        if use_offline:
+            gradesets = (
+                (student, student_grades(student, request, course, keep_raw_scores=get_raw_scores, use_offline=True))
+                for student in enrolled_students
+            )
+        else:
+            gradesets = grades.grade_students(enrolled_students, request, course, keep_raw_scores=get_raw_scores)
+
         # just to construct the header
-        gradeset = student_grades(enrolled_students[0], request, course, keep_raw_scores=get_raw_scores, use_offline=use_offline)
+        first_student, gradeset = next(gradesets)
+        gradesets = itertools.chain([(first_student, gradeset)], gradesets)
         # log.debug('student {0} gradeset {1}'.format(enrolled_students[0], gradeset))
         if get_raw_scores:
             assignments += [score.section for score in gradeset['raw_scores']]
@@ -1135,7 +1147,10 @@ def get_student_grade_summary_data(request, course, course_id, get_grades=True,
     datatable = {'header': header, 'assignments': assignments, 'students': enrolled_students}
     data = []
 
-    for student in enrolled_students:
+    if gradesets is None:
+        gradesets = ((student, None) for student in enrolled_students)
+
+    for student, gradeset in gradesets:
         datarow = [student.id, student.username, student.profile.name, student.email]
         try:
             datarow.append(student.externalauthmap.external_email)
@@ -1143,7 +1158,6 @@ def get_student_grade_summary_data(request, course, course_id, get_grades=True,
             datarow.append('')
 
         if get_grades:
-            gradeset = student_grades(student, request, course, keep_raw_scores=get_raw_scores, use_offline=use_offline)
             log.debug('student={0}, gradeset={1}'.format(student, gradeset))
             if get_raw_scores:
                 # TODO (ichuang) encode Score as dict instead of as list, so score[0] -> score['earned']
@@ -1516,7 +1530,7 @@ def dump_grading_context(course):
     msg += "-----------------------------------------------------------------------------\n"
     msg += "Listing grading context for course %s\n" % course.id
 
-    gc = course.grading_context
+    gc = get_grading_context(course)
     msg += "graded sections:\n"
 
     msg += '%s\n' % gc['graded_sections'].keys()
@@ -191,6 +191,10 @@ MITX_FEATURES = {
     # Disable instructor dash buttons for downloading course data
     # when enrollment exceeds this number
     'MAX_ENROLLMENT_INSTR_BUTTONS': 200,
+
+    # Store the section scores computed by courseware.grades.grade per student,
+    # and update them incrementally as problems are graded
+    'ENABLE_GRADE_SUMMARY_CACHE': False,
 }
 
 # Used for A/B testing
@@ -380,6 +384,15 @@ MODULESTORE = {
 CONTENTSTORE = None
 DOC_STORE_CONFIG = None
 
+# An optional local disk cache of static content too large for memcache, served by
+# contentserver.middleware.StaticContentServer, e.g.
+# {'DIRECTORY': '/tmp/static_content', 'MAX_SIZE': 1024 * 1024 * 1024, 'MAX_ITEM_SIZE': 100 * 1024 * 1024}
+STATIC_CONTENT_DISK_CACHE = None
+
+# The number of recently rendered module html texts whose rewritten urls
+# (see static_replace.replace_urls) are remembered in each process; 0 to disable
+REWRITTEN_URLS_CACHE_SIZE = 0
+
 # Should we initialize the modulestores at startup, or wait until they are
 # needed?
 INIT_MODULESTORE_ON_STARTUP = True
@@ -403,6 +416,17 @@ CODE_JAIL = {
         # How many CPU seconds can jailed code use?
         'CPU': 1,
     },
+
+    # The pool of warm sandbox workers which capa's safe_exec uses (see
+    # capa/safe_exec/pool.py).
+    'pool': {
+        # How many workers does each process keep?  0 disables the pool.
+        'size': 0,
+        # How many executions does a worker run before it is replaced?
+        'max_runs': 100,
+        # How much memory (in bytes) can a worker use before it is replaced?
+        'max_memory': 200 * 1024 * 1024,
+    },
 }
 
 # Some courses are allowed to run unsafe code. This is a list of regexes, one
@@ -878,11 +902,18 @@ BULK_EMAIL_ROUTING_KEY = HIGH_PRIORITY_QUEUE
 # a bulk email message.
 BULK_EMAIL_LOG_SENT_EMAILS = False
 
-# Delay in seconds to sleep between individual mail messages being sent,
-# when a bulk email task is retried for rate-related reasons.  Choose this
-# value depending on the number of workers that might be sending email in
-# parallel, and what the SES rate is.
-BULK_EMAIL_RETRY_DELAY_BETWEEN_SENDS = 0.02
+# Maximum rate, in emails per second, at which each worker process sends bulk email.
+# Whenever the email provider throttles a worker, its rate is halved, down to
+# BULK_EMAIL_MIN_SEND_RATE, and then gradually recovers.  Choose this value depending
+# on the number of workers that might be sending email in parallel, and what the SES
+# rate is.  Set it to None to send without a rate limit.
+BULK_EMAIL_MAX_SEND_RATE = 50
+BULK_EMAIL_MIN_SEND_RATE = 1
+
+# Number of email connections each worker process keeps open between bulk email
+# subtasks, and the number of seconds they may be idle before they are closed.
+BULK_EMAIL_CONNECTION_POOL_SIZE = 1
+BULK_EMAIL_CONNECTION_MAX_IDLE = 10
 
 ################################### APPS ######################################
 INSTALLED_APPS = (
@@ -203,6 +203,13 @@ CELERY_ALWAYS_EAGER = True
 CELERY_RESULT_BACKEND = 'cache'
 BROKER_TRANSPORT = 'memory'
 
+################################ Bulk Email ###################################
+
+# Tests mock the email connection, so don't keep connections between subtasks,
+# and don't slow down when a test simulates throttling.
+BULK_EMAIL_CONNECTION_POOL_SIZE = 0
+BULK_EMAIL_MAX_SEND_RATE = None
+
 ############################ STATIC FILES #############################
 DEFAULT_FILE_STORAGE = 'django.core.files.storage.FileSystemStorage'
 MEDIA_ROOT = TEST_ROOT / "uploads"
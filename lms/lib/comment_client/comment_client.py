@@ -25,6 +25,7 @@ def search_recent_active_threads(course_id, recursive=False, query_params={}, *a
 def search_trending_tags(course_id, query_params={}, *args, **kwargs):
     default_params = {'course_id': course_id}
     attributes = dict(default_params.items() + query_params.items())
+    kwargs.setdefault('cache_timeout', settings.RESPONSE_CACHE_TIMEOUT)
     return perform_request('get', _url_for_search_trending_tags(), attributes, *args, **kwargs)
 
 
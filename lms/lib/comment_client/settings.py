@@ -11,3 +11,15 @@ if hasattr(settings, "COMMENTS_SERVICE_KEY"):
     API_KEY = settings.COMMENTS_SERVICE_KEY
 else:
     API_KEY = "PUT_YOUR_API_KEY_HERE"
+
+# The number of connections to the comments service kept alive by each process
+if hasattr(settings, "COMMENTS_SERVICE_MAX_CONNECTIONS"):
+    MAX_CONNECTIONS = settings.COMMENTS_SERVICE_MAX_CONNECTIONS
+else:
+    MAX_CONNECTIONS = 10
+
+# The number of seconds for which responses of read-only endpoints, like trending tags, are cached
+if hasattr(settings, "COMMENTS_SERVICE_CACHE_TIMEOUT"):
+    RESPONSE_CACHE_TIMEOUT = settings.COMMENTS_SERVICE_CACHE_TIMEOUT
+else:
+    RESPONSE_CACHE_TIMEOUT = 30
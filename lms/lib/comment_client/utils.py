@@ -1,9 +1,14 @@
 from contextlib import contextmanager
 from dogapi import dog_stats_api
+from django.core.cache import cache
+import hashlib
 import json
 import logging
 import requests
+from requests.adapters import HTTPAdapter
 import settings
+import sys
+import threading
 from time import time
 from uuid import uuid4
 
@@ -49,9 +54,56 @@ def request_timer(request_id, method, url):
     )
 
 
+_SESSION = None
+_SESSION_LOCK = threading.Lock()
+
+
+def get_session():
+    """
+    Returns the requests Session shared by all calls to the comments service, which
+    keeps up to settings.MAX_CONNECTIONS connections to it alive for reuse.
+    """
+    global _SESSION
+    with _SESSION_LOCK:
+        if _SESSION is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(
+                pool_connections=1,
+                pool_maxsize=settings.MAX_CONNECTIONS,
+            )
+            session.mount('http://', adapter)
+            session.mount('https://', adapter)
+            _SESSION = session
+    return _SESSION
+
+
+def response_cache_key(url, params):
+    """The django cache key of the cached response of a get of url with params"""
+    return "comment_client.response.{0}".format(
+        hashlib.md5(json.dumps([url, params], sort_keys=True)).hexdigest()
+    )
+
+
 def perform_request(method, url, data_or_params=None, *args, **kwargs):
+    """
+    Call `method` on `url` in the comments service, and return the decoded
+    json response (or its text, if `raw` is passed as True).
+
+    Gets may pass `cache_timeout`, a number of seconds for which the response
+    is cached and reused for identical requests. Only use it for read-only
+    endpoints whose results may be a little out of date.
+    """
     if data_or_params is None:
         data_or_params = {}
+    cache_timeout = kwargs.get('cache_timeout')
+    if cache_timeout and method == 'get':
+        key = response_cache_key(url, merge_dict(data_or_params, {'raw': kwargs.get('raw', False)}))
+        response = cache.get(key)
+        if response is None:
+            response = perform_request(method, url, data_or_params, raw=kwargs.get('raw', False))
+            cache.set(key, response, cache_timeout)
+        return response
+
     headers = {'X-Edx-Api-Key': settings.API_KEY}
     request_id = uuid4()
     request_id_dict = {'request_id': request_id}
@@ -63,7 +115,7 @@ def perform_request(method, url, data_or_params=None, *args, **kwargs):
             data = None
             params = merge_dict(data_or_params, request_id_dict)
         with request_timer(request_id, method, url):
-            response = requests.request(
+            response = get_session().request(
                 method,
                 url,
                 data=data,
@@ -91,6 +143,41 @@ def perform_request(method, url, data_or_params=None, *args, **kwargs):
             return json.loads(response.text)
 
 
+def call_concurrently(*calls):
+    """
+    Call each of `calls`, functions that take no arguments and make independent requests
+    to the comments service, in parallel threads, and return the list of their results.
+
+    If any of the calls raises an exception, the first one to do so (in the order of
+    `calls`) is re-raised once all of them have finished.
+
+    The calls run in their own threads, so they must not use the database.
+    """
+    results = [None] * len(calls)
+    errors = [None] * len(calls)
+
+    def run(index, call):
+        """Call the call at index, recording its result or exception"""
+        try:
+            results[index] = call()
+        except Exception:  # pylint: disable=W0703
+            errors[index] = sys.exc_info()
+
+    threads = [threading.Thread(target=run, args=(index, call)) for index, call in enumerate(calls[1:], 1)]
+    for thread in threads:
+        thread.start()
+    # make the first call in this thread rather than leaving it idle
+    if calls:
+        run(0, calls[0])
+    for thread in threads:
+        thread.join()
+
+    for error in errors:
+        if error is not None:
+            raise error[0], error[1], error[2]
+    return results
+
+
 class CommentClientError(Exception):
     def __init__(self, msg):
         self.message = msg
@@ -9,6 +9,7 @@ from django.conf import settings
 settings.INSTALLED_APPS  # pylint: disable=W0104
 
 from django_startup import autostartup
+from capa.safe_exec import configure_pool
 from xmodule.modulestore.django import modulestore
 
 log = logging.getLogger(__name__)
@@ -19,6 +20,9 @@ def run():
     """
     autostartup()
 
+    # The sandbox workers themselves are only started when each process first needs them
+    configure_pool(**settings.CODE_JAIL.get('pool', {'size': 0}))
+
     # Trigger a forced initialization of our modulestores since this can take a while to complete
     # and we want this done before HTTP requests are accepted.
     if settings.INIT_MODULESTORE_ON_STARTUP:
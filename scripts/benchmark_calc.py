@@ -0,0 +1,52 @@
+#!/usr/bin/env python
+"""
+A micro-benchmark of evaluating typical formulas at 10 and 50 samples, sample
+by sample with calc.evaluator and at once with calc.evaluate_samples.
+
+Run it from an environment with calc installed:
+    python scripts/benchmark_calc.py
+"""
+
+import timeit
+
+import numpy
+
+import calc
+
+EXPRESSIONS = ['x^2 + 3*x*y - 1/y', 'sin(x)*cos(y) + sqrt(x^2 + y^2)', 'R1*R2/(R1+R2) + 5k*x']
+NUMBER = 5
+
+
+def benchmark(num_samples):
+    """
+    Print the time taken to evaluate EXPRESSIONS at `num_samples` samples, both ways
+    """
+    variables_list = [
+        {'x': 0.5 + index, 'y': 1.5 + index, 'R1': 1.0 + index, 'R2': 10.0 - index * 0.1}
+        for index in range(num_samples)
+    ]
+
+    def per_sample():
+        for expression in EXPRESSIONS:
+            for variables in variables_list:
+                calc.evaluator(variables, {}, expression)
+
+    def vectorized():
+        for expression in EXPRESSIONS:
+            calc.evaluate_samples(variables_list, {}, expression)
+
+    per_sample_time = min(timeit.repeat(per_sample, number=NUMBER, repeat=3))
+    vectorized_time = min(timeit.repeat(vectorized, number=NUMBER, repeat=3))
+    print "{0} formulas x {1} samples: {2:.2f}ms per sample, {3:.2f}ms vectorized".format(
+        len(EXPRESSIONS), num_samples, per_sample_time / NUMBER * 1e3, vectorized_time / NUMBER * 1e3
+    )
+
+
+def main():
+    numpy.seterr(all='ignore')
+    for num_samples in (10, 50):
+        benchmark(num_samples)
+
+
+if __name__ == '__main__':
+    main()